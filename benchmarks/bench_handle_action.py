@@ -0,0 +1,125 @@
+"""动作分发基准测试。
+
+测量 `OneBotImpl.handle_action` 的吞吐（actions/sec）：元动作、带扩展参数与消息段的动作，
+以及参数校验失败的请求。动作响应器不做任何事，结果只反映校验与分发的开销。
+
+每个请求输出三列（都包含 JSON 编码响应）：
+    baseline: 直接调用响应器，不做校验与分发，是分发开销的下限
+    handle_action: `handle_action` 后编码响应，即未缓存编码结果时 HTTP 连接的路径
+    encoded: `handle_action_encoded`，元动作使用缓存的编码结果
+
+用法:
+    python benchmarks/bench_handle_action.py [次数]
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import time
+from typing import Annotated, Any, Awaitable, Callable, Literal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import msgspec  # noqa: E402
+from loguru import logger  # noqa: E402
+from pylibob import HTTP, Bot, MessageSegment, OneBotImpl  # noqa: E402
+from pylibob.types import ActionResponse, ContentType  # noqa: E402
+
+# 只测量校验与分发，不输出日志
+logger.remove()
+
+MESSAGE = [
+    {"type": "reply", "data": {"message_id": "2978", "user_id": "12"}},
+    {"type": "text", "data": {"text": "hello "}},
+    {"type": "mention", "data": {"user_id": "12"}},
+    {"type": "image", "data": {"file_id": "/2023/01/01/aaaa-bbbb"}},
+]
+REQUESTS = {
+    "get_version": ("get_version", {}),
+    "get_supported_actions": ("get_supported_actions", {}),
+    "send_message": (
+        "send_message",
+        {
+            "detail_type": "group",
+            "group_id": "2",
+            "message": MESSAGE,
+            "bench.send_mode": "fast",
+        },
+    ),
+    "bad param": ("send_message", {"detail_type": "group", "message": "oops"}),
+}
+# 基准直接调用响应器时使用的已转换参数
+BASELINE_PARAMS: dict[str, dict[str, Any]] = {
+    "send_message": {
+        "detail_type": "group",
+        "bot": Bot(platform="bench", user_id="1", online=True),
+        "group_id": "2",
+        "message": [],
+        "send_mode": "fast",
+    },
+}
+
+
+def make_impl() -> OneBotImpl:
+    bot = Bot(platform="bench", user_id="1", online=True)
+    impl = OneBotImpl("bench", "0", [HTTP()], bot)
+
+    @impl.action("send_message")
+    async def _(
+        detail_type: str,
+        bot: Bot,
+        group_id: str = "",
+        user_id: str = "",
+        message: list[MessageSegment] = [],  # noqa: B006
+        send_mode: Annotated[Literal["strict", "fast"], "bench.send_mode"] = "strict",
+    ) -> dict[str, Any]:
+        return {"message_id": "1"}
+
+    return impl
+
+
+async def rate(func: Callable[[], Awaitable[Any]], rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await func()
+    return rounds / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    impl = make_impl()
+    print(f"{'':<24} {'baseline':>12} {'handle_action':>14} {'encoded':>12}  (actions/sec)")
+    for name, (action, params) in REQUESTS.items():
+        handler = impl.actions[action].handler
+        baseline_params = BASELINE_PARAMS.get(action, {})
+        # 请求参数由连接解码得到，每次都是新的字典
+        results = [
+            # 基准：直接调用响应器并编码响应，不做任何校验与分发
+            await rate(
+                lambda: _baseline(handler, baseline_params),
+                rounds,
+            ),
+            await rate(
+                lambda: _encode(impl.handle_action(action, dict(params))),
+                rounds,
+            ),
+            await rate(
+                lambda: impl.handle_action_encoded(action, dict(params), ContentType.JSON, echo="1"),
+                rounds,
+            ),
+        ]
+        print(f"{name:<24} {results[0]:>12,.0f} {results[1]:>14,.0f} {results[2]:>12,.0f}")
+
+
+async def _baseline(handler: Callable[..., Awaitable[Any]], params: dict[str, Any]) -> bytes:
+    data = await handler(**params)
+    return msgspec.json.encode(ActionResponse(status="ok", retcode=0, data=data, echo="1"))
+
+
+async def _encode(response: Awaitable[ActionResponse]) -> bytes:
+    return msgspec.json.encode(await response)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
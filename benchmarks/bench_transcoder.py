@@ -0,0 +1,79 @@
+"""消息转码基准测试。
+
+对比逐个 `re.finditer` 匹配并构建字典消息段的旧实现与 `core.transcoder.decode_text`
+在大段文本与大量提及的消息上的转换吞吐（messages/sec），并测量 `encode_message` 的吞吐。
+
+用法:
+    python benchmarks/bench_transcoder.py [次数]
+"""
+from __future__ import annotations
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import msgspec  # noqa: E402
+from core.transcoder import SendSegment, decode_text, encode_message  # noqa: E402
+
+MESSAGES = {
+    "short": "hello, world",
+    "large": "lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 200,
+    "mentions": "".join(f"@{uid} ping " for uid in range(1, 201)),
+    "mentions only": "".join(f"@{uid} " for uid in range(1, 201)),
+}
+OUTBOUND = msgspec.convert([
+    {"type": "reply", "data": {"message_id": "2978", "user_id": "12"}},
+    *(
+        segment
+        for uid in range(1, 51)
+        for segment in (
+            {"type": "mention", "data": {"user_id": str(uid)}},
+            {"type": "text", "data": {"text": "ping "}},
+        )
+    ),
+    {"type": "image", "data": {"file_id": "/2023/01/01/aaaa-bbbb"}},
+    {"type": "text", "data": {"text": "done"}},
+], list[SendSegment])
+
+
+def legacy_decode(content: str) -> list[dict]:
+    message = []
+    current_pos = 0
+    for match in re.finditer(r"@(\d+)\s", content):
+        if match.start() > current_pos:
+            pre_text = content[current_pos:match.start()]
+            if pre_text.strip():
+                message.append({"type": "text", "data": {"text": pre_text}})
+        message.append({"type": "mention", "data": {"user_id": match.group(1)}})
+        current_pos = match.end()
+    if current_pos < len(content):
+        message.append({"type": "text", "data": {"text": content[current_pos:]}})
+    if not message:
+        message.append({"type": "text", "data": {"text": content}})
+    return message
+
+
+def bench(name: str, func, arg, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(arg)
+    elapsed = time.perf_counter() - start
+    rate = rounds / elapsed
+    print(f"{name:<32} {rate:>12,.0f} messages/sec")
+    return rate
+
+
+def main() -> None:
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    for label, content in MESSAGES.items():
+        before = bench(f"{label}: finditer + dict", legacy_decode, content, rounds)
+        after = bench(f"{label}: decode_text", decode_text, content, rounds)
+        print(f"{label}: speedup {after / before:.2f}x")
+    bench("encode_message", encode_message, OUTBOUND, rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""webhook 消息解码基准测试。
+
+对比 `json.loads` + `.get()` 链与 `core.models.webhook_decoder` 的解码吞吐（payloads/sec）。
+
+用法:
+    python benchmarks/bench_webhook_decode.py [次数]
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.models import webhook_decoder  # noqa: E402
+
+PAYLOADS = [
+    {
+        "created_at": 1672048481664,
+        "detail": {
+            "content": "hello @12 how are you? " * 4,
+            "content_type": "text/plain",
+            "expires_in": None,
+            "properties": {"mentions": [12]},
+            "type": "normal",
+        },
+        "from_uid": 7910,
+        "mid": 2978,
+        "target": {"gid": 2},
+    },
+    {
+        "created_at": 1672048481664,
+        "detail": {
+            "content": "/2023/01/01/aaaa-bbbb",
+            "content_type": "vocechat/file",
+            "properties": {
+                "content_type": "image/png",
+                "name": "screenshot.png",
+                "size": 123456,
+            },
+            "type": "normal",
+        },
+        "from_uid": 7910,
+        "mid": 2979,
+        "target": {"uid": 1},
+    },
+    {
+        "created_at": 1672048481664,
+        "detail": {
+            "mid": 2978,
+            "content": "reply text",
+            "content_type": "text/plain",
+            "type": "reply",
+        },
+        "from_uid": 7910,
+        "mid": 2980,
+        "target": {"gid": 2},
+    },
+]
+BODIES = [json.dumps(p).encode() for p in PAYLOADS]
+
+
+def dict_path(body: bytes) -> tuple:
+    data = json.loads(body)
+    detail = data.get("detail", {})
+    properties = detail.get("properties") or {}
+    return (
+        str(data.get("mid", "")),
+        str(data.get("from_uid", "")),
+        "gid" in data.get("target", {}),
+        detail.get("type"),
+        detail.get("content", ""),
+        detail.get("content_type", ""),
+        properties.get("content_type", ""),
+    )
+
+
+def struct_path(body: bytes) -> tuple:
+    data = webhook_decoder.decode(body)
+    detail = data.detail
+    properties = detail.properties
+    return (
+        str(data.mid),
+        str(data.from_uid),
+        data.target.gid is not None,
+        type(detail).__name__,
+        detail.content,
+        detail.content_type,
+        properties.content_type if properties else "",
+    )
+
+
+def bench(name: str, func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for body in BODIES:
+            func(body)
+    elapsed = time.perf_counter() - start
+    rate = rounds * len(BODIES) / elapsed
+    print(f"{name:<24} {rate:>12,.0f} payloads/sec")
+    return rate
+
+
+def main() -> None:
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    before = bench("json.loads + .get()", dict_path, rounds)
+    after = bench("msgspec Decoder", struct_path, rounds)
+    print(f"speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
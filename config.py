@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 load_dotenv()
@@ -14,6 +15,8 @@ from pylibob import (
 CONNECTIONS = []
 IMPL_NAME = "vocechat-onebot"
 IMPL_VERSION = "0.1.0"
+# 两次状态更新事件之间的最小间隔(秒)，0 表示状态变化时立即推送
+STATUS_UPDATE_INTERVAL = float(os.getenv('STATUS_UPDATE_INTERVAL', '0'))
 # HTTP 配置
 if os.getenv('HTTP_ENABLED', 'false').lower() == 'true':
     CONNECTIONS.append(HTTP(
@@ -48,6 +51,21 @@ WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
 WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8000'))
 BOT_SERVER_URL = os.getenv('BOT_SERVER_URL', 'http://127.0.0.1:3000')
 
+# Webhook 接收队列配置（快速应答模式下请求只做校验并入队，由工作协程异步处理）
+WEBHOOK_FAST_ACK = os.getenv('WEBHOOK_FAST_ACK', 'true').lower() == 'true'
+WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000'))
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '4'))
+WEBHOOK_RETRY_AFTER = int(os.getenv('WEBHOOK_RETRY_AFTER', '1'))
+# Webhook 重复消息去重（按消息ID，VoceChat 超时重试时会重复推送）
+WEBHOOK_DEDUPE_SIZE = int(os.getenv('WEBHOOK_DEDUPE_SIZE', '10000'))
+WEBHOOK_DEDUPE_WINDOW = float(os.getenv('WEBHOOK_DEDUPE_WINDOW', '600'))
+# Webhook 服务器的 /stats 运行计数接口（默认关闭；启用时校验访问令牌，默认与 HTTP 连接相同）
+WEBHOOK_STATS_ENABLED = os.getenv('WEBHOOK_STATS_ENABLED', 'false').lower() == 'true'
+WEBHOOK_STATS_ACCESS_TOKEN = os.getenv('WEBHOOK_STATS_ACCESS_TOKEN') or os.getenv('HTTP_ACCESS_TOKEN', '')
+# 消息事件补充（推送前附加 vocechat.user_name 等扩展字段）
+EVENT_ENRICH_ENABLED = os.getenv('EVENT_ENRICH_ENABLED', 'true').lower() == 'true'
+EVENT_ENRICH_BUDGET = float(os.getenv('EVENT_ENRICH_BUDGET', '0.2'))
+
 # 配置 Vocechat 机器人信息
 BOT_CONFIG = Bot(
     platform=os.getenv('BOT_PLATFORM', 'vocechat'),
@@ -62,6 +80,71 @@ BOT_CONFIG = Bot(
 PROXY_ENABLED = os.getenv('PROXY_ENABLED', 'false').lower() == 'true'
 SEND_PROXY = os.getenv('SEND_PROXY', None)
 
+# VoceChat API 连接池配置
+VOCECHAT_CONN_LIMIT = int(os.getenv('VOCECHAT_CONN_LIMIT', '100'))
+VOCECHAT_CONN_LIMIT_PER_HOST = int(os.getenv('VOCECHAT_CONN_LIMIT_PER_HOST', '32'))
+VOCECHAT_DNS_CACHE_TTL = int(os.getenv('VOCECHAT_DNS_CACHE_TTL', '300'))
+VOCECHAT_KEEPALIVE_TIMEOUT = float(os.getenv('VOCECHAT_KEEPALIVE_TIMEOUT', '60'))
+VOCECHAT_CONNECT_TIMEOUT = float(os.getenv('VOCECHAT_CONNECT_TIMEOUT', '10'))
+VOCECHAT_READ_TIMEOUT = float(os.getenv('VOCECHAT_READ_TIMEOUT', '60'))
+
+# VoceChat API 重试与熔断配置
+RETRY_ATTEMPTS = int(os.getenv('RETRY_ATTEMPTS', '3'))
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '0.2'))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '5'))
+RETRY_ENDPOINTS = json.loads(os.getenv('RETRY_ENDPOINTS', '{}'))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', '30'))
+
+# 用户资料缓存配置
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '600'))
+USER_CACHE_NEGATIVE_TTL = float(os.getenv('USER_CACHE_NEGATIVE_TTL', '60'))
+USER_FETCH_CONCURRENCY = int(os.getenv('USER_FETCH_CONCURRENCY', '8'))
+GROUP_MEMBER_RESOLVE_TIMEOUT = float(os.getenv('GROUP_MEMBER_RESOLVE_TIMEOUT', '5'))
+USER_STORE_PATH = os.getenv('USER_STORE_PATH', 'friend_list.msgpack')
+USER_STORE_FLUSH_DELAY = float(os.getenv('USER_STORE_FLUSH_DELAY', '1'))
+
+# 消息发送配置
+SEND_MODE = os.getenv('SEND_MODE', 'strict')
+SEND_CONCURRENCY = int(os.getenv('SEND_CONCURRENCY', '4'))
+
+# 文件上传配置
+UPLOAD_BUFFER_SIZE = int(os.getenv('UPLOAD_BUFFER_SIZE', str(256 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', str(4 * 1024 * 1024)))
+# 上传缓存：相同内容（sha256）的文件不重复上传
+UPLOAD_CACHE_SIZE = int(os.getenv('UPLOAD_CACHE_SIZE', '10000'))
+UPLOAD_CACHE_TTL = float(os.getenv('UPLOAD_CACHE_TTL', str(7 * 24 * 3600)))
+UPLOAD_CACHE_PATH = os.getenv('UPLOAD_CACHE_PATH', 'upload_cache.msgpack')
+# 分片上传（upload_file_fragmented）暂存配置
+UPLOAD_SPOOL_DIR = os.getenv('UPLOAD_SPOOL_DIR', 'upload_spool')
+UPLOAD_FRAGMENT_TTL = float(os.getenv('UPLOAD_FRAGMENT_TTL', '3600'))
+UPLOAD_FRAGMENT_MAX_SIZE = int(os.getenv('UPLOAD_FRAGMENT_MAX_SIZE', '0'))
+# 文件缓存：get_file 下载的文件保存在本地目录，超出容量时淘汰最久未使用的文件
+FILE_CACHE_DIR = os.getenv('FILE_CACHE_DIR', 'file_cache')
+FILE_CACHE_MAX_BYTES = int(os.getenv('FILE_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+FILE_CACHE_PATH_LEASE = float(os.getenv('FILE_CACHE_PATH_LEASE', '300'))
+# webhook 附件预取：收到这些类型的文件消息时在后台下载到文件缓存（逗号分隔，如 image,voice；为空表示不预取）
+FILE_PREFETCH_TYPES = frozenset(t.strip() for t in os.getenv('FILE_PREFETCH_TYPES', '').split(',') if t.strip())
+FILE_PREFETCH_MAX_SIZE = int(os.getenv('FILE_PREFETCH_MAX_SIZE', str(10 * 1024 * 1024)))
+FILE_PREFETCH_CONCURRENCY = int(os.getenv('FILE_PREFETCH_CONCURRENCY', '2'))
+FILE_PREFETCH_MAX_PENDING = int(os.getenv('FILE_PREFETCH_MAX_PENDING', '100'))
+# 作为语音（voice）而不是音频（audio）消息段的文件类型（逗号分隔）
+VOICE_CONTENT_TYPES = frozenset(t.strip().lower() for t in os.getenv('VOICE_CONTENT_TYPES', 'audio/webm,audio/ogg,audio/amr').split(',') if t.strip())
+# 文件元数据（文件名、类型、大小）缓存的最大记录数
+FILE_META_CACHE_SIZE = int(os.getenv('FILE_META_CACHE_SIZE', '10000'))
+# 分片获取文件（get_file_fragmented）单个分片的最大大小
+DOWNLOAD_FRAGMENT_MAX_SIZE = int(os.getenv('DOWNLOAD_FRAGMENT_MAX_SIZE', str(8 * 1024 * 1024)))
+
+# 发送限速配置
+RATE_LIMIT_RATE = float(os.getenv('RATE_LIMIT_RATE', '10'))
+RATE_LIMIT_BURST = float(os.getenv('RATE_LIMIT_BURST', '20'))
+RATE_LIMIT_TARGET_RATE = float(os.getenv('RATE_LIMIT_TARGET_RATE', '2'))
+RATE_LIMIT_TARGET_BURST = float(os.getenv('RATE_LIMIT_TARGET_BURST', '10'))
+RATE_LIMIT_MAX_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT', '10'))
+
+# 群组缓存配置
+GROUP_CACHE_TTL = float(os.getenv('GROUP_CACHE_TTL', '300'))
+
 # 日志配置
 LOG_CONFIG = {
     'enabled': os.getenv('LOG_ENABLED', 'true').lower() == 'true',
@@ -4,75 +4,36 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import hashlib
 import json
 import mimetypes
 import os
 import time
-from typing import Any
+from contextlib import AsyncExitStack
+from typing import Annotated, Any, Literal
 from urllib.parse import urlparse
 
 import aiofiles
 import aiohttp
 from pylibob import Bot, OneBotImpl
+from pylibob.exception import BadParam, LogicError, OneBotImplError
+from core.client import VoceChatClient
+from core.download import read_range
 from core.logger import Logger
-from config import SEND_PROXY, PROXY_ENABLED
+from core.ratelimit import RateLimitExceeded
+from core.retry import CIRCUIT_OPEN, CircuitOpenError
+from core.sender import MessageSender, SendError
+from core.transcoder import SendSegment, encode_message
+from core.upload import ChecksumMismatch
+from config import (
+    DOWNLOAD_FRAGMENT_MAX_SIZE,
+    GROUP_MEMBER_RESOLVE_TIMEOUT,
+    SEND_CONCURRENCY,
+    SEND_MODE,
+    UPLOAD_BUFFER_SIZE,
+)
 log = Logger()
 logger = log.get_logger(filename="bot_actions")
-# --- Friend Management ---
-
-class FriendManager:
-    def __init__(self, impl: OneBotImpl):
-        self.impl = impl
-        self.friend_dict: dict[str, str] = {}
-        self.storage_path = "friend_list.json"
-        self.last_update_time = 0
-        self._load_friend_list()
-
-    def _load_friend_list(self) -> None:
-        """从文件加载好友列表"""
-        try:
-            if os.path.exists(self.storage_path):
-                with open(self.storage_path, "r", encoding="utf-8") as f:
-                    self.friend_dict = json.load(f)
-                # logger.debug("成功加载好友列表")
-        except Exception as e:
-            logger.error(f"加载好友列表失败: {e}")
-
-    def _save_friend_list(self) -> None:
-        """保存好友列表到文件"""
-        try:
-            with open(self.storage_path, "w", encoding="utf-8") as f:
-                json.dump(self.friend_dict, f, ensure_ascii=False, indent=2)
-            # logger.debug("成功保存好友列表")
-        except Exception as e:
-            logger.error(f"保存好友列表失败: {e}")
-
-    async def update_friend_info(self, user_id: str) -> None:
-        """更新好友信息"""
-        current_time = time.time()
-        if current_time - self.last_update_time < 600:  # 10分钟 = 600秒
-            return
-            
-        try:
-            bot = _get_bot(self.impl)
-            server_url = bot.extra["server_url"]
-            api_key = bot.extra["api_key"]
-
-            async with aiohttp.ClientSession() as session:
-                headers = {"x-api-key": api_key}
-                url = f"{server_url}/api/bot/user/{"{uid}"}?uid={user_id}"
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        self.friend_dict[user_id] = data.get("name", "")
-                        self._save_friend_list()
-                        self.last_update_time = current_time
-                        logger.debug(f"更新好友信息成功: {user_id}")
-                    else:
-                        logger.error(f"获取用户信息失败: {response.status}")
-        except Exception as e:
-            logger.error(f"更新好友信息失败: {e}")
-
 # --- Helper Functions --- (Moved from main.py)
 
 def _get_bot(impl: OneBotImpl) -> Bot:
@@ -82,127 +43,73 @@ def _get_bot(impl: OneBotImpl) -> Bot:
     # Assuming only one bot for now
     return list(impl.bots.values())[0]
 
-def _get_vocechat_headers(bot: Bot) -> dict[str, str]:
-    """Helper function to get Vocechat API request headers."""
-    return {
-        "x-api-key": bot.extra.get("api_key", ""),
-        "accept": "application/json",
-    }
-
-async def _vocechat_prepare_file(bot: Bot, session: aiohttp.ClientSession, filename: str, content_type: str) -> str:
-    """Calls the Vocechat prepare API and returns the file_id (string)."""
-    try:
-        api_base = bot.extra.get("server_url", "")
-        if not api_base:
-            raise ValueError("Missing server_url in bot configuration")
-            
-        headers = _get_vocechat_headers(bot)
-        # Prepare API needs JSON payload but returns plain text file_id
-        headers["accept"] = "*/*"
-        prepare_url = f"{api_base}/api/bot/file/prepare"
-        payload = {"filename": filename, "content_type": content_type}
-
-        try:
-            async with session.post(prepare_url, headers=headers, json=payload) as resp:
-                if resp.status >= 400:
-                    error_text = await resp.text()
-                    logger.error(f"文件准备API调用失败: HTTP {resp.status}, {error_text}")
-                    raise ValueError(f"Vocechat prepare API failed with status {resp.status}: {error_text}")
-                    
-                # Docs say it returns the file_id string directly
-                file_id = await resp.text()
-                if not file_id:
-                    raise ValueError("Vocechat prepare API returned an empty file_id")
-                return file_id.strip('"') # Remove potential surrounding quotes
-        except aiohttp.ClientError as e:
-            logger.error(f"文件准备API调用时网络错误: {e}")
-            raise ValueError(f"Network error during prepare file API call: {e}")
-    except Exception as e:
-        logger.error(f"文件准备过程中发生未处理的异常: {e}")
-        raise
-
-async def _vocechat_upload_file(bot: Bot, session: aiohttp.ClientSession, file_id: str, chunk_data: bytes, filename: str, content_type: str) -> dict[str, Any]:
-    """Calls the Vocechat upload API and returns the JSON response containing 'path'."""
-    try:
-        api_base = bot.extra.get("server_url", "")
-        if not api_base:
-            raise ValueError("Missing server_url in bot configuration")
-            
-        headers = _get_vocechat_headers(bot)
-        headers.update({
-            "accept": "*/*",
-            "cache-control": "no-cache",
-            "pragma": "no-cache"
-        })
-        # Remove Content-Type if present in base headers, as FormData sets it
-        headers.pop("Content-Type", None)
-
-        upload_url = f"{api_base}/api/bot/file/upload"
-
-        form = aiohttp.FormData()
-        form.add_field("file_id", file_id)
-        form.add_field("chunk_data", chunk_data, filename=filename, content_type=content_type)
-        # Docs: set chunk_is_last to true for single-part uploads
-        form.add_field("chunk_is_last", "true")
-
-        try:
-            async with session.post(upload_url, headers=headers, data=form, proxy=SEND_PROXY if PROXY_ENABLED else None) as resp:
-                if resp.status >= 400:
-                    error_text = await resp.text()
-                    logger.error(f"文件上传API调用失败: HTTP {resp.status}, {error_text}")
-                    raise ValueError(f"Vocechat upload API failed with status {resp.status}: {error_text}")
-                    
-                # Docs say the final response is JSON containing 'path'
-                if "application/json" in resp.headers.get("Content-Type", ""):
-                    try:
-                        result = await resp.json()
-                        if isinstance(result, dict) and "path" in result:
-                            return result
-                        else:
-                            logger.error(f"文件上传API响应缺少'path'字段: {result}")
-                            raise ValueError(f"Vocechat upload API response missing 'path': {result}")
-                    except json.JSONDecodeError as e:
-                        logger.error(f"解析文件上传响应时JSON解析错误: {e}")
-                        raise ValueError(f"Failed to parse JSON response from upload API: {e}")
-                else:
-                    text_response = await resp.text()
-                    logger.error(f"文件上传API未返回JSON格式: {text_response}")
-                    raise ValueError(f"Vocechat upload API did not return JSON: {text_response}")
-        except aiohttp.ClientError as e:
-            logger.error(f"文件上传API调用时网络错误: {e}")
-            raise ValueError(f"Network error during upload file API call: {e}")
-    except Exception as e:
-        logger.error(f"文件上传过程中发生未处理的异常: {e}")
-        raise
+def _get_client(impl: OneBotImpl) -> VoceChatClient:
+    """Helper function to get the shared Vocechat API client."""
+    if impl.vocechat is None:
+        raise RuntimeError("VoceChat client is not started")
+    if not impl.vocechat.api_key:
+        raise ValueError("Missing api_key in bot configuration")
+    return impl.vocechat
+
+def _error_retcode(error: BaseException | None) -> int:
+    """Maps errors raised by the Vocechat client layer to OneBot retcodes.
+
+    Walks the exception chain, since handlers re-raise client errors as ValueError,
+    and keeps the retcode of an OneBotImplError raised inside the handler.
+    """
+    from pylibob.status import (
+        BAD_PARAM,
+        FILESYSTEM_ERROR,
+        INTERNAL_HANDLER_ERROR,
+        NETWORK_ERROR,
+        PLATFORM_ERROR,
+    )
+    while error is not None:
+        if isinstance(error, OneBotImplError):
+            return error.retcode
+        if isinstance(error, ChecksumMismatch):
+            return BAD_PARAM
+        if isinstance(error, RateLimitExceeded):
+            return PLATFORM_ERROR
+        if isinstance(error, CircuitOpenError):
+            return CIRCUIT_OPEN
+        if isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError)):
+            return NETWORK_ERROR
+        if isinstance(error, OSError):
+            return FILESYSTEM_ERROR
+        error = error.__cause__ or error.__context__
+    return INTERNAL_HANDLER_ERROR
 
 # --- Action Handlers --- (Moved from main.py)
 
 def register_actions(impl: OneBotImpl):
     """Register OneBot actions with the implementation."""
-    friend_manager = FriendManager(impl)
 
     @impl.action("get_group_member_info")
     async def get_group_member_info(group_id: str, user_id: str) -> dict[str, Any]:
         """获取群成员信息"""
         try:
-            # 从friend_list获取用户昵称
-            user_name = friend_manager.friend_dict.get(user_id, "")
-            # 如果没有找到昵称，尝试更新好友信息
-            if not user_name:
-                await friend_manager.update_friend_info(user_id)
-                user_name = friend_manager.friend_dict.get(user_id, "")
+            client = _get_client(impl)
+            if not await client.groups.is_member(int(group_id), int(user_id)):
+                raise LogicError(
+                    message=f"User {user_id} is not a member of group {group_id}",
+                )
+
+            # 从用户资料缓存获取用户昵称
+            profile = await client.users.get(user_id)
+            user_name = profile.name if profile else ""
             
             return {
                 "user_id": user_id,
                 "user_name": user_name,
                 "user_displayname": user_name
             }
+        except OneBotImplError:
+            raise
         except Exception as e:
             logger.error(f"获取群成员信息失败: {e}")
-            from pylibob.exception import OneBotImplError
-            from pylibob.status import INTERNAL_HANDLER_ERROR
             raise OneBotImplError(
-                retcode=INTERNAL_HANDLER_ERROR,
+                retcode=_error_retcode(e),
                 message=f"Error getting group member info: {e}",
                 data=None
             )
@@ -211,54 +118,32 @@ def register_actions(impl: OneBotImpl):
     async def get_group_member_list(group_id: str) -> list[dict[str, Any]]:
         """获取群成员列表"""
         try:
-            bot = _get_bot(impl)
-            api_base = bot.extra.get("server_url", "")
-            if not api_base:
-                raise ValueError("Missing server_url in bot configuration")
-                
-            api_key = bot.extra.get("api_key", "")
-            if not api_key:
-                raise ValueError("Missing api_key in bot configuration")
-
-            headers = {
-                'x-api-key': api_key,
-                'accept': 'application/json; charset=utf-8'
-            }
-
-            async with aiohttp.ClientSession() as client:
-                endpoint = f'{api_base}/api/bot/group/{"{gid}"}?gid={group_id}'
-                async with client.get(endpoint, headers=headers, proxy=SEND_PROXY if PROXY_ENABLED else None) as response:
-                    if response.status >= 400:
-                        error_text = await response.text()
-                        logger.error(f"获取群组信息失败: HTTP {response.status}, {error_text}")
-                        raise ValueError(f"Failed to get group info: HTTP {response.status}, {error_text}")
-                    
-                    group_data = await response.json()
-                    members = group_data.get("members", [])
-                    
-                    # 获取每个成员的信息
-                    member_list = []
-                    for member_id in members:
-                        # 从friend_list获取用户昵称
-                        user_name = friend_manager.friend_dict.get(str(member_id), "")
-                        # 如果没有找到昵称，尝试更新好友信息
-                        if not user_name:
-                            await friend_manager.update_friend_info(str(member_id))
-                            user_name = friend_manager.friend_dict.get(str(member_id), "")
-                        
-                        member_list.append({
-                            "user_id": str(member_id),
-                            "user_name": user_name,
-                            "user_displayname": user_name
-                        })
-                    
-                    return member_list
+            client = _get_client(impl)
+            group = await client.groups.get(int(group_id))
+            members = client.groups.index.members(group.gid)
+
+            # 缓存中的昵称直接返回，未命中的成员并发获取，超时未完成的昵称为空
+            user_ids = [str(member_id) for member_id in members]
+            profiles = await client.users.get_many(
+                user_ids,
+                timeout=GROUP_MEMBER_RESOLVE_TIMEOUT,
+            )
+            member_list = []
+            for user_id in user_ids:
+                profile = profiles.get(user_id)
+                user_name = profile.name if profile else ""
+                member_list.append({
+                    "user_id": user_id,
+                    "user_name": user_name,
+                    "user_displayname": user_name
+                })
+            
+            return member_list
         except Exception as e:
             logger.error(f"获取群成员列表失败: {e}")
             from pylibob.exception import OneBotImplError
-            from pylibob.status import INTERNAL_HANDLER_ERROR
             raise OneBotImplError(
-                retcode=INTERNAL_HANDLER_ERROR,
+                retcode=_error_retcode(e),
                 message=f"Error getting group member list: {e}",
                 data=None
             )
@@ -267,39 +152,16 @@ def register_actions(impl: OneBotImpl):
     async def get_group_info(group_id: str) -> dict[str, Any]:
         """获取群组信息"""
         try:
-            bot = _get_bot(impl)
-            api_base = bot.extra.get("server_url", "")
-            if not api_base:
-                raise ValueError("Missing server_url in bot configuration")
-                
-            api_key = bot.extra.get("api_key", "")
-            if not api_key:
-                raise ValueError("Missing api_key in bot configuration")
-
-            headers = {
-                'x-api-key': api_key,
-                'accept': 'application/json; charset=utf-8'
+            group = await _get_client(impl).groups.get(int(group_id))
+            return {
+                "group_id": str(group.gid),
+                "group_name": group.name
             }
-
-            async with aiohttp.ClientSession() as client:
-                endpoint = f'{api_base}/api/bot/group/{"{gid}"}?gid={group_id}'
-                async with client.get(endpoint, headers=headers, proxy=SEND_PROXY if PROXY_ENABLED else None) as response:
-                    if response.status >= 400:
-                        error_text = await response.text()
-                        logger.error(f"获取群组信息失败: HTTP {response.status}, {error_text}")
-                        raise ValueError(f"Failed to get group info: HTTP {response.status}, {error_text}")
-                    
-                    group_data = await response.json()
-                    return {
-                        "group_id": str(group_data.get("gid", "")),
-                        "group_name": group_data.get("name", "")
-                    }
         except Exception as e:
             logger.error(f"获取群组信息时发生未处理的异常: {e}")
             from pylibob.exception import OneBotImplError
-            from pylibob.status import INTERNAL_HANDLER_ERROR
             raise OneBotImplError(
-                retcode=INTERNAL_HANDLER_ERROR,
+                retcode=_error_retcode(e),
                 message=f"Error getting group info: {e}",
                 data=None
             )
@@ -308,10 +170,10 @@ def register_actions(impl: OneBotImpl):
     async def get_friend_list() -> list[dict[str, Any]]:
         """获取好友列表"""
         friend_list = []
-        for user_id, name in friend_manager.friend_dict.items():
+        for user_id, profile in _get_client(impl).users.items():
             friend_list.append({
                 "user_id": user_id,
-                "user_name": name,
+                "user_name": profile.name,
                 "user_displayname": "",
                 "user_remark": ""
             })
@@ -322,170 +184,57 @@ def register_actions(impl: OneBotImpl):
         detail_type: str,
         user_id: str = "",
         group_id: str = "",
-        message: list[dict[str, Any]] = None,
+        message: list[SendSegment] = None,
+        send_mode: Annotated[Literal["strict", "fast"], "vocechat.send_mode"] = SEND_MODE,
     ) -> dict[str, Any]:
         try:
-            bot = _get_bot(impl)
-            api_base = bot.extra.get("server_url", "")
-            if not api_base:
-                raise ValueError("Missing server_url in bot configuration")
-                
-            api_key = bot.extra.get("api_key", "")
-            if not api_key:
-                raise ValueError("Missing api_key in bot configuration")
-                
-            message_id = "0"  # 初始化message_id变量
-
-            headers = {
-                'x-api-key': api_key,
-                'accept': 'application/json; charset=utf-8'
-            }
-
-            if message and isinstance(message, list) and len(message) > 0:
-                # 处理多个消息段
-                text_segments = []
-                file_segments = []
-                reply_segments = []
-
-                for segment in message:
-                    msg_type = segment.get("type")
-                    if not msg_type:
-                        logger.warning("消息段缺少类型信息，已跳过")
-                        continue
-                        
-                    msg_data = segment.get("data", {})
-
-                    if msg_type in ["image", "voice", "audio", "video", "file"]:
-                        # 处理文件类型的消息段
-                        file_id = msg_data.get("file_id")
-                        if not file_id:
-                            raise ValueError(f"Missing 'file_id' for message type '{msg_type}'")
-                        file_segments.append({"type": msg_type, "file_id": file_id})
-                    elif msg_type == "text":
-                        text_segments.append(msg_data.get("text", ""))
-                    elif msg_type == "mention":
-                        # 处理@消息段
-                        mention_user_id = msg_data.get("user_id")
-                        if mention_user_id:
-                            text_segments.append(f"@{mention_user_id} ")
-                    elif msg_type == "reply":
-                        # 处理回复类型的消息段
-                        message_id = msg_data.get("message_id")
-                        if not message_id:
-                            raise ValueError("Missing 'message_id' for reply message type")
-                        reply_segments.append({
-                            "message_id": message_id,
-                            "user_id": msg_data.get("user_id", "")
-                        })
-                    else:
-                        # 对于不支持的类型，添加提示文本
-                        logger.warning(f"不支持的消息类型: {msg_type}")
-                        text_segments.append(f"[Unsupported message type: {msg_type}]")
+            client = _get_client(impl)
+            message_ids: list[str] = []
+
+            if message:
+                if detail_type == "private":
+                    if not user_id: raise ValueError("Missing 'user_id' for private message")
+                    endpoint = f'/api/bot/send_to_user/{user_id}'
+                    rate_limit = f"user:{user_id}"
+                elif detail_type == "group":
+                    if not group_id: raise ValueError("Missing 'group_id' for group message")
+                    endpoint = f'/api/bot/send_to_group/{group_id}'
+                    rate_limit = f"group:{group_id}"
+                else:
+                    raise ValueError(f"Unsupported detail_type: {detail_type}")
 
-                send_text_via_reply = bool(reply_segments) and text_segments
-                if send_text_via_reply:
-                    reply_segment = reply_segments[0]
-                    try:
-                        endpoint = f'{api_base}/api/bot/reply/{reply_segment["message_id"]}'
-                        if reply_segment["user_id"]:
-                            endpoint = f'{endpoint}?user_id={reply_segment["user_id"]}'
-                        payload = "".join(text_segments)
-                        headers['Content-Type'] = 'text/plain'
-                        async with aiohttp.ClientSession() as client:
-                            async with client.post(endpoint, data=str(payload).encode('utf-8'), headers=headers, proxy=SEND_PROXY if PROXY_ENABLED else None) as response:
-                                if response.status >= 400:
-                                    error_text = await response.text()
-                                    logger.error(f"发送回复文本消息失败: HTTP {response.status}, {error_text}")
-                                    raise ValueError(f"Failed to send reply text message: HTTP {response.status}, {error_text}")
-                    except aiohttp.ClientError as e:
-                        logger.error(f"发送回复文本消息时网络错误: {e}")
-                        raise ValueError(f"Network error while sending reply text message: {e}")
-                    except Exception as e:
-                        logger.error(f"发送回复文本消息时发生错误: {e}")
-                        raise ValueError(f"Error while sending reply text message: {e}")
-
-                # 发送file消息段
-                for file_segment in file_segments:
-                    try:
-                        if detail_type == "private":
-                            if not user_id: raise ValueError("Missing 'user_id' for private message")
-                            endpoint = f'{api_base}/api/bot/send_to_user/{user_id}'
-                        elif detail_type == "group":
-                            if not group_id: raise ValueError("Missing 'group_id' for group message")
-                            endpoint = f'{api_base}/api/bot/send_to_group/{group_id}'
-                        else:
-                            raise ValueError(f"Unsupported detail_type: {detail_type}")
-                            
-                        payload = {"path": file_segment["file_id"]}
-                        headers['Content-Type'] = 'vocechat/file'
-                        async with aiohttp.ClientSession() as client:
-                            async with client.post(endpoint, json=payload, headers=headers, proxy=SEND_PROXY if PROXY_ENABLED else None) as response:
-                                if response.status >= 400:
-                                    error_text = await response.text()
-                                    logger.error(f"发送文件消息失败: HTTP {response.status}, {error_text}")
-                                    raise ValueError(f"Failed to send file message: HTTP {response.status}, {error_text}")
-                    except aiohttp.ClientError as e:
-                        logger.error(f"发送文件消息时网络错误: {e}")
-                        raise ValueError(f"Network error while sending file message: {e}")
-                    except Exception as e:
-                        logger.error(f"发送文件消息时发生错误: {e}")
-                        raise ValueError(f"Error while sending file message: {e}")
-
-                # 发送text消息段
-                if text_segments and not send_text_via_reply:
-                    try:
-                        payload = "".join(text_segments)
-                        headers['Content-Type'] = 'text/plain'
-                        if detail_type == "private":
-                            if not user_id: raise ValueError("Missing 'user_id' for private message")
-                            endpoint = f'{api_base}/api/bot/send_to_user/{user_id}'
-                        elif detail_type == "group":
-                            if not group_id: raise ValueError("Missing 'group_id' for group message")
-                            endpoint = f'{api_base}/api/bot/send_to_group/{group_id}'
-                        else:
-                            raise ValueError(f"Unsupported detail_type: {detail_type}")
-
-                        async with aiohttp.ClientSession() as client:
-                            async with client.post(endpoint, data=str(payload).encode('utf-8'), headers=headers, proxy=SEND_PROXY if PROXY_ENABLED else None) as response:
-                                if response.status >= 400:
-                                    error_text = await response.text()
-                                    logger.error(f"发送文本消息失败: HTTP {response.status}, {error_text}")
-                                    raise ValueError(f"Failed to send text message: HTTP {response.status}, {error_text}")
-                                    
-                                response_data = await response.text()
-                                try:
-                                    parsed_response = json.loads(response_data)
-                                    # Vocechat send API might return message ID directly or in JSON
-                                    # Adjust based on actual Vocechat API response. Assume it might be a simple int ID.
-                                    if isinstance(parsed_response, int):
-                                        message_id = str(parsed_response)
-                                    elif isinstance(parsed_response, dict) and 'message_id' in parsed_response:
-                                        message_id = str(parsed_response['message_id'])
-                                    else:
-                                        # Fallback if response is unexpected JSON or plain text
-                                        message_id = response_data
-                                        logger.warning(f"消息ID格式异常: {response_data}")
-                                except json.JSONDecodeError:
-                                    # If response is not JSON, use the raw text as message_id (might be the ID directly)
-                                    message_id = response_data
-                    except aiohttp.ClientError as e:
-                        logger.error(f"发送文本消息时网络错误: {e}")
-                        raise ValueError(f"Network error while sending text message: {e}")
-                    except Exception as e:
-                        logger.error(f"发送文本消息时发生错误: {e}")
-                        raise ValueError(f"Error while sending text message: {e}")
+                # 按消息段顺序规划发送请求，strict 模式逐条发送，fast 模式并发发送
+                steps = encode_message(message)
+                try:
+                    message_ids = await MessageSender(
+                        client,
+                        concurrency=SEND_CONCURRENCY,
+                    ).send(
+                        endpoint,
+                        steps,
+                        strict=send_mode == "strict",
+                        rate_limit=rate_limit,
+                    )
+                except SendError as e:
+                    logger.error(f"发送消息失败: {e}")
+                    raise OneBotImplError(
+                        retcode=_error_retcode(e),
+                        message=f"Error sending message: {e}",
+                        data={"vocechat.message_ids": e.message_ids}
+                    )
 
             return {
-                "message_id": message_id,
-                "time": time.time()
+                "message_id": message_ids[-1] if message_ids else "0",
+                "time": time.time(),
+                "vocechat.message_ids": message_ids
             }
+        except OneBotImplError:
+            raise
         except Exception as e:
             logger.error(f"发送消息时发生未处理的异常: {e}")
             # 使用OneBotImplError抛出异常，让impl.py中的handle_action捕获并返回FailedActionResponse
-            from pylibob.exception import OneBotImplError
-            from pylibob.status import INTERNAL_HANDLER_ERROR
             raise OneBotImplError(
-                retcode=INTERNAL_HANDLER_ERROR,
+                retcode=_error_retcode(e),
                 message=f"Error sending message: {e}",
                 data=None
             )
@@ -498,11 +247,14 @@ def register_actions(impl: OneBotImpl):
         headers: dict[str, str] = None,
         path: str = "",
         data: str = "", # OneBot spec uses 'bytes' type, which is base64 string in JSON
-        sha256: str = "", # Not used in Vocechat API examples, but part of OneBot spec
+        sha256: str = "", # Used to look up the upload cache and verify the uploaded content
     ) -> dict[str, Any]:
         try:
-            bot = _get_bot(impl)
-            file_data: bytes | None = None
+            client = _get_client(impl)
+            # 提供了 sha256 时先查询上传缓存，命中则不读取文件也不请求网络
+            if sha256 and (record := client.uploader.cache.get(sha256.lower())) is not None:
+                return {"file_id": record.path}
+            source: dict[str, Any] | None = None
             content_type: str | None = None
             filename = name # Use provided name first
 
@@ -512,26 +264,30 @@ def register_actions(impl: OneBotImpl):
             if content_type is None:
                 content_type = "application/octet-stream" # Default
 
-            async with aiohttp.ClientSession() as session:
-                try:
+            try:
+                # 文件按 UPLOAD_CHUNK_SIZE 分块上传；url 与 path 来源流式读取，不整体读入内存
+                async with AsyncExitStack() as stack:
                     if type == "url":
                         if not url:
                             raise ValueError("Missing 'url' parameter for type 'url'")
                         try:
-                            async with session.get(url, headers=headers or {}) as resp:
-                                if resp.status >= 400:
-                                    error_text = await resp.text()
-                                    logger.error(f"下载URL文件失败: HTTP {resp.status}, {error_text}")
-                                    raise ValueError(f"Failed to download file from URL: HTTP {resp.status}")
-                                    
-                                file_data = await resp.read()
-                                # Update content_type from response header if available
-                                content_type = resp.headers.get("Content-Type", content_type)
-                                # Determine filename from URL if not provided
-                                if not filename:
-                                    parsed_url = urlparse(url)
-                                    filename = os.path.basename(parsed_url.path) or "downloaded_file"
-                                    # TODO: Check Content-Disposition header for filename
+                            # 下载外部URL不经过VoceChat代理，也不附带VoceChat鉴权头
+                            resp = await stack.enter_async_context(
+                                client.session.get(url, headers=headers or {})
+                            )
+                            if resp.status >= 400:
+                                error_text = await resp.text()
+                                logger.error(f"下载URL文件失败: HTTP {resp.status}, {error_text}")
+                                raise ValueError(f"Failed to download file from URL: HTTP {resp.status}")
+
+                            source = {"stream": resp.content.iter_chunked(UPLOAD_BUFFER_SIZE)}
+                            # Update content_type from response header if available
+                            content_type = resp.headers.get("Content-Type", content_type)
+                            # Determine filename from URL if not provided
+                            if not filename:
+                                parsed_url = urlparse(url)
+                                filename = os.path.basename(parsed_url.path) or "downloaded_file"
+                                # TODO: Check Content-Disposition header for filename
                         except aiohttp.ClientError as e:
                             logger.error(f"下载URL文件时网络错误: {e}")
                             raise ValueError(f"Network error while downloading from URL: {e}")
@@ -540,8 +296,10 @@ def register_actions(impl: OneBotImpl):
                         if not path:
                             raise ValueError("Missing 'path' parameter for type 'path'")
                         try:
-                            async with aiofiles.open(path, "rb") as f:
-                                file_data = await f.read()
+                            # 提前打开一次以便在上传前报告文件不存在或无权限
+                            async with aiofiles.open(path, "rb"):
+                                pass
+                            source = {"path": path}
                             # Determine filename from path if not provided
                             if not filename:
                                 filename = os.path.basename(path)
@@ -559,7 +317,7 @@ def register_actions(impl: OneBotImpl):
                         if not data:
                             raise ValueError("Missing 'data' parameter for type 'data'")
                         try:
-                            file_data = base64.b64decode(data)
+                            source = {"data": base64.b64decode(data)}
                         except Exception as e:
                             logger.error(f"解码base64数据失败: {e}")
                             raise ValueError(f"Failed to decode base64 data: {e}")
@@ -573,7 +331,7 @@ def register_actions(impl: OneBotImpl):
                         raise ValueError(f"Unsupported upload type: {type}")
 
                     # Final checks before uploading
-                    if file_data is None:
+                    if source is None:
                         raise ValueError("Could not retrieve file data")
                     if not filename:
                         raise ValueError("Could not determine filename")
@@ -582,11 +340,14 @@ def register_actions(impl: OneBotImpl):
                         content_type = "application/octet-stream"
 
                     try:
-                        # Step 1: Prepare file upload with Vocechat API (get temporary file_id string)
-                        temp_vocechat_file_id = await _vocechat_prepare_file(bot, session, filename, content_type)
-
-                        # Step 2: Upload file data with Vocechat API (get JSON response with 'path')
-                        upload_response = await _vocechat_upload_file(bot, session, temp_vocechat_file_id, file_data, filename, content_type)
+                        # Prepare a temporary file_id, then upload the data chunk by chunk
+                        upload_response = await client.uploader.upload(
+                            filename,
+                            content_type,
+                            sha256=sha256,
+                            lookup=not sha256,
+                            **source,
+                        )
 
                         # Extract 'path' from upload response. This 'path' acts as the persistent file_id for sending messages.
                         vocechat_path = upload_response.get("path")
@@ -597,41 +358,81 @@ def register_actions(impl: OneBotImpl):
                         # Return the 'path' as the 'file_id' for OneBot send_message action
                         return {"file_id": vocechat_path}
                     except ValueError as e:
-                        # 这里捕获的是_vocechat_prepare_file和_vocechat_upload_file中抛出的异常
+                        # 这里捕获的是分块上传中抛出的异常
                         logger.error(f"文件上传过程中发生错误: {e}")
                         raise
-                except Exception as e:
-                    logger.error(f"处理文件上传时发生错误: {e}")
-                    raise ValueError(f"Error during file upload processing: {e}")
+            except Exception as e:
+                logger.error(f"处理文件上传时发生错误: {e}")
+                raise ValueError(f"Error during file upload processing: {e}")
         except Exception as e:
             logger.error(f"文件上传时发生未处理的异常: {e}")
             # 使用OneBotImplError抛出异常，让impl.py中的handle_action捕获并返回FailedActionResponse
             from pylibob.exception import OneBotImplError
-            from pylibob.status import INTERNAL_HANDLER_ERROR
             raise OneBotImplError(
-                retcode=INTERNAL_HANDLER_ERROR,
+                retcode=_error_retcode(e),
                 message=f"Error uploading file: {e}",
                 data=None
             )
 
     @impl.action("upload_file_fragmented")
-    async def upload_file_fragmented(**kwargs: Any):
-        # Not implemented as OneBot spec doesn't match Vocechat API examples
-        # Vocechat API seems to use prepare + single upload call
-        raise NotImplementedError("Fragmented file upload is not currently supported by this implementation.")
+    async def upload_file_fragmented(
+        stage: Literal["prepare", "transfer", "finish"],
+        name: str = "",
+        total_size: int = 0,
+        file_id: str = "",
+        offset: int = 0,
+        data: bytes = b"",
+        sha256: str = "",
+    ) -> dict[str, Any] | None:
+        """分片上传文件
+
+        分片按偏移量写入暂存文件，可以乱序、并发传输；finish 阶段校验 sha256 后
+        将暂存文件分块上传到 VoceChat，返回可用于发送消息的 file_id。
+        """
+        try:
+            client = _get_client(impl)
+            if stage == "prepare":
+                if not name:
+                    raise ValueError("Missing 'name' parameter for stage 'prepare'")
+                return {"file_id": await client.fragments.prepare(name, total_size)}
+
+            if not file_id:
+                raise ValueError(f"Missing 'file_id' parameter for stage '{stage}'")
+            if stage == "transfer":
+                # JSON 中的 bytes 为 base64 字符串，已在参数校验时解码
+                await client.fragments.transfer(file_id, offset, data)
+                return None
+
+            # 上传到 VoceChat 失败时保留暂存文件，可以再次调用 finish 重试
+            async with client.fragments.finish(file_id, sha256) as session:
+                content_type, _ = mimetypes.guess_type(session.name)
+                upload_response = await client.uploader.upload(
+                    session.name,
+                    content_type or "application/octet-stream",
+                    path=session.path,
+                    sha256=await session.sha256(),
+                    verify=False,
+                )
+            vocechat_path = upload_response.get("path")
+            if not vocechat_path:
+                logger.error(f"上传响应中缺少'path'字段: {upload_response}")
+                raise ValueError(f"Could not extract 'path' from Vocechat upload response: {upload_response}")
+            return {"file_id": vocechat_path}
+        except OneBotImplError:
+            raise
+        except Exception as e:
+            logger.error(f"分片上传文件时发生错误: {e}")
+            raise OneBotImplError(
+                retcode=_error_retcode(e),
+                message=f"Error uploading file fragment: {e}",
+                data=None
+            )
 
     @impl.action("get_file")
     async def get_file(file_id: str, type: str) -> dict[str, Any]:
         """获取文件信息"""
         try:
-            bot = _get_bot(impl)
-            api_base = bot.extra.get("server_url", "")
-            if not api_base:
-                raise ValueError("Missing server_url in bot configuration")
-                
-            api_key = bot.extra.get("api_key", "")
-            if not api_key:
-                raise ValueError("Missing api_key in bot configuration")
+            client = _get_client(impl)
 
             # 从file_id中提取文件路径
             file_path = file_id
@@ -639,119 +440,114 @@ def register_actions(impl: OneBotImpl):
                 raise ValueError("Invalid file_id format")
 
             # 构建文件URL
-            file_url = f"{api_base}/api/resource/file?file_path={file_path}"
-            headers = {"x-api-key": api_key}
-
-            async with aiohttp.ClientSession() as session:
-                async with session.head(file_url, headers=headers, proxy=SEND_PROXY if PROXY_ENABLED else None) as response:
-                    if response.status >= 400:
-                        error_text = await response.text()
-                        logger.error(f"获取文件信息失败: HTTP {response.status}, {error_text}")
-                        raise ValueError(f"Failed to get file info: HTTP {response.status}, {error_text}")
-
-                    # 从响应头获取文件信息
-                    content_type = response.headers.get("Content-Type", "application/octet-stream")
-                    content_disposition = response.headers.get("Content-Disposition", "")
-                    filename = "unknown"
-                    if content_disposition:
-                        import re
-                        match = re.search(r'filename="?([^"]+)"?', content_disposition)
-                        if match:
-                            filename = match.group(1)
-                    else:
-                        # 从file_path中提取文件名
-                        filename = os.path.basename(file_path)
-
-                    result = {"name": filename}
-
-                    # 根据请求的类型返回不同格式的数据
-                    if type == "url":
-                        result["url"] = file_url
-                        result["headers"] = {"x-api-key": api_key}
-                    elif type == "path":
-                        # VoceChat不支持直接返回文件路径
-                        from pylibob.exception import OneBotImplError
-                        from pylibob.status import UNSUPPORTED_PARAM
-                        raise OneBotImplError(
-                            retcode=UNSUPPORTED_PARAM,
-                            message="Path type is not supported",
-                            data=None
-                        )
-                    elif type == "data":
-                        # 下载文件数据
-                        async with session.get(file_url, headers=headers, proxy=SEND_PROXY if PROXY_ENABLED else None) as data_response:
-                            if data_response.status >= 400:
-                                error_text = await data_response.text()
-                                logger.error(f"下载文件数据失败: HTTP {data_response.status}, {error_text}")
-                                raise ValueError(f"Failed to download file data: HTTP {data_response.status}, {error_text}")
-                            
-                            file_data = await data_response.read()
-                            result["data"] = base64.b64encode(file_data).decode()
-                            
-                            # 计算SHA256校验和
-                            import hashlib
-                            sha256 = hashlib.sha256(file_data).hexdigest()
-                            result["sha256"] = sha256
-                    else:
-                        from pylibob.exception import OneBotImplError
-                        from pylibob.status import UNSUPPORTED_PARAM
-                        raise OneBotImplError(
-                            retcode=UNSUPPORTED_PARAM,
-                            message=f"Unsupported file type: {type}",
-                            data=None
-                        )
-
-                    return result
-
+            file_url = client.url(f"/api/resource/file?file_path={file_path}")
+
+            # 根据请求的类型返回不同格式的数据
+            if type == "url":
+                # 已知文件（上传过、收到过或缓存过）的文件名来自元数据缓存，不需要请求服务器
+                info = await client.file_meta.get(file_path)
+                result = {"name": info.name, "url": file_url, "headers": client.headers}
+            elif type == "path":
+                # 文件下载到本地缓存目录，返回缓存文件的路径；调用方读取前文件不会被淘汰
+                async with client.files.use(file_path) as entry:
+                    client.files.lease(file_path)
+                result = {"name": entry.name, "path": os.path.abspath(client.files.local_path(entry))}
+            elif type == "data":
+                async with client.files.use(file_path) as entry:
+                    file_data = await client.files.read(entry)
+                result = {
+                    "name": entry.name,
+                    "data": base64.b64encode(file_data).decode(),
+                    # 计算SHA256校验和
+                    "sha256": hashlib.sha256(file_data).hexdigest(),
+                }
+            else:
+                from pylibob.status import UNSUPPORTED_PARAM
+                raise OneBotImplError(
+                    retcode=UNSUPPORTED_PARAM,
+                    message=f"Unsupported file type: {type}",
+                    data=None
+                )
+
+            return result
+
+        except OneBotImplError:
+            raise
         except Exception as e:
             logger.error(f"获取文件信息失败: {e}")
-            from pylibob.exception import OneBotImplError
-            from pylibob.status import INTERNAL_HANDLER_ERROR
             raise OneBotImplError(
-                retcode=INTERNAL_HANDLER_ERROR,
+                retcode=_error_retcode(e),
                 message=f"Error getting file info: {e}",
                 data=None
             )
 
     @impl.action("get_file_fragmented")
-    async def get_file_fragmented(**kwargs: Any):
-        # Not implemented - requires Vocechat API endpoint for chunked download
-        raise NotImplementedError("Fragmented file download is not currently supported by this implementation.")
+    async def get_file_fragmented(
+        stage: Literal["prepare", "transfer"],
+        file_id: str,
+        offset: int = 0,
+        size: int = 0,
+    ) -> dict[str, Any]:
+        """分片获取文件
 
+        prepare 阶段返回文件名与大小；transfer 阶段通过 Range 请求只下载
+        `[offset, offset + size)` 范围，多个分片可以并发获取。已在文件缓存中的文件直接从本地读取。
+        """
+        try:
+            client = _get_client(impl)
+            if not file_id:
+                raise ValueError("Invalid file_id format")
+
+            entry = client.files.peek(file_id)
+            if stage == "prepare":
+                if entry is not None:
+                    return {"name": entry.name, "total_size": entry.size, "sha256": ""}
+                info = await client.file_meta.get(file_id, need_size=True)
+                if info.size is None:
+                    raise ValueError(f"VoceChat did not report the size of {file_id}")
+                # VoceChat 不提供文件的 sha256，为空表示未知
+                return {"name": info.name, "total_size": info.size, "sha256": ""}
+
+            if offset < 0 or size < 0:
+                raise BadParam(message=f"Invalid fragment range: offset={offset}, size={size}")
+            if size > DOWNLOAD_FRAGMENT_MAX_SIZE:
+                raise BadParam(message=f"Fragment size {size} exceeds the limit of {DOWNLOAD_FRAGMENT_MAX_SIZE} bytes")
+            if entry is not None:
+                # 已缓存的文件直接从本地读取
+                with client.files.pin(file_id):
+                    return {"data": await client.files.read(entry, offset, size)}
+            return {"data": await read_range(client, file_id, offset, size)}
+        except OneBotImplError:
+            raise
+        except Exception as e:
+            logger.error(f"分片获取文件失败: {e}")
+            raise OneBotImplError(
+                retcode=_error_retcode(e),
+                message=f"Error getting file fragment: {e}",
+                data=None
+            )
 
     @impl.action("get_self_info")
     async def get_self_info() -> dict[str, Any]:
         try:
             bot = _get_bot(impl)
-            api_base = bot.extra.get("server_url", "")
-            if not api_base:
-                raise ValueError("Missing server_url in bot configuration")
-                
-            api_key = bot.extra.get("api_key", "")
-            if not api_key:
-                raise ValueError("Missing api_key in bot configuration")
-
-            endpoint = f'{api_base}/api/bot/user/{"{uid}"}?uid={bot.user_id}'
-            headers = {
-                'x-api-key': api_key,
-                'accept': 'application/json; charset=utf-8'
-            }
+            client = _get_client(impl)
+            headers = {'accept': 'application/json; charset=utf-8'}
 
-            async with aiohttp.ClientSession() as client:
-                try:
-                    async with client.get(endpoint, headers=headers) as response:
-                        if response.status >= 400:
-                            error_text = await response.text()
-                            logger.error(f"获取自身信息失败: HTTP {response.status}, {error_text}")
-                            raise ValueError(f"Failed to get self info: HTTP {response.status}, {error_text}")
+            try:
+                async with client.get("/api/bot/user/{uid}", params={"uid": bot.user_id}, headers=headers) as response:
+                    if response.status >= 400:
+                        error_text = await response.text()
+                        logger.error(f"获取自身信息失败: HTTP {response.status}, {error_text}")
+                        raise ValueError(f"Failed to get self info: HTTP {response.status}, {error_text}")
                         
-                        response_data = await response.json()
-                except aiohttp.ClientError as e:
-                    logger.error(f"获取自身信息时网络错误: {e}")
-                    raise ValueError(f"Network error while getting self info: {e}")
-                except json.JSONDecodeError as e:
-                    logger.error(f"解析自身信息响应时JSON解析错误: {e}")
-                    raise ValueError(f"JSON decode error while parsing self info response: {e}")
+                    response_data = await response.json()
+            except aiohttp.ClientError as e:
+                logger.error(f"获取自身信息时网络错误: {e}")
+                raise ValueError(f"Network error while getting self info: {e}")
+            except json.JSONDecodeError as e:
+                logger.error(f"解析自身信息响应时JSON解析错误: {e}")
+                raise ValueError(f"JSON decode error while parsing self info response: {e}")
 
             return {
                 "user_id": bot.user_id,
@@ -762,9 +558,8 @@ def register_actions(impl: OneBotImpl):
             logger.error(f"获取自身信息时发生未处理的异常: {e}")
             # 使用OneBotImplError抛出异常，让impl.py中的handle_action捕获并返回FailedActionResponse
             from pylibob.exception import OneBotImplError
-            from pylibob.status import INTERNAL_HANDLER_ERROR
             raise OneBotImplError(
-                retcode=INTERNAL_HANDLER_ERROR,
+                retcode=_error_retcode(e),
                 message=f"Error getting self info: {e}",
                 data=None
             )
@@ -772,51 +567,23 @@ def register_actions(impl: OneBotImpl):
     @impl.action("get_user_info")
     async def get_user_info(user_id: str) -> dict[str, Any]:
         try:
-            bot = _get_bot(impl)
-            api_base = bot.extra.get("server_url", "")
-            if not api_base:
-                raise ValueError("Missing server_url in bot configuration")
-                
-            api_key = bot.extra.get("api_key", "")
-            if not api_key:
-                raise ValueError("Missing api_key in bot configuration")
-
-            endpoint = f'{api_base}/api/bot/user/{"{uid}"}?uid={user_id}'
-            headers = {
-                'x-api-key': api_key,
-                'accept': 'application/json; charset=utf-8'
-            }
-
-            async with aiohttp.ClientSession() as client:
-                try:
-                    async with client.get(endpoint, headers=headers) as response:
-                        if response.status >= 400:
-                            error_text = await response.text()
-                            logger.error(f"获取用户信息失败: HTTP {response.status}, {error_text}")
-                            raise ValueError(f"Failed to get user info: HTTP {response.status}, {error_text}")
-                        
-                        response_data = await response.json()
-                except aiohttp.ClientError as e:
-                    logger.error(f"获取用户信息时网络错误: {e}")
-                    raise ValueError(f"Network error while getting user info: {e}")
-                except json.JSONDecodeError as e:
-                    logger.error(f"解析用户信息响应时JSON解析错误: {e}")
-                    raise ValueError(f"JSON decode error while parsing user info response: {e}")
+            profile = await _get_client(impl).users.get(user_id)
+            if profile is None:
+                raise LogicError(message=f"Failed to get user info: user {user_id} not found")
 
             return {
                 "user_id": user_id,
-                "user_name": response_data.get("name", ""),
-                "user_displayname": response_data.get("name", ""),
-                "user_avatar": f"{api_base}/api/resource/avatar?uid={user_id}",
+                "user_name": profile.name,
+                "user_displayname": profile.name,
+                "user_avatar": profile.avatar,
                 "user_remark": ""
             }
         except Exception as e:
             logger.error(f"获取用户信息时发生未处理的异常: {e}")
             # 使用OneBotImplError抛出异常，让impl.py中的handle_action捕获并返回FailedActionResponse
             from pylibob.exception import OneBotImplError
-            from pylibob.status import INTERNAL_HANDLER_ERROR
             raise OneBotImplError(
-                retcode=INTERNAL_HANDLER_ERROR,
+                retcode=_error_retcode(e),
                 message=f"Error getting user info: {e}",
                 data=None
             )
@@ -827,56 +594,66 @@ def register_actions(impl: OneBotImpl):
     @impl.action("get_group_list")
     async def get_group_list() -> dict[str, Any]:
         try:
-            bot = _get_bot(impl)
-            api_base = bot.extra.get("server_url", "")
-            if not api_base:
-                raise ValueError("Missing server_url in bot configuration")
-                
-            api_key = bot.extra.get("api_key", "")
-            if not api_key:
-                raise ValueError("Missing api_key in bot configuration")
-        
-            endpoint = f'{api_base}/api/bot'
-            headers = {
-                'x-api-key': api_key,
-                'accept': 'application/json; charset=utf-8'
-            }
-        
-            async with aiohttp.ClientSession() as client:
-                try:
-                    async with client.get(endpoint, headers=headers) as response:
-                        if response.status >= 400:
-                            error_text = await response.text()
-                            logger.error(f"获取群组列表失败: HTTP {response.status}, {error_text}")
-                            raise ValueError(f"Failed to get group list: HTTP {response.status}, {error_text}")
-                        
-                        response_data = await response.json()
-                except aiohttp.ClientError as e:
-                    logger.error(f"获取群组列表时网络错误: {e}")
-                    raise ValueError(f"Network error while getting group list: {e}")
-                except json.JSONDecodeError as e:
-                    logger.error(f"解析群组列表响应时JSON解析错误: {e}")
-                    raise ValueError(f"JSON decode error while parsing group list response: {e}")
-        
             groups = []
-            try:
-                for group in response_data:
-                    groups.append({
-                        "group_id": str(group.get("gid", "")),
-                        "group_name": group.get("name", "")
-                    })
-            except Exception as e:
-                logger.error(f"处理群组数据时发生错误: {e}")
-                raise ValueError(f"Error processing group data: {e}")
+            for group in await _get_client(impl).groups.list():
+                groups.append({
+                    "group_id": str(group.gid),
+                    "group_name": group.name
+                })
         
             return groups
         except Exception as e:
             logger.error(f"获取群组列表时发生未处理的异常: {e}")
             # 使用OneBotImplError抛出异常，让impl.py中的handle_action捕获并返回FailedActionResponse
             from pylibob.exception import OneBotImplError
-            from pylibob.status import INTERNAL_HANDLER_ERROR
             raise OneBotImplError(
-                retcode=INTERNAL_HANDLER_ERROR,
+                retcode=_error_retcode(e),
                 message=f"Error getting group list: {e}",
                 data=None
             )
+
+    @impl.action("vocechat.refresh_group_cache")
+    async def refresh_group_cache(group_id: str | None = None) -> list[dict[str, Any]]:
+        """[扩展动作]立即从服务器刷新群组缓存，不指定 group_id 时刷新群组列表"""
+        try:
+            groups = await _get_client(impl).groups.refresh(
+                int(group_id) if group_id else None,
+            )
+            return [
+                {
+                    "group_id": str(group.gid),
+                    "group_name": group.name,
+                    "member_count": group.member_count
+                }
+                for group in groups
+            ]
+        except Exception as e:
+            logger.error(f"刷新群组缓存失败: {e}")
+            from pylibob.exception import OneBotImplError
+            raise OneBotImplError(
+                retcode=_error_retcode(e),
+                message=f"Error refreshing group cache: {e}",
+                data=None
+            )
+
+    @impl.action("vocechat.get_common_groups")
+    async def get_common_groups(user_ids: list[str]) -> list[dict[str, Any]]:
+        """[扩展动作]获取多个用户共同所在的群组（基于已缓存的群组成员）"""
+        try:
+            groups = _get_client(impl).groups
+            await groups.list()
+            return [
+                {
+                    "group_id": str(gid),
+                    "group_name": group.name if (group := groups.peek(gid)) else ""
+                }
+                for gid in groups.index.common_groups(*map(int, user_ids))
+            ]
+        except Exception as e:
+            logger.error(f"获取共同群组失败: {e}")
+            from pylibob.exception import OneBotImplError
+            raise OneBotImplError(
+                retcode=_error_retcode(e),
+                message=f"Error getting common groups: {e}",
+                data=None
+            )
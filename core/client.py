@@ -0,0 +1,450 @@
+"""VoceChat API 客户端。"""
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+import time
+from typing import Any, AsyncIterator
+
+import aiohttp
+import msgspec
+from pylibob import Bot
+from core.download import FileMetaCache
+from core.file_cache import FileCache
+from core.fragment import FragmentedUploads
+from core.group_cache import GroupCache
+from core.logger import Logger
+from core.ratelimit import RateLimiter, RateLimitExceeded
+from core.retry import CircuitBreaker, RetryPolicy
+from core.upload import ChunkedUploader
+from core.upload_cache import UploadCache
+from core.user_cache import UserCache
+from config import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    FILE_CACHE_DIR,
+    FILE_CACHE_MAX_BYTES,
+    FILE_CACHE_PATH_LEASE,
+    FILE_META_CACHE_SIZE,
+    FILE_PREFETCH_CONCURRENCY,
+    FILE_PREFETCH_MAX_PENDING,
+    GROUP_CACHE_TTL,
+    PROXY_ENABLED,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_MAX_WAIT,
+    RATE_LIMIT_RATE,
+    RATE_LIMIT_TARGET_BURST,
+    RATE_LIMIT_TARGET_RATE,
+    RETRY_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_ENDPOINTS,
+    RETRY_MAX_DELAY,
+    SEND_PROXY,
+    UPLOAD_BUFFER_SIZE,
+    UPLOAD_CACHE_PATH,
+    UPLOAD_CACHE_SIZE,
+    UPLOAD_CACHE_TTL,
+    UPLOAD_CHUNK_SIZE,
+    UPLOAD_FRAGMENT_MAX_SIZE,
+    UPLOAD_FRAGMENT_TTL,
+    UPLOAD_SPOOL_DIR,
+    USER_CACHE_NEGATIVE_TTL,
+    USER_CACHE_TTL,
+    USER_FETCH_CONCURRENCY,
+    USER_STORE_FLUSH_DELAY,
+    USER_STORE_PATH,
+    VOCECHAT_CONN_LIMIT,
+    VOCECHAT_CONN_LIMIT_PER_HOST,
+    VOCECHAT_CONNECT_TIMEOUT,
+    VOCECHAT_DNS_CACHE_TTL,
+    VOCECHAT_KEEPALIVE_TIMEOUT,
+    VOCECHAT_READ_TIMEOUT,
+)
+
+log = Logger()
+logger = log.get_logger(filename="client")
+
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+_GATEWAY_ERRORS = frozenset({502, 503, 504})
+
+
+def _parse_retry_after(value: str | None, default: float = 1.0) -> float:
+    """解析 `Retry-After` 响应头（秒数或 HTTP 日期）。"""
+    if not value:
+        return default
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+def default_retry_policies(**default: Any) -> dict[str, RetryPolicy]:
+    """默认的重试策略表（按方法与路径前缀）。
+
+    GET 可以安全重试；其他 POST 只在请求未发出或服务器返回 503 时重试，
+    包括会追加数据的 `/api/bot/file/upload`（中断后由 `ChunkedUploader` 从头上传）。
+
+    Args:
+        **default: `RetryPolicy` 的公共参数（`attempts` `base_delay` `max_delay`）
+
+    Returns:
+        重试策略表
+    """
+    return {
+        "GET": RetryPolicy(**default),
+        "POST": RetryPolicy(**default, idempotent=False),
+        # 预上传只会生成新的临时文件 ID，可以安全重试
+        "/api/bot/file/prepare": RetryPolicy(**default),
+    }
+
+
+class VoceChatClient:
+    """VoceChat API 客户端。
+
+    持有一个长期存在的 `aiohttp.ClientSession`，所有动作与 webhook 共用同一个连接池，
+    请求 VoceChat 时复用 keep-alive 连接而不是每次重新建立 TCP/TLS 连接。
+
+    客户端同时持有基于它的共享缓存（用户资料缓存 `users`、群组缓存 `groups`、文件缓存 `files`），随客户端一起加载与关闭。
+
+    发送类请求通过 `limiter` 按全局与目标限速，服务器返回 429 时按 `Retry-After` 暂停并在期限内重试。
+
+    请求失败时按路径对应的 `RetryPolicy` 退避重试；连续失败时熔断器 `breaker` 打开，
+    在 VoceChat 恢复前所有请求立即失败，不再堆积等待中的请求与连接。
+
+    需要在 Runner 的 startup 生命周期中调用 `start`，shutdown 生命周期中调用 `close`。
+
+    Attributes:
+        server_url (str): VoceChat 服务器地址
+        api_key (str): 机器人 API Key
+        proxy (str | None): 请求 VoceChat 时使用的代理地址
+        limit (int): 连接池总连接数上限，0 表示不限制
+        limit_per_host (int): 单个主机的连接数上限，0 表示不限制
+        dns_cache_ttl (int): DNS 缓存时间，单位: 秒
+        keepalive_timeout (float): 空闲连接保持时间，单位: 秒
+        connect_timeout (float): 建立连接的超时时间，单位: 秒
+        read_timeout (float): 读取响应的超时时间，单位: 秒
+        retry_policies (dict[str, RetryPolicy]): 按路径前缀配置的重试策略，`GET`/`POST` 为默认策略
+        users (UserCache): 用户资料缓存
+        groups (GroupCache): 群组缓存
+        limiter (RateLimiter): 发送限速器
+        breaker (CircuitBreaker): 熔断器
+        uploader (ChunkedUploader): 分块上传
+        fragments (FragmentedUploads): 分片上传的暂存文件
+        files (FileCache): VoceChat 文件的本地磁盘缓存
+        file_meta (FileMetaCache): VoceChat 文件的元数据缓存
+        retries (int): 重试次数
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        api_key: str,
+        *,
+        proxy: str | None = None,
+        limit: int = 100,
+        limit_per_host: int = 32,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 60.0,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0,
+        retry_policies: dict[str, RetryPolicy] | None = None,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        """初始化 VoceChat API 客户端。
+
+        Args:
+            server_url (str): VoceChat 服务器地址
+            api_key (str): 机器人 API Key
+            proxy (str | None): 请求 VoceChat 时使用的代理地址
+            limit (int): 连接池总连接数上限，0 表示不限制
+            limit_per_host (int): 单个主机的连接数上限，0 表示不限制
+            dns_cache_ttl (int): DNS 缓存时间，单位: 秒
+            keepalive_timeout (float): 空闲连接保持时间，单位: 秒
+            connect_timeout (float): 建立连接的超时时间，单位: 秒
+            read_timeout (float): 读取响应的超时时间，单位: 秒
+            retry_policies (dict[str, RetryPolicy] | None): 按路径前缀配置的重试策略
+            breaker (CircuitBreaker | None): 熔断器
+        """
+        self.server_url = server_url.rstrip("/")
+        self.api_key = api_key
+        self.proxy = proxy
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retry_policies = {**default_retry_policies(), **(retry_policies or {})}
+        self.breaker = breaker or CircuitBreaker()
+        self.retries = 0
+        self._session: aiohttp.ClientSession | None = None
+        self.users = UserCache(
+            self,
+            ttl=USER_CACHE_TTL,
+            negative_ttl=USER_CACHE_NEGATIVE_TTL,
+            concurrency=USER_FETCH_CONCURRENCY,
+            storage_path=USER_STORE_PATH,
+            flush_delay=USER_STORE_FLUSH_DELAY,
+        )
+        self.groups = GroupCache(self, ttl=GROUP_CACHE_TTL)
+        self.limiter = RateLimiter(
+            rate=RATE_LIMIT_RATE,
+            burst=RATE_LIMIT_BURST,
+            target_rate=RATE_LIMIT_TARGET_RATE,
+            target_burst=RATE_LIMIT_TARGET_BURST,
+            max_wait=RATE_LIMIT_MAX_WAIT,
+        )
+        self.uploader = ChunkedUploader(
+            self,
+            chunk_size=UPLOAD_CHUNK_SIZE,
+            buffer_size=UPLOAD_BUFFER_SIZE,
+            cache=UploadCache(
+                max_entries=UPLOAD_CACHE_SIZE,
+                max_age=UPLOAD_CACHE_TTL,
+                storage_path=UPLOAD_CACHE_PATH,
+            ),
+        )
+        self.fragments = FragmentedUploads(
+            spool_dir=UPLOAD_SPOOL_DIR,
+            ttl=UPLOAD_FRAGMENT_TTL,
+            max_size=UPLOAD_FRAGMENT_MAX_SIZE,
+        )
+        self.file_meta = FileMetaCache(self, max_entries=FILE_META_CACHE_SIZE)
+        self.files = FileCache(
+            self,
+            directory=FILE_CACHE_DIR,
+            max_bytes=FILE_CACHE_MAX_BYTES,
+            buffer_size=UPLOAD_BUFFER_SIZE,
+            prefetch_concurrency=FILE_PREFETCH_CONCURRENCY,
+            prefetch_max_pending=FILE_PREFETCH_MAX_PENDING,
+            lease_time=FILE_CACHE_PATH_LEASE,
+        )
+
+    @classmethod
+    def from_bot(cls, bot: Bot) -> VoceChatClient:
+        """根据 Bot 配置与全局配置创建客户端。
+
+        Args:
+            bot (Bot): VoceChat 机器人
+
+        Returns:
+            VoceChat API 客户端
+        """
+        extra = bot.extra or {}
+        default = {
+            "attempts": RETRY_ATTEMPTS,
+            "base_delay": RETRY_BASE_DELAY,
+            "max_delay": RETRY_MAX_DELAY,
+        }
+        retry_policies = default_retry_policies(**default)
+        for prefix, policy in RETRY_ENDPOINTS.items():
+            retry_policies[prefix] = msgspec.convert({**default, **policy}, RetryPolicy)
+        return cls(
+            extra.get("server_url", ""),
+            extra.get("api_key", ""),
+            proxy=SEND_PROXY if PROXY_ENABLED else None,
+            limit=VOCECHAT_CONN_LIMIT,
+            limit_per_host=VOCECHAT_CONN_LIMIT_PER_HOST,
+            dns_cache_ttl=VOCECHAT_DNS_CACHE_TTL,
+            keepalive_timeout=VOCECHAT_KEEPALIVE_TIMEOUT,
+            connect_timeout=VOCECHAT_CONNECT_TIMEOUT,
+            read_timeout=VOCECHAT_READ_TIMEOUT,
+            retry_policies=retry_policies,
+            breaker=CircuitBreaker(
+                failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                reset_timeout=CIRCUIT_RESET_TIMEOUT,
+            ),
+        )
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """共享的 `aiohttp.ClientSession`。"""
+        if self._session is None or self._session.closed:
+            raise RuntimeError("VoceChat client is not started")
+        return self._session
+
+    @property
+    def headers(self) -> dict[str, str]:
+        """请求 VoceChat API 时附带的鉴权请求头。"""
+        return {"x-api-key": self.api_key}
+
+    def url(self, path: str) -> str:
+        """拼接 VoceChat API 地址。
+
+        Args:
+            path (str): 以 `/` 开头的 API 路径
+
+        Returns:
+            完整的 API 地址
+        """
+        if not self.server_url:
+            raise ValueError("Missing server_url in bot configuration")
+        return f"{self.server_url}{path}"
+
+    async def start(self) -> None:
+        """创建连接池与会话。"""
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=self.connect_timeout,
+            sock_read=self.read_timeout,
+        )
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        await self.users.load()
+        await self.uploader.cache.load()
+        await self.files.load()
+        self.fragments.start()
+        logger.info(
+            f"VoceChat 客户端已启动: {self.server_url} "
+            f"(limit={self.limit}, limit_per_host={self.limit_per_host}, "
+            f"proxy={self.proxy or '无'})",
+        )
+
+    async def close(self) -> None:
+        """关闭会话并释放连接池。"""
+        await self.users.close()
+        await self.uploader.cache.close()
+        await self.files.close()
+        self.fragments.close()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            logger.info("VoceChat 客户端已关闭")
+
+    def retry_policy(self, method: str, path: str) -> RetryPolicy:
+        """获取请求对应的重试策略。
+
+        优先使用路径前缀最长的配置，否则按 HTTP 方法是否幂等选择默认策略。
+
+        Args:
+            method (str): HTTP 方法
+            path (str): 以 `/` 开头的 API 路径
+
+        Returns:
+            重试策略
+        """
+        matched = ""
+        for prefix in self.retry_policies:
+            if prefix.startswith("/") and path.startswith(prefix) and len(prefix) > len(matched):
+                matched = prefix
+        if matched:
+            return self.retry_policies[matched]
+        return self.retry_policies["GET" if method in _IDEMPOTENT_METHODS else "POST"]
+
+    @asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        headers: dict[str, str] | None = None,
+        rate_limit: str | None = None,
+        retry: RetryPolicy | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """向 VoceChat API 发起请求，用于 `async with`。
+
+        自动附带 `x-api-key` 请求头与代理配置。服务器返回 429 时按 `Retry-After` 暂停，
+        并在限速器的等待期限内重试（发送类请求暂停对应目标的配额，其他请求只等待自身）；
+        网络错误与网关错误按重试策略退避重试。
+
+        Args:
+            method (str): HTTP 方法
+            path (str): 以 `/` 开头的 API 路径
+            headers (dict[str, str] | None): 额外的请求头
+            rate_limit (str | None): 限速目标标识（如 `group:1`），None 表示不限速
+            retry (RetryPolicy | None): 重试策略，None 表示按路径选择
+            **kwargs: 传入 `aiohttp.ClientSession.request` 的其他参数，
+                `data` 可以是返回请求体的函数，每次尝试时重新生成（如 `aiohttp.FormData`）
+
+        Raises:
+            RateLimitExceeded: 在等待期限内无法发送
+            CircuitOpenError: VoceChat 不可用，请求未发出
+        """
+        url = self.url(path)
+        headers = {**self.headers, **(headers or {})}
+        policy = retry or self.retry_policy(method, path)
+        deadline = time.monotonic() + self.limiter.max_wait
+        data = kwargs.pop("data", None)
+        attempt = 0
+        while True:
+            if rate_limit is not None:
+                await self.limiter.acquire(rate_limit, deadline=deadline)
+            self.breaker.before_request()
+            try:
+                response = await self.session.request(
+                    method,
+                    url,
+                    headers=headers,
+                    proxy=self.proxy,
+                    data=data() if callable(data) else data,
+                    **kwargs,
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.breaker.record_failure()
+                if attempt + 1 >= policy.attempts or not policy.should_retry_error(e):
+                    raise
+                error = f"{type(e).__name__}: {e}"
+            except BaseException:
+                self.breaker.abandon()
+                raise
+            else:
+                if response.status in _GATEWAY_ERRORS:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if response.status == 429 and policy.attempts > 1:
+                    retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                    response.release()
+                    logger.warning(f"VoceChat 限速: {method} {path}，{retry_after:.2f} 秒后重试")
+                    if rate_limit is not None:
+                        # 发送类请求暂停该目标，下一次 acquire 按 Retry-After 等待
+                        self.limiter.penalize(rate_limit, retry_after)
+                        continue
+                    # 其他请求不占用发送配额，只等待 Retry-After
+                    if time.monotonic() + retry_after > deadline:
+                        raise RateLimitExceeded(None, retry_after)
+                    self.limiter.throttled += 1
+                    await asyncio.sleep(retry_after)
+                    continue
+                if attempt + 1 >= policy.attempts or not policy.should_retry_status(response.status):
+                    break
+                error = f"HTTP {response.status}"
+                response.release()
+            delay = policy.backoff(attempt)
+            attempt += 1
+            self.retries += 1
+            logger.warning(
+                f"请求 VoceChat 失败: {method} {path} ({error})，"
+                f"{delay:.2f} 秒后第 {attempt} 次重试",
+            )
+            await asyncio.sleep(delay)
+        try:
+            yield response
+        finally:
+            response.release()
+
+    def get(self, path: str, **kwargs: Any):
+        """发起 GET 请求，参数同 `request`。"""
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs: Any):
+        """发起 POST 请求，参数同 `request`。"""
+        return self.request("POST", path, **kwargs)
+
+    def head(self, path: str, **kwargs: Any):
+        """发起 HEAD 请求，参数同 `request`。"""
+        return self.request("HEAD", path, **kwargs)
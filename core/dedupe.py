@@ -0,0 +1,101 @@
+"""webhook 消息去重。"""
+from __future__ import annotations
+
+from collections import OrderedDict
+import time
+from typing import Any
+
+
+class MessageDeduplicator:
+    """按消息 ID 去重的有界时间窗口索引。
+
+    VoceChat 在 webhook 超时后会重试推送，同一个 `mid` 可能到达多次。
+    索引按首次出现的顺序保存 `mid`，超过 `window` 秒或超过 `capacity` 条的最旧记录会被淘汰，
+    查询与记录均为 O(1)，内存占用不随运行时间增长。
+
+    `check` 只查询不记录，调用方在消息入队或处理成功后再 `mark`，
+    被拒绝（503）或处理失败（500）的消息在重试时仍会被处理。
+
+    Attributes:
+        capacity (int): 最多保存的消息 ID 数量
+        window (float): 去重时间窗口，单位: 秒
+        checked (int): 检查次数
+        hits (int): 命中（被判定为重复）次数
+        evicted (int): 因容量或过期被淘汰的记录数
+    """
+
+    def __init__(self, capacity: int = 10000, window: float = 600) -> None:
+        """初始化去重索引。
+
+        Args:
+            capacity (int): 最多保存的消息 ID 数量
+            window (float): 去重时间窗口，单位: 秒
+        """
+        self.capacity = max(capacity, 1)
+        self.window = window
+        self.checked = 0
+        self.hits = 0
+        self.evicted = 0
+        self._seen: OrderedDict[int, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def _expire(self, now: float) -> None:
+        while self._seen:
+            mid, seen_at = next(iter(self._seen.items()))
+            if now - seen_at <= self.window:
+                break
+            del self._seen[mid]
+            self.evicted += 1
+
+    def check(self, mid: int) -> bool:
+        """检查消息 ID 是否已经处理过，不记录。
+
+        Args:
+            mid (int): 消息 ID
+
+        Returns:
+            时间窗口内是否已经记录过
+        """
+        self.checked += 1
+        self._expire(time.monotonic())
+        if mid in self._seen:
+            self.hits += 1
+            return True
+        return False
+
+    def mark(self, mid: int) -> None:
+        """记录消息 ID。
+
+        只应在消息已入队或处理完成后调用，否则 VoceChat 对失败请求的重试会被误判为重复。
+
+        Args:
+            mid (int): 消息 ID
+        """
+        now = time.monotonic()
+        self._expire(now)
+        self._seen[mid] = now
+        self._seen.move_to_end(mid)
+        if len(self._seen) > self.capacity:
+            self._seen.popitem(last=False)
+            self.evicted += 1
+
+    def discard(self, mid: int) -> None:
+        """删除消息 ID 的记录，使其重试可以再次处理。
+
+        Args:
+            mid (int): 消息 ID
+        """
+        self._seen.pop(mid, None)
+
+    def dict(self) -> dict[str, Any]:
+        """转换为计数器字典。"""
+        return {
+            "size": len(self._seen),
+            "capacity": self.capacity,
+            "window": self.window,
+            "checked": self.checked,
+            "hits": self.hits,
+            "evicted": self.evicted,
+        }
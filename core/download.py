@@ -0,0 +1,217 @@
+"""文件下载：获取 VoceChat 文件信息与按范围读取文件。"""
+from __future__ import annotations
+
+import os
+import re
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
+from msgspec import Struct
+from core.logger import Logger
+
+if TYPE_CHECKING:
+    from core.client import VoceChatClient
+
+log = Logger()
+logger = log.get_logger(filename="download")
+
+_FILENAME = re.compile(r'filename="?([^";]+)"?')
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+class FileInfo(Struct):
+    """VoceChat 文件信息。
+
+    Attributes:
+        path (str): VoceChat 文件路径
+        name (str): 文件名
+        content_type (str): 文件 MIME 类型
+        size (int | None): 文件大小，未知时为 None
+        accept_ranges (bool): 服务器是否支持范围请求
+        etag (str): 服务器返回的 `ETag`，未知时为空
+    """
+
+    path: str
+    name: str
+    content_type: str = "application/octet-stream"
+    size: int | None = None
+    accept_ranges: bool = False
+    etag: str = ""
+
+
+def filename_from_headers(headers, file_path: str) -> str:
+    """从 `Content-Disposition` 响应头获取文件名，缺失时使用文件路径的最后一段。"""
+    content_disposition = headers.get("Content-Disposition", "")
+    if content_disposition and (match := _FILENAME.search(content_disposition)):
+        return match.group(1)
+    # 从file_path中提取文件名
+    return os.path.basename(file_path) or "unknown"
+
+
+async def head_file(client: VoceChatClient, file_path: str) -> FileInfo:
+    """通过 HEAD 请求获取文件信息。
+
+    Args:
+        client (VoceChatClient): VoceChat API 客户端
+        file_path (str): VoceChat 文件路径
+
+    Returns:
+        文件信息
+    """
+    params = {"file_path": file_path}
+    try:
+        async with client.head("/api/resource/file", params=params) as response:
+            if response.status >= 400:
+                error_text = await response.text()
+                logger.error(f"获取文件信息失败: HTTP {response.status}, {error_text}")
+                raise ValueError(f"Failed to get file info: HTTP {response.status}, {error_text}")
+            headers = response.headers
+    except aiohttp.ClientError as e:
+        logger.error(f"获取文件信息时网络错误: {e}")
+        raise ValueError(f"Network error while getting file info: {e}") from e
+    length = headers.get("Content-Length")
+    return FileInfo(
+        file_path,
+        filename_from_headers(headers, file_path),
+        headers.get("Content-Type", "application/octet-stream"),
+        int(length) if length and length.isdigit() else None,
+        headers.get("Accept-Ranges", "").lower() == "bytes",
+        headers.get("ETag", ""),
+    )
+
+
+class FileMetaCache:
+    """文件元数据缓存（VoceChat 文件路径 -> 文件信息）。
+
+    VoceChat 的文件路径对应的内容不会改变，元数据不设过期时间，超过 `max_entries` 条时淘汰最久未使用的记录。
+    除 HEAD 请求外，上传结果、文件缓存与 webhook 收到的文件消息属性都会写入缓存，
+    已知文件的 `get_file`（type=url）不需要请求服务器。
+
+    Attributes:
+        client (VoceChatClient): VoceChat API 客户端
+        max_entries (int): 最多保存的记录数
+        hits (int): 命中次数
+        misses (int): 未命中次数
+    """
+
+    def __init__(self, client: VoceChatClient, *, max_entries: int = 10000) -> None:
+        """初始化文件元数据缓存。
+
+        Args:
+            client (VoceChatClient): VoceChat API 客户端
+            max_entries (int): 最多保存的记录数
+        """
+        self.client = client
+        self.max_entries = max(max_entries, 1)
+        self.hits = 0
+        self.misses = 0
+        self._files: OrderedDict[str, FileInfo] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def peek(self, file_path: str) -> FileInfo | None:
+        """只读取缓存，不发起请求。"""
+        info = self._files.get(file_path)
+        if info is not None:
+            self._files.move_to_end(file_path)
+        return info
+
+    def put(self, info: FileInfo) -> FileInfo:
+        """写入文件信息，新信息中缺失的字段沿用已知的值。
+
+        Args:
+            info (FileInfo): 文件信息
+
+        Returns:
+            合并后的文件信息
+        """
+        if (known := self._files.get(info.path)) is not None:
+            info = FileInfo(
+                info.path,
+                info.name or known.name,
+                info.content_type or known.content_type,
+                info.size if info.size is not None else known.size,
+                info.accept_ranges or known.accept_ranges,
+                info.etag or known.etag,
+            )
+        self._files[info.path] = info
+        self._files.move_to_end(info.path)
+        while len(self._files) > self.max_entries:
+            self._files.popitem(last=False)
+        return info
+
+    async def get(self, file_path: str, *, need_size: bool = False) -> FileInfo:
+        """获取文件信息，不在缓存中时通过 HEAD 请求获取。
+
+        Args:
+            file_path (str): VoceChat 文件路径
+            need_size (bool): 缓存的信息缺少文件大小时是否重新请求
+
+        Returns:
+            文件信息
+        """
+        info = self.peek(file_path)
+        if info is not None and (info.size is not None or not need_size):
+            self.hits += 1
+            return info
+        self.misses += 1
+        return self.put(await head_file(self.client, file_path))
+
+    def dict(self) -> dict[str, Any]:
+        """转换为计数器字典。"""
+        return {
+            "size": len(self._files),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+async def read_range(client: VoceChatClient, file_path: str, offset: int, size: int) -> bytes:
+    """读取文件的 `[offset, offset + size)` 范围。
+
+    通过 `Range` 请求只下载需要的部分；服务器不支持范围请求时（返回 200）
+    跳过前面的数据并在读够后断开，内存占用仍不超过 `size`。
+
+    Args:
+        client (VoceChatClient): VoceChat API 客户端
+        file_path (str): VoceChat 文件路径
+        offset (int): 起始偏移量
+        size (int): 读取的字节数
+
+    Returns:
+        文件数据，超出文件末尾的部分会被截断
+    """
+    if size <= 0:
+        return b""
+    params = {"file_path": file_path}
+    headers = {"Range": f"bytes={offset}-{offset + size - 1}"}
+    try:
+        async with client.get("/api/resource/file", params=params, headers=headers) as response:
+            if response.status == 416:
+                # 起始偏移量超出文件末尾
+                return b""
+            if response.status >= 400:
+                error_text = await response.text()
+                logger.error(f"下载文件数据失败: HTTP {response.status}, {error_text}")
+                raise ValueError(f"Failed to download file data: HTTP {response.status}, {error_text}")
+            skip = offset
+            if response.status == 206:
+                match = _CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+                skip = max(offset - int(match.group(1)), 0) if match else 0
+            else:
+                logger.debug(f"服务器不支持范围请求，跳过前 {offset} 字节: {file_path}")
+            data = bytearray()
+            async for chunk in response.content.iter_chunked(256 * 1024):
+                if skip >= len(chunk):
+                    skip -= len(chunk)
+                    continue
+                data += chunk[skip:skip + size - len(data)]
+                skip = 0
+                if len(data) >= size:
+                    break
+            return bytes(data)
+    except aiohttp.ClientError as e:
+        logger.error(f"下载文件数据时网络错误: {e}")
+        raise ValueError(f"Network error while downloading file data: {e}") from e
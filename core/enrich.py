@@ -0,0 +1,136 @@
+"""事件补充：在推送消息事件前附加用户昵称、群组名称等扩展字段。"""
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+from core.logger import Logger
+from pylibob.event.message import MessageEvent
+
+if TYPE_CHECKING:
+    from core.client import VoceChatClient
+
+log = Logger()
+logger = log.get_logger(filename="enrich")
+
+Enricher = Callable[["VoceChatClient", MessageEvent, dict[str, Any]], Awaitable[None]]
+"""补充函数：读取事件，将扩展字段（不含平台前缀）写入第三个参数。"""
+
+
+async def enrich_user(client: VoceChatClient, event: MessageEvent, extra: dict[str, Any]) -> None:
+    """补充发送者的昵称与头像（`user_name` `user_avatar`）。"""
+    users = client.users
+    profile = users.peek(event.user_id)
+    if profile is None:
+        profile = await users.get(event.user_id)
+    if profile is not None:
+        extra["user_name"] = profile.name
+        extra["user_avatar"] = profile.avatar
+
+
+async def enrich_group(client: VoceChatClient, event: MessageEvent, extra: dict[str, Any]) -> None:
+    """补充群消息的群组名称（`group_name`）。"""
+    group_id = getattr(event, "group_id", None)
+    if group_id is None:
+        return
+    gid = int(group_id)
+    group = client.groups.peek(gid)
+    if group is None or not group.name:
+        group = await client.groups.get(gid)
+    extra["group_name"] = group.name
+
+
+class EventEnricher:
+    """消息事件补充阶段，位于 webhook 解析与 `impl.emit` 之间。
+
+    补充函数并发执行，结果写入事件的 `_extra`，推送时带上平台前缀（如 `vocechat.user_name`），
+    应用不需要在每条消息后再调用 `get_user_info`/`get_group_info`。
+
+    缓存命中时不请求服务器；未命中时最多等待 `budget` 秒，超时的字段不附加，事件照常推送，
+    未完成的请求在后台继续并写入缓存，之后的事件可以直接命中。
+
+    Attributes:
+        client (VoceChatClient): VoceChat API 客户端
+        platform (str): 扩展字段的平台前缀
+        budget (float): 缓存未命中时等待的最长时间，单位: 秒，0 表示只使用缓存
+        enrichers (list[Enricher]): 补充函数列表
+        enriched (int): 补充的事件数
+        timeouts (int): 超出等待时间的事件数
+        errors (int): 补充函数出错的次数
+    """
+
+    def __init__(
+        self,
+        client: VoceChatClient,
+        *,
+        platform: str = "vocechat",
+        budget: float = 0.2,
+        enrichers: list[Enricher] | None = None,
+    ) -> None:
+        """初始化事件补充阶段。
+
+        Args:
+            client (VoceChatClient): VoceChat API 客户端
+            platform (str): 扩展字段的平台前缀
+            budget (float): 缓存未命中时等待的最长时间，单位: 秒，0 表示只使用缓存
+            enrichers (list[Enricher] | None): 补充函数列表，None 表示使用内置的用户与群组补充
+        """
+        self.client = client
+        self.platform = platform
+        self.budget = max(budget, 0)
+        self.enrichers: list[Enricher] = (
+            enrichers if enrichers is not None else [enrich_user, enrich_group]
+        )
+        self.enriched = 0
+        self.timeouts = 0
+        self.errors = 0
+        self._background: set[asyncio.Task] = set()
+
+    def register(self, enricher: Enricher) -> Enricher:
+        """注册补充函数，可用作装饰器。"""
+        self.enrichers.append(enricher)
+        return enricher
+
+    async def _run(self, enricher: Enricher, event: MessageEvent, extra: dict[str, Any]) -> None:
+        try:
+            await enricher(self.client, event, extra)
+        except Exception as e:
+            self.errors += 1
+            logger.debug(f"补充事件字段失败: {getattr(enricher, '__name__', enricher)}, {e}")
+
+    async def enrich(self, event: MessageEvent) -> None:
+        """补充事件的扩展字段。
+
+        Args:
+            event (MessageEvent): 消息事件
+        """
+        if not self.enrichers:
+            return
+        extra: dict[str, Any] = {}
+        tasks = [asyncio.create_task(self._run(enricher, event, extra)) for enricher in self.enrichers]
+        _, pending = await asyncio.wait(tasks, timeout=self.budget)
+        if pending:
+            # 不取消未完成的补充函数：让请求在后台完成并写入缓存，其结果写入已不再使用的 extra
+            self.timeouts += 1
+            for task in pending:
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+            extra = dict(extra)
+        if extra:
+            event._extra = {**(event._extra or {}), **extra}  # noqa: SLF001
+            event._platform = self.platform  # noqa: SLF001
+        self.enriched += 1
+
+    def close(self) -> None:
+        """取消在后台运行的补充函数。"""
+        for task in self._background:
+            task.cancel()
+
+    def dict(self) -> dict[str, Any]:
+        """转换为计数器字典。"""
+        return {
+            "enriched": self.enriched,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "background": len(self._background),
+        }
@@ -0,0 +1,397 @@
+"""VoceChat 文件的本地磁盘缓存。"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterator
+
+import aiofiles
+import aiohttp
+from msgspec import Struct
+from core.download import FileInfo, filename_from_headers
+from core.logger import Logger
+from core.storage import DirectoryStore
+
+if TYPE_CHECKING:
+    from core.client import VoceChatClient
+
+log = Logger()
+logger = log.get_logger(filename="file_cache")
+
+_INDEX_NAME = "index.msgpack"
+# 缓存自己创建的文件：32 位十六进制名加原扩展名（最长 16 个字符），下载中的临时文件为 `.tmp`
+_LOCAL_NAME = re.compile(r"[0-9a-f]{32}(\.[^.]{0,15})?")
+
+
+class CachedFile(Struct, array_like=True):
+    """已缓存的文件。
+
+    Attributes:
+        local_name (str): 缓存目录中的文件名
+        size (int): 文件大小
+        name (str): 文件名（来自 `Content-Disposition`）
+        content_type (str): 文件 MIME 类型
+        used_at (float): 最近一次使用的时间（Unix 时间戳）
+    """
+
+    local_name: str
+    size: int
+    name: str
+    content_type: str = "application/octet-stream"
+    used_at: float = 0
+
+
+class FileCache:
+    """VoceChat 文件的本地磁盘缓存（VoceChat 文件路径 -> 本地文件）。
+
+    - 缓存文件总大小超过 `max_bytes` 时淘汰最久未使用的文件（LRU）。
+    - 下载先写入临时文件，完成后原子替换，读取方不会看到不完整的文件。
+    - 同一文件的并发请求只会下载一次（single-flight）。
+    - 索引通过 `DirectoryStore` 持久化，启动时与目录内容对账：
+      索引中缺失的文件被丢弃，不在索引中的缓存文件与临时文件被删除；
+      只删除符合缓存命名规则的文件，目录中的其他文件不受影响。
+
+    单个文件大于 `max_bytes` 时仍会下载并返回，在下一次写入缓存时被淘汰。
+
+    正在使用的文件不会被淘汰：`use` / `pin` 期间文件被固定，`lease` 在 `lease_time`
+    秒内保留交给调用方自行读取的文件（如 get_file 返回的本地路径）。
+    固定的文件可以让缓存暂时超出 `max_bytes`，解除固定后再淘汰。
+
+    `prefetch` 在后台预先下载文件（如 webhook 收到的附件），同时下载的数量不超过
+    `prefetch_concurrency`，等待中的预取超过 `prefetch_max_pending` 时丢弃新的预取。
+
+    Attributes:
+        client (VoceChatClient): VoceChat API 客户端
+        directory (str): 缓存目录
+        max_bytes (int): 缓存文件总大小上限，0 表示只保留最近一次下载的文件
+        buffer_size (int): 下载时每次读取的最大字节数
+        prefetch_max_pending (int): 最多同时等待或进行中的预取数
+        lease_time (float): `lease` 保留文件的时间，单位: 秒
+        total_bytes (int): 当前缓存文件总大小
+        hits (int): 命中次数
+        misses (int): 未命中次数
+        evicted (int): 淘汰的文件数
+        prefetched (int): 预取完成的文件数
+        prefetch_dropped (int): 因等待队列已满丢弃的预取数
+    """
+
+    def __init__(
+        self,
+        client: VoceChatClient,
+        *,
+        directory: str = "file_cache",
+        max_bytes: int = 1024 * 1024 * 1024,
+        buffer_size: int = 256 * 1024,
+        prefetch_concurrency: int = 2,
+        prefetch_max_pending: int = 100,
+        lease_time: float = 300,
+    ) -> None:
+        """初始化文件缓存。
+
+        Args:
+            client (VoceChatClient): VoceChat API 客户端
+            directory (str): 缓存目录
+            max_bytes (int): 缓存文件总大小上限，0 表示只保留最近一次下载的文件
+            buffer_size (int): 下载时每次读取的最大字节数
+            prefetch_concurrency (int): 同时进行的预取下载数
+            prefetch_max_pending (int): 最多同时等待或进行中的预取数
+            lease_time (float): `lease` 保留文件的时间，单位: 秒
+        """
+        self.client = client
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.buffer_size = max(buffer_size, 1)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.prefetch_max_pending = prefetch_max_pending
+        self.prefetched = 0
+        self.prefetch_dropped = 0
+        self.lease_time = lease_time
+        self._pins: dict[str, int] = {}
+        self._leases: dict[str, float] = {}
+        self._files: OrderedDict[str, CachedFile] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task[CachedFile]] = {}
+        self._prefetching: dict[str, asyncio.Task] = {}
+        self._prefetch_semaphore = asyncio.Semaphore(max(prefetch_concurrency, 1))
+        self._store = DirectoryStore(
+            os.path.join(directory, _INDEX_NAME),
+            CachedFile,
+            lambda: self._files,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """缓存是否启用。"""
+        return self.max_bytes > 0
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def local_path(self, entry: CachedFile) -> str:
+        """缓存文件的本地路径。"""
+        return os.path.join(self.directory, entry.local_name)
+
+    async def load(self) -> None:
+        """加载索引并与缓存目录对账。"""
+        if not self.enabled and not os.path.isdir(self.directory):
+            return
+        try:
+            files = await asyncio.to_thread(self._load)
+        except Exception as e:
+            logger.error(f"加载文件缓存失败: {e}")
+            return
+        for file_path, entry in sorted(files.items(), key=lambda item: item[1].used_at):
+            self._files[file_path] = entry
+            self.total_bytes += entry.size
+            self.client.file_meta.put(FileInfo(file_path, entry.name, entry.content_type, entry.size))
+        self._evict()
+        logger.info(f"已加载 {len(self._files)} 个缓存文件，共 {self.total_bytes} 字节")
+
+    def _load(self) -> dict[str, CachedFile]:
+        os.makedirs(self.directory, exist_ok=True)
+        files = self._store.load() if self._store.exists() else {}
+        on_disk = {
+            entry.name: entry.stat().st_size
+            for entry in os.scandir(self.directory)
+            if entry.is_file() and _LOCAL_NAME.fullmatch(entry.name)
+        }
+        files = {
+            file_path: entry
+            for file_path, entry in files.items()
+            if on_disk.get(entry.local_name) == entry.size
+        }
+        known = {entry.local_name for entry in files.values()}
+        for name in on_disk.keys() - known:
+            os.remove(os.path.join(self.directory, name))
+        return files
+
+    def peek(self, file_path: str) -> CachedFile | None:
+        """只读取缓存，不下载。
+
+        Args:
+            file_path (str): VoceChat 文件路径
+
+        Returns:
+            缓存的文件，不在缓存中时为 None
+        """
+        entry = self._files.get(file_path)
+        if entry is not None:
+            self.hits += 1
+            self._touch(file_path, entry)
+        return entry
+
+    def _touch(self, file_path: str, entry: CachedFile) -> None:
+        entry.used_at = time.time()
+        self._files.move_to_end(file_path)
+        self._store.record(file_path, entry)
+
+    async def fetch(self, file_path: str) -> CachedFile:
+        """获取缓存的文件，不在缓存中时下载。
+
+        Args:
+            file_path (str): VoceChat 文件路径
+
+        Returns:
+            缓存的文件，通过 `local_path` 获取本地路径
+        """
+        if (entry := self.peek(file_path)) is not None:
+            return entry
+        self.misses += 1
+        if (task := self._inflight.get(file_path)) is None:
+            task = asyncio.create_task(self._download(file_path))
+            self._inflight[file_path] = task
+            task.add_done_callback(lambda _: self._inflight.pop(file_path, None))
+        # shield: 单个调用方取消时不影响其他等待同一文件的调用方
+        return await asyncio.shield(task)
+
+    @asynccontextmanager
+    async def use(self, file_path: str) -> AsyncIterator[CachedFile]:
+        """获取缓存的文件（不在缓存中时下载），上下文中文件不会被淘汰。
+
+        Args:
+            file_path (str): VoceChat 文件路径
+
+        Yields:
+            缓存的文件
+        """
+        # 先固定再等待下载：下载完成到调用方恢复之间，其他下载的淘汰也会跳过该文件
+        with self.pin(file_path):
+            yield await self.fetch(file_path)
+
+    @contextmanager
+    def pin(self, file_path: str) -> Iterator[None]:
+        """上下文中文件不会被淘汰。
+
+        Args:
+            file_path (str): VoceChat 文件路径
+        """
+        self._pins[file_path] = self._pins.get(file_path, 0) + 1
+        try:
+            yield
+        finally:
+            if (count := self._pins.pop(file_path) - 1) > 0:
+                self._pins[file_path] = count
+            elif self.enabled:
+                self._evict()
+
+    def lease(self, file_path: str) -> None:
+        """在 `lease_time` 秒内保留文件，不被淘汰。
+
+        Args:
+            file_path (str): VoceChat 文件路径
+        """
+        expires_at = time.monotonic() + self.lease_time
+        self._leases[file_path] = max(self._leases.get(file_path, 0), expires_at)
+
+    def _pinned(self, file_path: str, now: float) -> bool:
+        if file_path in self._pins:
+            return True
+        expires_at = self._leases.get(file_path)
+        if expires_at is None:
+            return False
+        if expires_at <= now:
+            del self._leases[file_path]
+            return False
+        return True
+
+    def prefetch(self, file_path: str) -> bool:
+        """在后台下载文件到缓存，不等待下载完成。
+
+        Args:
+            file_path (str): VoceChat 文件路径
+
+        Returns:
+            是否发起了预取，已缓存、正在下载或等待队列已满时为 False
+        """
+        if file_path in self._files or file_path in self._inflight or file_path in self._prefetching:
+            return False
+        if len(self._prefetching) >= self.prefetch_max_pending:
+            self.prefetch_dropped += 1
+            return False
+        task = asyncio.create_task(self._prefetch(file_path))
+        self._prefetching[file_path] = task
+        task.add_done_callback(lambda _: self._prefetching.pop(file_path, None))
+        return True
+
+    async def _prefetch(self, file_path: str) -> None:
+        async with self._prefetch_semaphore:
+            if file_path in self._files:
+                return
+            try:
+                await self.fetch(file_path)
+            except Exception as e:
+                logger.warning(f"预取文件失败: {file_path}, {e}")
+                return
+            self.prefetched += 1
+
+    async def read(self, entry: CachedFile, offset: int = 0, size: int | None = None) -> bytes:
+        """读取缓存文件的内容。
+
+        Args:
+            entry (CachedFile): 缓存的文件
+            offset (int): 起始偏移量
+            size (int | None): 读取的字节数，None 表示读到文件末尾
+
+        Returns:
+            文件数据
+        """
+        async with aiofiles.open(self.local_path(entry), "rb") as f:
+            await f.seek(offset)
+            return await f.read(-1 if size is None else size)
+
+    async def _download(self, file_path: str) -> CachedFile:
+        await asyncio.to_thread(os.makedirs, self.directory, exist_ok=True)
+        tmp_path = os.path.join(self.directory, f"{uuid.uuid4().hex}.tmp")
+        try:
+            async with self.client.get("/api/resource/file", params={"file_path": file_path}) as response:
+                if response.status >= 400:
+                    error_text = await response.text()
+                    logger.error(f"下载文件数据失败: HTTP {response.status}, {error_text}")
+                    raise ValueError(f"Failed to download file data: HTTP {response.status}, {error_text}")
+                name = filename_from_headers(response.headers, file_path)
+                content_type = response.headers.get("Content-Type", "application/octet-stream")
+                size = 0
+                async with aiofiles.open(tmp_path, "wb") as f:
+                    async for chunk in response.content.iter_chunked(self.buffer_size):
+                        await f.write(chunk)
+                        size += len(chunk)
+        except aiohttp.ClientError as e:
+            _remove(tmp_path)
+            logger.error(f"下载文件数据时网络错误: {e}")
+            raise ValueError(f"Network error while downloading file data: {e}") from e
+        except BaseException:
+            _remove(tmp_path)
+            raise
+        # 文件名保留扩展名，便于按扩展名识别类型的应用直接使用本地路径
+        _, ext = os.path.splitext(name)
+        local_name = hashlib.sha256(file_path.encode()).hexdigest()[:32] + ext[:16]
+        await asyncio.to_thread(os.replace, tmp_path, os.path.join(self.directory, local_name))
+        entry = CachedFile(local_name, size, name, content_type, time.time())
+        if (old := self._files.pop(file_path, None)) is not None:
+            self.total_bytes -= old.size
+        self._files[file_path] = entry
+        self.total_bytes += size
+        self._store.record(file_path, entry)
+        self.client.file_meta.put(FileInfo(file_path, name, content_type, size))
+        self._evict(keep=file_path)
+        logger.debug(f"已缓存文件 {file_path}: {size} 字节")
+        return entry
+
+    def _evict(self, keep: str | None = None) -> None:
+        now = time.monotonic()
+        for file_path in list(self._files):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if file_path == keep or self._pinned(file_path, now):
+                continue
+            self.discard(file_path)
+            self.evicted += 1
+
+    def discard(self, file_path: str) -> None:
+        """从缓存中删除文件。"""
+        entry = self._files.pop(file_path, None)
+        if entry is None:
+            return
+        self.total_bytes -= entry.size
+        self._store.record(file_path, None)
+        _remove(self.local_path(entry))
+
+    async def close(self) -> None:
+        """取消未完成的下载与预取并写入索引快照。"""
+        for task in [*self._prefetching.values(), *self._inflight.values()]:
+            task.cancel()
+        if os.path.isdir(self.directory):
+            await self._store.close()
+
+    def dict(self) -> dict[str, Any]:
+        """转换为计数器字典。"""
+        return {
+            "size": len(self._files),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+            "prefetching": len(self._prefetching),
+            "prefetched": self.prefetched,
+            "prefetch_dropped": self.prefetch_dropped,
+            "pinned": len(self._pins),
+            "leased": len(self._leases),
+        }
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        # Windows 下正在被读取的文件无法删除
+        logger.warning(f"删除缓存文件失败: {path}, {e}")
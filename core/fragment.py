@@ -0,0 +1,299 @@
+"""分片上传：将 OneBot `upload_file_fragmented` 的分片按偏移量写入暂存文件。"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import hashlib
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from pylibob.exception import BadParam, LogicError
+from core.logger import Logger
+from core.upload import ChecksumMismatch
+
+log = Logger()
+logger = log.get_logger(filename="fragment")
+
+
+class FragmentedUpload:
+    """一个进行中的分片上传。
+
+    分片可以乱序、并发到达，按偏移量写入预分配大小的暂存文件；
+    sha256 随连续前缀的增长增量计算，`finish` 时不需要重新读取整个文件。
+
+    `write` 与 `sha256` 需要在持有 `lock` 时调用，同一上传的分片依次写入，
+    `finish` 期间不会再写入分片。
+
+    Attributes:
+        file_id (str): 分片上传 ID
+        name (str): 文件名
+        total_size (int): 文件总大小
+        path (str): 暂存文件路径
+        received (int): 已接收的字节数（含重复传输）
+        hashed (int): 已计算 sha256 的连续前缀长度
+        updated_at (float): 最近一次传输的时间（`time.monotonic`）
+        lock (asyncio.Lock): 上传的锁，写入分片与 `finish` 时持有
+    """
+
+    def __init__(self, file_id: str, name: str, total_size: int, path: str) -> None:
+        self.file_id = file_id
+        self.name = name
+        self.total_size = total_size
+        self.path = path
+        self.received = 0
+        self.hashed = 0
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+        self._sha256 = hashlib.sha256()
+        # 已写入但尚未计算 sha256 的区间，按起点排序且互不重叠
+        self._ranges: list[list[int]] = []
+        # 已计算 sha256 的区域被重新写入时需要在 finish 时重新计算
+        self._rehash = False
+
+    def _add_range(self, start: int, end: int) -> None:
+        index = bisect.bisect_left(self._ranges, [start, end])
+        self._ranges.insert(index, [start, end])
+        merged: list[list[int]] = []
+        for current in self._ranges:
+            if merged and current[0] <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], current[1])
+            else:
+                merged.append(current)
+        self._ranges = merged
+
+    def _write(self, offset: int, data: bytes) -> None:
+        with open(self.path, "r+b") as f:
+            f.seek(offset)
+            f.write(data)
+
+    def _hash_file(self, start: int, end: int, buffer_size: int = 1024 * 1024) -> None:
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            while start < end:
+                chunk = f.read(min(buffer_size, end - start))
+                if not chunk:
+                    raise OSError(f"Spool file {self.path} is shorter than expected")
+                self._sha256.update(chunk)
+                start += len(chunk)
+
+    async def write(self, offset: int, data: bytes) -> None:
+        """写入一个分片并推进 sha256。
+
+        Args:
+            offset (int): 分片在文件中的偏移量
+            data (bytes): 分片数据
+        """
+        end = offset + len(data)
+        await asyncio.to_thread(self._write, offset, data)
+        self.received += len(data)
+        self.updated_at = time.monotonic()
+        if offset < self.hashed:
+            self._rehash = True
+            if end <= self.hashed:
+                return
+        self._add_range(offset, end)
+        if not self._ranges or self._ranges[0][0] > self.hashed:
+            return
+        start, stop = self._ranges.pop(0)
+        if offset <= self.hashed and end == stop:
+            # 常见的顺序传输：直接用内存中的数据计算
+            self._sha256.update(memoryview(data)[self.hashed - offset:])
+        else:
+            await asyncio.to_thread(self._hash_file, self.hashed, stop)
+        self.hashed = stop
+
+    def missing(self) -> int | None:
+        """第一个未接收的偏移量，全部接收时为 None。"""
+        if self.hashed >= self.total_size:
+            return None
+        return self.hashed
+
+    async def sha256(self) -> str:
+        """文件的 sha256。"""
+        if self._rehash:
+            self._sha256 = hashlib.sha256()
+            await asyncio.to_thread(self._hash_file, 0, self.total_size)
+            self._rehash = False
+        return self._sha256.hexdigest()
+
+
+class FragmentedUploads:
+    """分片上传管理。
+
+    暂存文件保存在 `spool_dir` 中，完成、失败或超过 `ttl` 秒未收到分片的上传会被删除。
+    `start` 后每隔一段时间检查一次超时的上传，没有新的上传时暂存文件也会被清理。
+
+    Attributes:
+        spool_dir (str): 暂存目录
+        ttl (float): 上传闲置的最长时间，单位: 秒
+        max_size (int): 单个文件的最大大小，0 表示不限制
+        sessions (dict[str, FragmentedUpload]): 进行中的上传
+    """
+
+    def __init__(self, *, spool_dir: str = "upload_spool", ttl: float = 3600, max_size: int = 0) -> None:
+        """初始化分片上传管理。
+
+        Args:
+            spool_dir (str): 暂存目录
+            ttl (float): 上传闲置的最长时间，单位: 秒
+            max_size (int): 单个文件的最大大小，0 表示不限制
+        """
+        self.spool_dir = spool_dir
+        self.ttl = ttl
+        self.max_size = max_size
+        self.sessions: dict[str, FragmentedUpload] = {}
+        self._cleaned = False
+        self._expire_task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """启动定期清理超时上传的后台任务。"""
+        if self._expire_task is None and self.ttl > 0:
+            self._expire_task = asyncio.create_task(self._expire_loop())
+
+    async def _expire_loop(self) -> None:
+        interval = min(self.ttl, 60)
+        while True:
+            await asyncio.sleep(interval)
+            self._expire()
+
+    def _prepare_dir(self) -> None:
+        os.makedirs(self.spool_dir, exist_ok=True)
+        if self._cleaned:
+            return
+        # 清理上次运行遗留的暂存文件
+        for entry in os.scandir(self.spool_dir):
+            if entry.is_file() and entry.name.endswith(".part"):
+                os.remove(entry.path)
+        self._cleaned = True
+
+    def _create(self, path: str, total_size: int) -> None:
+        self._prepare_dir()
+        with open(path, "wb") as f:
+            f.truncate(total_size)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for file_id in [
+            file_id
+            for file_id, session in self.sessions.items()
+            # 正在写入或 finish 的上传不会被丢弃
+            if now - session.updated_at > self.ttl and not session.lock.locked()
+        ]:
+            logger.info(f"分片上传超时，已丢弃: {file_id}")
+            self.discard(file_id)
+
+    async def prepare(self, name: str, total_size: int) -> str:
+        """开始一个分片上传。
+
+        Args:
+            name (str): 文件名
+            total_size (int): 文件总大小
+
+        Returns:
+            分片上传 ID
+
+        Raises:
+            BadParam: 文件大小无效
+        """
+        if total_size < 0:
+            raise BadParam(message=f"Invalid total_size: {total_size}")
+        if self.max_size and total_size > self.max_size:
+            raise BadParam(message=f"File is too large: {total_size} > {self.max_size} bytes")
+        self._expire()
+        file_id = uuid.uuid4().hex
+        path = os.path.join(self.spool_dir, f"{file_id}.part")
+        await asyncio.to_thread(self._create, path, total_size)
+        self.sessions[file_id] = FragmentedUpload(file_id, name, total_size, path)
+        return file_id
+
+    def get(self, file_id: str) -> FragmentedUpload:
+        """获取进行中的上传。
+
+        Raises:
+            LogicError: 上传不存在或已过期
+        """
+        self._expire()
+        session = self.sessions.get(file_id)
+        if session is None:
+            raise LogicError(message=f"Unknown or expired fragmented upload: {file_id}")
+        return session
+
+    @asynccontextmanager
+    async def _locked(self, file_id: str) -> AsyncIterator[FragmentedUpload]:
+        session = self.get(file_id)
+        async with session.lock:
+            # 等待锁期间上传可能已被 finish 或超时丢弃
+            if self.sessions.get(file_id) is not session:
+                raise LogicError(message=f"Unknown or expired fragmented upload: {file_id}")
+            yield session
+
+    async def transfer(self, file_id: str, offset: int, data: bytes) -> None:
+        """接收一个分片。
+
+        Args:
+            file_id (str): 分片上传 ID
+            offset (int): 分片在文件中的偏移量
+            data (bytes): 分片数据
+
+        Raises:
+            BadParam: 分片超出文件范围
+            LogicError: 上传不存在或已过期
+        """
+        async with self._locked(file_id) as session:
+            if offset < 0 or offset + len(data) > session.total_size:
+                raise BadParam(
+                    message=f"Fragment [{offset}, {offset + len(data)}) is out of range for {session.total_size} bytes",
+                )
+            await session.write(offset, data)
+
+    @asynccontextmanager
+    async def finish(self, file_id: str, sha256: str = "") -> AsyncIterator[FragmentedUpload]:
+        """校验上传完整性，在上下文中使用暂存文件。
+
+        上下文中持有该上传的锁，同一上传的其他 `finish` 与 `transfer` 会等待；
+        上下文正常退出时丢弃上传，出错时保留暂存文件，可以再次调用 `finish` 重试。
+        sha256 不一致时上传被丢弃。
+
+        Args:
+            file_id (str): 分片上传 ID
+            sha256 (str): 文件的 sha256，为空时不校验
+
+        Yields:
+            完整的上传
+
+        Raises:
+            ChecksumMismatch: sha256 不一致
+            LogicError: 上传不存在或不完整
+        """
+        async with self._locked(file_id) as session:
+            if (missing := session.missing()) is not None:
+                raise LogicError(message=f"Fragmented upload {file_id} is incomplete, missing data at offset {missing}")
+            digest = await session.sha256()
+            if sha256 and digest != sha256.lower():
+                self.discard(file_id)
+                raise ChecksumMismatch(sha256.lower(), digest)
+            yield session
+            self.discard(file_id)
+
+    def discard(self, file_id: str) -> None:
+        """丢弃上传并删除暂存文件。"""
+        session = self.sessions.pop(file_id, None)
+        if session is None:
+            return
+        try:
+            os.remove(session.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"删除暂存文件失败: {session.path}, {e}")
+
+    def close(self) -> None:
+        """停止定期清理并丢弃所有进行中的上传。"""
+        if self._expire_task is not None:
+            self._expire_task.cancel()
+            self._expire_task = None
+        for file_id in list(self.sessions):
+            self.discard(file_id)
@@ -0,0 +1,248 @@
+"""VoceChat 群组缓存。"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any
+
+from msgspec import Struct
+from core.logger import Logger
+from core.membership import MembershipIndex
+
+if TYPE_CHECKING:
+    from core.client import VoceChatClient
+
+log = Logger()
+logger = log.get_logger(filename="group_cache")
+
+_HEADERS = {'accept': 'application/json; charset=utf-8'}
+
+
+class GroupInfo(Struct):
+    """群组信息。
+
+    Attributes:
+        gid (int): 群组 ID
+        name (str): 群组名称
+        member_count (int): 成员数量，公开群组为 0
+        is_public (bool): 是否为公开群组（所有用户均为成员）
+        fetched_at (float): 成员列表的获取时间（Unix 时间戳），0 表示只知道名称
+    """
+
+    gid: int
+    name: str = ""
+    member_count: int = 0
+    is_public: bool = False
+    fetched_at: float = 0
+
+
+class GroupCache:
+    """进程内共享的群组缓存（群组 ID -> 名称与成员）。
+
+    - 群组详情与群组列表分别在 `ttl` 秒后过期，过期后下次使用时重新请求。
+    - 同一群组（或群组列表）的并发查询只会发起一次请求（single-flight）。
+    - webhook 收到未知群组或未知成员的消息时通过 `observe` 让对应缓存失效。
+    - 成员关系保存在 `index` 中，支持成员判断与共同群组查询。
+
+    Attributes:
+        client (VoceChatClient): VoceChat API 客户端
+        ttl (float): 缓存过期时间，单位: 秒
+        index (MembershipIndex): 群组成员索引
+        hits (int): 命中次数
+        misses (int): 未命中（请求服务器）次数
+        invalidations (int): 失效次数
+    """
+
+    def __init__(self, client: VoceChatClient, *, ttl: float = 300) -> None:
+        """初始化群组缓存。
+
+        Args:
+            client (VoceChatClient): VoceChat API 客户端
+            ttl (float): 缓存过期时间，单位: 秒
+        """
+        self.client = client
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.index = MembershipIndex()
+        self._groups: dict[int, GroupInfo] = {}
+        self._listed_at = 0.0
+        self._inflight: dict[int | None, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def peek(self, gid: int) -> GroupInfo | None:
+        """只读取缓存，不发起请求。
+
+        Args:
+            gid (int): 群组 ID
+
+        Returns:
+            群组信息，不在缓存中时为 None
+        """
+        return self._groups.get(gid)
+
+    def _is_fresh(self, fetched_at: float) -> bool:
+        return time.time() - fetched_at < self.ttl
+
+    async def get(self, gid: int) -> GroupInfo:
+        """获取群组信息（含成员列表）。
+
+        Args:
+            gid (int): 群组 ID
+
+        Returns:
+            群组信息
+        """
+        group = self._groups.get(gid)
+        if group is not None and self._is_fresh(group.fetched_at):
+            self.hits += 1
+            return group
+        self.misses += 1
+        return await self._single_flight(gid, self._request_group)
+
+    async def list(self) -> list[GroupInfo]:
+        """获取机器人所在的所有群组。
+
+        Returns:
+            群组信息列表
+        """
+        if self._is_fresh(self._listed_at):
+            self.hits += 1
+            return list(self._groups.values())
+        self.misses += 1
+        return await self._single_flight(None, self._request_list)
+
+    async def _single_flight(self, key: int | None, request) -> Any:
+        if (task := self._inflight.get(key)) is None:
+            task = asyncio.create_task(request() if key is None else request(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: 单个调用方取消时不影响其他等待同一结果的调用方
+        return await asyncio.shield(task)
+
+    def _store(self, data: dict[str, Any], fetched_at: float) -> GroupInfo:
+        gid = int(data.get("gid", 0))
+        if "members" in data:
+            self.index.set_members(gid, map(int, data["members"] or []))
+        else:
+            # 列表接口未返回成员时保留已知成员，但不视为新鲜数据
+            cached = self._groups.get(gid)
+            fetched_at = cached.fetched_at if cached else 0
+        group = GroupInfo(
+            gid,
+            data.get("name", ""),
+            len(self.index.members(gid)),
+            bool(data.get("is_public", False)),
+            fetched_at,
+        )
+        self._groups[gid] = group
+        return group
+
+    async def _request_group(self, gid: int) -> GroupInfo:
+        async with self.client.get(
+            "/api/bot/group/{gid}",
+            params={"gid": str(gid)},
+            headers=_HEADERS,
+        ) as response:
+            if response.status >= 400:
+                error_text = await response.text()
+                logger.error(f"获取群组信息失败: HTTP {response.status}, {error_text}")
+                raise ValueError(f"Failed to get group info: HTTP {response.status}, {error_text}")
+            data = await response.json()
+        return self._store(data, time.time())
+
+    async def _request_list(self) -> list[GroupInfo]:
+        async with self.client.get("/api/bot", headers=_HEADERS) as response:
+            if response.status >= 400:
+                error_text = await response.text()
+                logger.error(f"获取群组列表失败: HTTP {response.status}, {error_text}")
+                raise ValueError(f"Failed to get group list: HTTP {response.status}, {error_text}")
+            data = await response.json()
+        now = time.time()
+        groups = [self._store(group, now) for group in data]
+        # 机器人已退出的群组不再保留
+        for gid in set(self._groups) - {group.gid for group in groups}:
+            self._drop(gid)
+        self._listed_at = now
+        logger.debug(f"已缓存 {len(groups)} 个群组")
+        return groups
+
+    def _drop(self, gid: int) -> None:
+        self._groups.pop(gid, None)
+        self.index.remove_group(gid)
+
+    def invalidate(self, gid: int | None = None) -> None:
+        """让缓存在下次使用时刷新。
+
+        Args:
+            gid (int | None): 群组 ID，None 表示所有群组与群组列表
+        """
+        self.invalidations += 1
+        if gid is None:
+            for group in self._groups.values():
+                group.fetched_at = 0
+            self._listed_at = 0
+            return
+        if (group := self._groups.get(gid)) is not None:
+            group.fetched_at = 0
+
+    def observe(self, gid: int, uid: int) -> None:
+        """根据收到的群消息判断缓存是否过时。
+
+        VoceChat 不会向机器人推送成员变动与群组变动事件，因此从消息推断：
+        来自未知群组的消息说明群组列表已变化，来自非成员的消息说明成员已变化。
+
+        Args:
+            gid (int): 群组 ID
+            uid (int): 发送者 ID
+        """
+        group = self._groups.get(gid)
+        if group is None:
+            if self._listed_at:
+                logger.debug(f"收到未知群组 {gid} 的消息，群组列表缓存失效")
+                self.invalidations += 1
+                self._listed_at = 0
+            return
+        if group.fetched_at and not group.is_public and not self.index.is_member(gid, uid):
+            logger.debug(f"群组 {gid} 出现新成员 {uid}，群组缓存失效")
+            self.invalidate(gid)
+
+    async def refresh(self, gid: int | None = None) -> list[GroupInfo]:
+        """立即从服务器刷新缓存。
+
+        Args:
+            gid (int | None): 群组 ID，None 表示刷新群组列表
+
+        Returns:
+            刷新后的群组信息
+        """
+        self.invalidate(gid)
+        if gid is None:
+            return await self.list()
+        return [await self.get(gid)]
+
+    async def is_member(self, gid: int, uid: int) -> bool:
+        """判断用户是否为群组成员，公开群组的所有用户均为成员。
+
+        Args:
+            gid (int): 群组 ID
+            uid (int): 用户 ID
+
+        Returns:
+            是否为成员
+        """
+        group = await self.get(gid)
+        return group.is_public or self.index.is_member(gid, uid)
+
+    def dict(self) -> dict[str, Any]:
+        """转换为计数器字典。"""
+        return {
+            "size": len(self._groups),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "index": self.index.memory(),
+        }
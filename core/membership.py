@@ -0,0 +1,152 @@
+"""群组成员索引。"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, insort
+import sys
+from typing import Any, Iterable
+
+_EMPTY = array("I")
+
+
+def _contains(values: array, value: int) -> bool:
+    index = bisect_left(values, value)
+    return index < len(values) and values[index] == value
+
+
+def _discard(values: array, value: int) -> None:
+    index = bisect_left(values, value)
+    if index < len(values) and values[index] == value:
+        del values[index]
+
+
+class MembershipIndex:
+    """群组成员的双向索引。
+
+    每个群组的成员与每个用户所在的群组都保存为有序的 `array('I')`（每个 ID 4 字节），
+    成员判断通过二分查找完成，为 O(log n)；共同群组通过有序数组求交集得到。
+
+    Attributes:
+        memberships (int): 成员关系总数
+    """
+
+    def __init__(self) -> None:
+        self._members: dict[int, array] = {}
+        self._groups_of: dict[int, array] = {}
+        self.memberships = 0
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def __contains__(self, gid: int) -> bool:
+        return gid in self._members
+
+    def set_members(self, gid: int, members: Iterable[int]) -> None:
+        """设置群组的成员，并同步更新反向索引。
+
+        Args:
+            gid (int): 群组 ID
+            members (Iterable[int]): 成员 ID
+        """
+        new = array("I", sorted(set(members)))
+        old = self._members.get(gid, _EMPTY)
+        if old == new:
+            return
+        old_set, new_set = set(old), set(new)
+        for uid in old_set - new_set:
+            self._unlink(uid, gid)
+        for uid in new_set - old_set:
+            insort(self._groups_of.setdefault(uid, array("I")), gid)
+        self.memberships += len(new) - len(old)
+        self._members[gid] = new
+
+    def remove_group(self, gid: int) -> None:
+        """移除群组及其所有成员关系。
+
+        Args:
+            gid (int): 群组 ID
+        """
+        members = self._members.pop(gid, None)
+        if members is None:
+            return
+        for uid in members:
+            self._unlink(uid, gid)
+        self.memberships -= len(members)
+
+    def _unlink(self, uid: int, gid: int) -> None:
+        groups = self._groups_of.get(uid)
+        if groups is None:
+            return
+        _discard(groups, gid)
+        if not groups:
+            del self._groups_of[uid]
+
+    def members(self, gid: int) -> array:
+        """获取群组的有序成员 ID 数组（只读）。
+
+        Args:
+            gid (int): 群组 ID
+
+        Returns:
+            成员 ID 数组，群组未知时为空数组
+        """
+        return self._members.get(gid, _EMPTY)
+
+    def groups_of(self, uid: int) -> array:
+        """获取用户所在的有序群组 ID 数组（只读）。
+
+        Args:
+            uid (int): 用户 ID
+
+        Returns:
+            群组 ID 数组，用户未知时为空数组
+        """
+        return self._groups_of.get(uid, _EMPTY)
+
+    def is_member(self, gid: int, uid: int) -> bool:
+        """判断用户是否为群组成员。
+
+        Args:
+            gid (int): 群组 ID
+            uid (int): 用户 ID
+
+        Returns:
+            是否为成员
+        """
+        return _contains(self._members.get(gid, _EMPTY), uid)
+
+    def common_groups(self, *uids: int) -> list[int]:
+        """获取多个用户共同所在的群组。
+
+        Args:
+            *uids (int): 用户 ID
+
+        Returns:
+            有序的群组 ID 列表
+        """
+        if not uids:
+            return []
+        arrays = sorted((self.groups_of(uid) for uid in uids), key=len)
+        common = set(arrays[0])
+        for groups in arrays[1:]:
+            common.intersection_update(groups)
+            if not common:
+                break
+        return sorted(common)
+
+    def memory(self) -> dict[str, Any]:
+        """统计索引的内存占用。
+
+        Returns:
+            群组数、用户数、成员关系数与占用字节数
+        """
+        size = sys.getsizeof(self._members) + sys.getsizeof(self._groups_of)
+        for index in (self._members, self._groups_of):
+            for key, values in index.items():
+                size += sys.getsizeof(key) + sys.getsizeof(values)
+        return {
+            "groups": len(self._members),
+            "users": len(self._groups_of),
+            "memberships": self.memberships,
+            "bytes": size,
+        }
@@ -0,0 +1,94 @@
+"""VoceChat webhook 数据模型。
+
+使用 msgspec `Struct` 描述 VoceChat 推送到 webhook 的消息结构，
+配合可复用的 `webhook_decoder` 直接从请求体字节解码并校验。
+"""
+from __future__ import annotations
+
+from typing import Union
+
+import msgspec
+from msgspec import Struct
+
+
+class Target(Struct):
+    """消息目标，群聊时为 `gid`，私聊时为 `uid`。"""
+
+    gid: int | None = None
+    uid: int | None = None
+
+
+class Properties(Struct):
+    """消息附加属性。
+
+    文件消息包含文件的 `content_type` `name` `size`，文本消息可能包含 `mentions`。
+    """
+
+    content_type: str = ""
+    name: str = ""
+    size: int = 0
+    mentions: list[int] = []
+
+
+class NormalDetail(Struct, tag="normal", tag_field="type"):
+    """普通消息（文本、Markdown、文件）。"""
+
+    content: str = ""
+    content_type: str = ""
+    properties: Properties | None = None
+    expires_in: int | None = None
+
+
+class ReplyDetail(Struct, tag="reply", tag_field="type"):
+    """回复消息，`mid` 为被回复的消息 ID。"""
+
+    mid: int
+    content: str = ""
+    content_type: str = ""
+    properties: Properties | None = None
+    expires_in: int | None = None
+
+
+class EditReaction(Struct, tag="edit", tag_field="type"):
+    """编辑消息。"""
+
+    content: str = ""
+    content_type: str = ""
+    properties: Properties | None = None
+
+
+class DeleteReaction(Struct, tag="delete", tag_field="type"):
+    """删除消息。"""
+
+
+class LikeReaction(Struct, tag="like", tag_field="type"):
+    """表情回应。"""
+
+    action: str = ""
+
+
+Reaction = Union[EditReaction, DeleteReaction, LikeReaction]
+
+
+class ReactionDetail(Struct, tag="reaction", tag_field="type"):
+    """对已有消息的操作，`mid` 为被操作的消息 ID。"""
+
+    mid: int
+    detail: Reaction
+
+
+Detail = Union[NormalDetail, ReplyDetail, ReactionDetail]
+
+
+class WebhookPayload(Struct):
+    """VoceChat webhook 推送的消息。"""
+
+    mid: int
+    from_uid: int
+    target: Target
+    detail: Detail
+    created_at: int = 0
+
+
+webhook_decoder = msgspec.json.Decoder(WebhookPayload)
+"""可复用的 webhook 消息解码器。"""
@@ -0,0 +1,194 @@
+"""VoceChat 请求限速。"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+
+
+class RateLimitExceeded(Exception):
+    """在等待期限内无法获得发送配额。
+
+    Attributes:
+        retry_after (float): 预计可以发送的等待时间，单位: 秒
+    """
+
+    def __init__(self, key: str | None, retry_after: float) -> None:
+        super().__init__(
+            f"Rate limited{f' for {key}' if key else ''}, retry after {retry_after:.2f}s",
+        )
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """令牌桶。
+
+    以 `rate` 个/秒的速度补充令牌，最多积累 `burst` 个。令牌可以预支为负数，
+    后来的请求按预支的数量排队等待。
+
+    Attributes:
+        rate (float): 每秒补充的令牌数，不大于 0 时表示不限速
+        burst (float): 令牌上限
+        tokens (float): 当前令牌数
+        blocked_until (float): 服务器要求暂停到的时间点（`time.monotonic`）
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def delay(self, now: float) -> float:
+        """获取一个令牌需要等待的时间。
+
+        Args:
+            now (float): 当前时间（`time.monotonic`）
+
+        Returns:
+            等待时间，单位: 秒
+        """
+        blocked = max(self.blocked_until - now, 0)
+        if self.rate <= 0:
+            return blocked
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return blocked
+        return max((1 - self.tokens) / self.rate, blocked)
+
+    def idle(self, now: float) -> bool:
+        """令牌已补满且未被暂停，可以安全丢弃。"""
+        self.delay(now)
+        return self.tokens >= self.burst and self.blocked_until <= now
+
+
+class RateLimiter:
+    """全局与按目标（用户/群组）的发送限速器。
+
+    每次发送需要同时从全局令牌桶和目标令牌桶各取一个令牌，令牌不足时排队等待；
+    预计等待时间超过期限时抛出 `RateLimitExceeded` 而不是继续等待。
+    服务器返回 429 时通过 `penalize` 按 `Retry-After` 暂停对应的令牌桶。
+
+    Attributes:
+        max_wait (float): 默认的最长排队时间，单位: 秒
+        waiting (int): 正在排队的请求数
+        acquired (int): 获得配额的请求数
+        delayed (int): 需要排队的请求数
+        rejected (int): 超过期限被拒绝的请求数
+        throttled (int): 服务器返回 429 的次数
+        total_wait (float): 累计排队时间，单位: 秒
+        max_observed_wait (float): 最长排队时间，单位: 秒
+    """
+
+    _PRUNE_THRESHOLD = 1024
+
+    def __init__(
+        self,
+        *,
+        rate: float = 10,
+        burst: float = 20,
+        target_rate: float = 2,
+        target_burst: float = 10,
+        max_wait: float = 10,
+    ) -> None:
+        """初始化限速器。
+
+        Args:
+            rate (float): 全局每秒发送数，不大于 0 时表示不限速
+            burst (float): 全局突发上限
+            target_rate (float): 每个目标每秒发送数，不大于 0 时表示不限速
+            target_burst (float): 每个目标突发上限
+            max_wait (float): 默认的最长排队时间，单位: 秒
+        """
+        self.target_rate = target_rate
+        self.target_burst = target_burst
+        self.max_wait = max_wait
+        self._global = TokenBucket(rate, burst)
+        self._targets: dict[str, TokenBucket] = {}
+        self.waiting = 0
+        self.acquired = 0
+        self.delayed = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self._targets.get(key)
+        if bucket is None:
+            if len(self._targets) >= self._PRUNE_THRESHOLD:
+                now = time.monotonic()
+                for idle_key in [k for k, b in self._targets.items() if b.idle(now)]:
+                    del self._targets[idle_key]
+            bucket = self._targets[key] = TokenBucket(self.target_rate, self.target_burst)
+        return bucket
+
+    async def acquire(self, key: str | None = None, *, deadline: float | None = None) -> float:
+        """获取一次发送配额，必要时排队等待。
+
+        Args:
+            key (str | None): 目标标识，如 `group:1`，None 表示只受全局限速
+            deadline (float | None): 最晚的发送时间点（`time.monotonic`），None 表示等待 `max_wait` 秒
+
+        Returns:
+            实际排队时间，单位: 秒
+
+        Raises:
+            RateLimitExceeded: 预计等待时间超过期限
+        """
+        now = time.monotonic()
+        if deadline is None:
+            deadline = now + self.max_wait
+        buckets = [self._global] if key is None else [self._global, self._bucket(key)]
+        wait = max(bucket.delay(now) for bucket in buckets)
+        if now + wait > deadline:
+            self.rejected += 1
+            raise RateLimitExceeded(key, wait)
+        for bucket in buckets:
+            bucket.tokens -= 1
+        self.acquired += 1
+        if wait <= 0:
+            return 0
+        self.delayed += 1
+        self.waiting += 1
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            for bucket in buckets:
+                bucket.tokens += 1
+            raise
+        finally:
+            self.waiting -= 1
+        self.total_wait += wait
+        self.max_observed_wait = max(self.max_observed_wait, wait)
+        return wait
+
+    def penalize(self, key: str | None, retry_after: float) -> None:
+        """服务器返回 429 时暂停发送。
+
+        Args:
+            key (str | None): 目标标识，None 表示暂停所有发送
+            retry_after (float): 暂停时间，单位: 秒
+        """
+        self.throttled += 1
+        bucket = self._global if key is None else self._bucket(key)
+        bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + retry_after)
+
+    def dict(self) -> dict[str, Any]:
+        """转换为计数器字典。"""
+        now = time.monotonic()
+        return {
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "delayed": self.delayed,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+            "targets": len(self._targets),
+            "current_wait": round(self._global.delay(now), 3),
+            "avg_wait": round(self.total_wait / self.delayed, 3) if self.delayed else 0,
+            "max_wait": round(self.max_observed_wait, 3),
+        }
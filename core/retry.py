@@ -0,0 +1,146 @@
+"""VoceChat 请求的重试策略与熔断器。"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import Any
+
+import aiohttp
+from msgspec import Struct
+
+CIRCUIT_OPEN = 33001
+"""熔断器打开时返回的 retcode（33xxx 网络错误）。"""
+
+
+class CircuitOpenError(Exception):
+    """VoceChat 不可用，熔断器处于打开状态，请求未发出。
+
+    Attributes:
+        retry_after (float): 熔断器尝试恢复前的剩余时间，单位: 秒
+    """
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(
+            f"VoceChat is unavailable, circuit open for another {retry_after:.1f}s",
+        )
+        self.retry_after = retry_after
+
+
+class RetryPolicy(Struct, frozen=True):
+    """重试策略。
+
+    幂等请求在网络错误、超时与 `statuses` 中的状态码时重试；
+    非幂等请求（如发送消息）只在请求确定未被服务器处理时重试：连接失败或 503。
+    重试间隔为带完全随机抖动的指数退避：`uniform(0, min(max_delay, base_delay * 2 ** n))`。
+
+    `attempts` 为 1 时不做任何重试（包括 429），用于只能发送一次的流式请求体。
+
+    Attributes:
+        attempts (int): 最多尝试次数（包含第一次）
+        base_delay (float): 退避基础间隔，单位: 秒
+        max_delay (float): 退避最大间隔，单位: 秒
+        idempotent (bool): 请求是否幂等
+        statuses (frozenset[int]): 幂等请求需要重试的状态码
+    """
+
+    attempts: int = 3
+    base_delay: float = 0.2
+    max_delay: float = 5.0
+    idempotent: bool = True
+    statuses: frozenset[int] = frozenset({500, 502, 503, 504})
+
+    def should_retry_status(self, status: int) -> bool:
+        """响应状态码是否需要重试。"""
+        if self.idempotent:
+            return status in self.statuses
+        return status == 503
+
+    def should_retry_error(self, error: BaseException) -> bool:
+        """请求异常是否需要重试。"""
+        if self.idempotent:
+            return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+        return isinstance(error, aiohttp.ClientConnectorError)
+
+    def backoff(self, attempt: int) -> float:
+        """第 `attempt` 次重试前的等待时间，单位: 秒。"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    """熔断器。
+
+    连续 `failure_threshold` 次失败（网络错误、超时或 5xx 网关错误）后打开，
+    打开期间所有请求立即失败；`reset_timeout` 秒后进入半开状态，只放行一个探测请求，
+    探测成功则关闭，失败则重新打开。
+
+    Attributes:
+        failure_threshold (int): 打开熔断器的连续失败次数
+        reset_timeout (float): 打开后尝试恢复的等待时间，单位: 秒
+        state (str): 当前状态，`closed` `open` 或 `half_open`
+        failures (int): 当前连续失败次数
+        opened (int): 打开次数
+        short_circuited (int): 因熔断直接失败的请求数
+    """
+
+    def __init__(self, *, failure_threshold: int = 5, reset_timeout: float = 30) -> None:
+        """初始化熔断器。
+
+        Args:
+            failure_threshold (int): 打开熔断器的连续失败次数
+            reset_timeout (float): 打开后尝试恢复的等待时间，单位: 秒
+        """
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0
+        self.short_circuited = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def before_request(self) -> None:
+        """请求前检查熔断器状态。
+
+        Raises:
+            CircuitOpenError: 熔断器打开，或半开状态下已有探测请求
+        """
+        if self.state == "closed":
+            return
+        remaining = self._opened_at + self.reset_timeout - time.monotonic()
+        if self.state == "open" and remaining <= 0:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return
+        self.short_circuited += 1
+        raise CircuitOpenError(max(remaining, 0))
+
+    def record_success(self) -> None:
+        """记录一次成功的请求。"""
+        self.failures = 0
+        self._probing = False
+        self.state = "closed"
+
+    def abandon(self) -> None:
+        """请求在得到结果前被放弃（如被取消），释放半开状态的探测名额。"""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        """记录一次失败的请求。"""
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened += 1
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+    def dict(self) -> dict[str, Any]:
+        """转换为计数器字典。"""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened": self.opened,
+            "short_circuited": self.short_circuited,
+        }
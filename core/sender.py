@@ -0,0 +1,175 @@
+"""消息发送：执行由 `core.transcoder` 规划的 VoceChat 发送请求。"""
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
+from msgspec import Struct
+from core.logger import Logger
+
+if TYPE_CHECKING:
+    from core.client import VoceChatClient
+
+log = Logger()
+logger = log.get_logger(filename="sender")
+
+
+class SendStep(Struct):
+    """一次 VoceChat 发送请求。
+
+    Attributes:
+        content_type (str): 消息类型，`text/plain` `text/markdown` 或 `vocechat/file`
+        content (str): 文本内容或文件路径
+        reply_to (str | None): 被回复的消息 ID
+        reply_user_id (str): 被回复的用户 ID
+    """
+
+    content_type: str
+    content: str
+    reply_to: str | None = None
+    reply_user_id: str = ""
+
+
+class SendError(Exception):
+    """部分发送请求失败。
+
+    Attributes:
+        message_ids (list[str | None]): 按规划顺序的消息 ID，未成功的为 None
+    """
+
+    def __init__(self, message: str, message_ids: list[str | None]) -> None:
+        super().__init__(message)
+        self.message_ids = message_ids
+
+
+def parse_message_id(response_data: str) -> str:
+    """解析 VoceChat 发送接口返回的消息 ID。
+
+    Args:
+        response_data (str): 响应内容
+
+    Returns:
+        消息 ID
+    """
+    try:
+        parsed_response = json.loads(response_data)
+    except json.JSONDecodeError:
+        # 非 JSON 响应时直接使用原始文本
+        return response_data
+    if isinstance(parsed_response, int):
+        return str(parsed_response)
+    if isinstance(parsed_response, dict) and "message_id" in parsed_response:
+        return str(parsed_response["message_id"])
+    logger.warning(f"消息ID格式异常: {response_data}")
+    return response_data
+
+
+class MessageSender:
+    """执行规划好的发送请求。
+
+    - 严格顺序模式（strict）：逐条发送，前一条成功后才发送下一条，遇到失败立即停止，
+      接收方看到的顺序与消息段顺序一致。
+    - 快速模式（fast）：所有发送请求并发执行（并发数不超过 `concurrency`），
+      接收方看到的顺序不保证与消息段一致。
+
+    两种模式返回的消息 ID 都按规划顺序排列。
+
+    Attributes:
+        client (VoceChatClient): VoceChat API 客户端
+        concurrency (int): 快速模式下的最大并发发送数
+    """
+
+    def __init__(self, client: VoceChatClient, *, concurrency: int = 4) -> None:
+        """初始化消息发送器。
+
+        Args:
+            client (VoceChatClient): VoceChat API 客户端
+            concurrency (int): 快速模式下的最大并发发送数
+        """
+        self.client = client
+        self.concurrency = max(concurrency, 1)
+
+    async def send(
+        self,
+        endpoint: str,
+        steps: list[SendStep],
+        *,
+        strict: bool = True,
+        rate_limit: str | None = None,
+    ) -> list[str]:
+        """发送消息。
+
+        Args:
+            endpoint (str): 发送接口路径，如 `/api/bot/send_to_user/{uid}`
+            steps (list[SendStep]): 发送请求
+            strict (bool): 是否严格按顺序发送
+            rate_limit (str | None): 限速目标标识，如 `group:1`
+
+        Returns:
+            按规划顺序的消息 ID
+
+        Raises:
+            SendError: 有发送请求失败
+        """
+        message_ids: list[str | None] = [None] * len(steps)
+        if strict:
+            for index, step in enumerate(steps):
+                try:
+                    message_ids[index] = await self._send_step(endpoint, step, rate_limit)
+                except Exception as e:
+                    raise SendError(str(e), message_ids) from e
+            return message_ids
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(index: int, step: SendStep) -> None:
+            async with semaphore:
+                message_ids[index] = await self._send_step(endpoint, step, rate_limit)
+
+        results = await asyncio.gather(
+            *(run(index, step) for index, step in enumerate(steps)),
+            return_exceptions=True,
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise SendError(str(errors[0]), message_ids) from errors[0]
+        return message_ids
+
+    async def _send_step(
+        self,
+        endpoint: str,
+        step: SendStep,
+        rate_limit: str | None,
+    ) -> str:
+        headers = {
+            'accept': 'application/json; charset=utf-8',
+            'Content-Type': step.content_type,
+        }
+        params = None
+        if step.reply_to is not None:
+            endpoint = f'/api/bot/reply/{step.reply_to}'
+            params = {"user_id": step.reply_user_id} if step.reply_user_id else None
+        if step.content_type == "vocechat/file":
+            kwargs: dict[str, Any] = {"json": {"path": step.content}}
+            kind = "文件"
+        else:
+            kwargs = {"data": step.content.encode('utf-8')}
+            kind = "回复文本" if step.reply_to is not None else "文本"
+        try:
+            async with self.client.post(
+                endpoint,
+                params=params,
+                headers=headers,
+                rate_limit=rate_limit,
+                **kwargs,
+            ) as response:
+                if response.status >= 400:
+                    error_text = await response.text()
+                    logger.error(f"发送{kind}消息失败: HTTP {response.status}, {error_text}")
+                    raise ValueError(f"Failed to send message: HTTP {response.status}, {error_text}")
+                return parse_message_id(await response.text())
+        except aiohttp.ClientError as e:
+            logger.error(f"发送{kind}消息时网络错误: {e}")
+            raise ValueError(f"Network error while sending message: {e}")
@@ -0,0 +1,256 @@
+"""键值目录的持久化：快照 + 追加写日志。"""
+from __future__ import annotations
+
+import asyncio
+import os
+import struct
+from typing import Any, Callable, Dict, Generic, Optional, Tuple, Type, TypeVar
+
+import msgspec
+from core.logger import Logger
+
+log = Logger()
+logger = log.get_logger(filename="storage")
+
+T = TypeVar("T")
+
+_FRAME_HEADER = struct.Struct("<I")
+
+
+class DirectoryStore(Generic[T]):
+    """键值目录的持久化存储。
+
+    - 每次变更通过 `record` 记录，在 `debounce` 秒内合并后批量追加到日志文件，
+      每条变更只需要 O(1) 的磁盘写入。
+    - 日志条数超过 `compact_threshold` 或关闭时，将完整状态写为快照：
+      先写入临时文件再原子替换，随后清空日志。
+    - 快照与日志都带有代数（generation）：每次写快照代数加一，日志开头记录写入时的代数。
+      替换快照后、清空日志前进程退出时，日志的代数小于快照，加载时不会重放这些过期的记录。
+    - 所有磁盘操作都在线程中执行，不阻塞事件循环。
+    - 启动时通过 `load` 读取快照并重放日志。
+
+    快照与日志均为 MessagePack 格式，快照为 `(代数, 状态)`，日志中每条记录带 4 字节长度前缀，
+    第一条记录为代数；末尾不完整的记录（如写入时进程退出）会在加载时被丢弃。
+    旧版不带代数的快照与日志视为第 0 代。
+
+    Attributes:
+        path (str): 快照文件路径
+        log_path (str): 日志文件路径
+        debounce (float): 追加写日志前的合并等待时间，单位: 秒
+        compact_threshold (int): 触发快照的日志条数
+    """
+
+    def __init__(
+        self,
+        path: str,
+        value_type: Type[T],
+        state: Callable[[], dict[str, T]],
+        *,
+        debounce: float = 1.0,
+        compact_threshold: int = 10000,
+    ) -> None:
+        """初始化持久化存储。
+
+        Args:
+            path (str): 快照文件路径，日志文件为 `{path}.log`
+            value_type (type): 值的类型
+            state (Callable[[], dict[str, T]]): 返回当前完整状态的函数，用于写快照
+            debounce (float): 追加写日志前的合并等待时间，单位: 秒
+            compact_threshold (int): 触发快照的日志条数
+        """
+        self.path = path
+        self.log_path = f"{path}.log"
+        self.debounce = debounce
+        self.compact_threshold = compact_threshold
+        self._state = state
+        self._encoder = msgspec.msgpack.Encoder()
+        self._snapshot_decoder = msgspec.msgpack.Decoder(Tuple[int, Dict[str, value_type]])
+        self._legacy_snapshot_decoder = msgspec.msgpack.Decoder(Dict[str, value_type])
+        self._generation_decoder = msgspec.msgpack.Decoder(int)
+        self._entry_decoder = msgspec.msgpack.Decoder(
+            Tuple[str, Optional[value_type]],
+        )
+        self._pending: list[tuple[str, T | None]] = []
+        self._log_entries = 0
+        self._generation = 0
+        self._log_generation = 0
+        self._lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+
+    def exists(self) -> bool:
+        """快照或日志文件是否存在。"""
+        return os.path.exists(self.path) or os.path.exists(self.log_path)
+
+    def load(self) -> dict[str, T]:
+        """读取快照并重放日志（阻塞，应在线程中或启动时调用）。
+
+        Returns:
+            完整状态
+        """
+        state: dict[str, T] = {}
+        snapshot_exists = os.path.exists(self.path)
+        if snapshot_exists:
+            with open(self.path, "rb") as f:
+                data = f.read()
+            try:
+                self._generation, state = self._snapshot_decoder.decode(data)
+            except msgspec.DecodeError:
+                state = self._legacy_snapshot_decoder.decode(data)
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "rb") as f:
+                data = f.read()
+            generation, offset = self._read_generation(data)
+            if snapshot_exists and generation < self._generation:
+                # 写快照后未来得及清空的日志，其中的变更已包含在快照中
+                logger.warning(f"{self.log_path} 早于快照 {self.path}，已丢弃")
+                with open(self.log_path, "wb"):
+                    pass
+                self._log_generation = self._generation
+                return state
+            self._generation = self._log_generation = generation
+            while offset + _FRAME_HEADER.size <= len(data):
+                (size,) = _FRAME_HEADER.unpack_from(data, offset)
+                end = offset + _FRAME_HEADER.size + size
+                if end > len(data):
+                    break
+                try:
+                    key, value = self._entry_decoder.decode(
+                        data[offset + _FRAME_HEADER.size : end],
+                    )
+                except msgspec.DecodeError:
+                    break
+                if value is None:
+                    state.pop(key, None)
+                else:
+                    state[key] = value
+                offset = end
+                self._log_entries += 1
+            if offset < len(data):
+                logger.warning(
+                    f"{self.log_path} 末尾有 {len(data) - offset} 字节不完整的记录，已丢弃",
+                )
+                with open(self.log_path, "r+b") as f:
+                    f.truncate(offset)
+        return state
+
+    def _read_generation(self, data: bytes) -> tuple[int, int]:
+        """读取日志开头的代数，返回代数与第一条变更的偏移量。"""
+        if len(data) < _FRAME_HEADER.size:
+            return self._generation, 0
+        (size,) = _FRAME_HEADER.unpack_from(data, 0)
+        end = _FRAME_HEADER.size + size
+        try:
+            return self._generation_decoder.decode(data[_FRAME_HEADER.size : end]), end
+        except msgspec.DecodeError:
+            # 旧版日志没有代数
+            return 0, 0
+
+    def _frame(self, obj: Any) -> bytes:
+        payload = self._encoder.encode(obj)
+        return _FRAME_HEADER.pack(len(payload)) + payload
+
+    def record(self, key: str, value: T | None) -> None:
+        """记录一次变更，稍后批量写入日志。
+
+        Args:
+            key (str): 键
+            value (T | None): 新的值，None 表示删除
+        """
+        self._pending.append((key, value))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        try:
+            await asyncio.sleep(self.debounce)
+        finally:
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """将待写入的变更追加到日志，日志过长时写快照。"""
+        async with self._lock:
+            if not self._pending:
+                return
+            entries, self._pending = self._pending, []
+            try:
+                await asyncio.to_thread(self._append, entries)
+            except Exception as e:
+                logger.error(f"写入 {self.log_path} 失败: {e}")
+                self._pending[:0] = entries
+                return
+            self._log_entries += len(entries)
+        if self._log_entries >= self.compact_threshold:
+            await self.snapshot()
+
+    def _append(self, entries: list[tuple[str, Any]]) -> None:
+        buf = bytearray()
+        for entry in entries:
+            buf += self._frame(entry)
+        # 日志早于当前快照（写快照时未能清空）时重写日志，其中的变更已包含在快照中
+        mode = "ab" if self._log_generation == self._generation else "wb"
+        with open(self.log_path, mode) as f:
+            if f.tell() == 0:
+                f.write(self._frame(self._generation))
+            f.write(buf)
+        self._log_generation = self._generation
+
+    async def snapshot(self) -> None:
+        """写入完整状态快照并清空日志。"""
+        async with self._lock:
+            state = dict(self._state())
+            # 快照已包含尚未写入日志的变更
+            entries, self._pending = self._pending, []
+            try:
+                await asyncio.to_thread(self._write_snapshot, state)
+            except Exception as e:
+                logger.error(f"写入 {self.path} 失败: {e}")
+                await self._append_or_restore(entries)
+                return
+            self._log_entries = 0
+            logger.debug(f"已写入快照 {self.path}: {len(state)} 条")
+
+    async def _append_or_restore(self, entries: list[tuple[str, Any]]) -> None:
+        # 快照失败时这些变更尚未落盘：追加到日志，仍然失败则放回待写入列表
+        if not entries:
+            return
+        try:
+            await asyncio.to_thread(self._append, entries)
+        except Exception as e:
+            logger.error(f"写入 {self.log_path} 失败: {e}")
+            self._pending[:0] = entries
+            return
+        self._log_entries += len(entries)
+
+    def _write_snapshot(self, state: dict[str, Any]) -> None:
+        generation = self._generation + 1
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self._encoder.encode((generation, state)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._generation = generation
+        # 替换落盘后再清空日志；在此之前退出时，旧日志因代数较小不会被重放
+        _fsync_dir(self.path)
+        with open(self.log_path, "wb") as f:
+            f.write(self._frame(generation))
+        self._log_generation = generation
+
+    async def close(self) -> None:
+        """取消等待中的批量写入并写入最终快照。"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.snapshot()
+
+
+def _fsync_dir(path: str) -> None:
+    # Windows 无法打开目录，由文件系统保证 rename 的持久性
+    if os.name == "nt":
+        return
+    fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,201 @@
+"""消息转码：VoceChat 消息内容与 OneBot 消息段之间的相互转换。"""
+from __future__ import annotations
+
+import re
+from typing import Union
+
+from config import VOICE_CONTENT_TYPES
+from core.logger import Logger
+from core.models import Properties
+from core.sender import SendStep
+from pylibob.exception import UnsupportedSegment
+from pylibob.segment import (
+    AudioSegment,
+    FileSegment,
+    ImageSegment,
+    MentionSegment,
+    MessageSegment,
+    ReplyData,
+    ReplySegment,
+    Segment,
+    TextData,
+    TextSegment,
+    TypedSegment,
+    VideoSegment,
+    VoiceSegment,
+)
+
+log = Logger()
+logger = log.get_logger(filename="transcoder")
+
+TEXT_CONTENT_TYPES = frozenset({"text/plain", "text/markdown"})
+MARKDOWN_SEGMENT = "vocechat.markdown"
+_FILE_SEGMENTS = (ImageSegment, VoiceSegment, AudioSegment, VideoSegment, FileSegment)
+
+# VoceChat 文本中的提及格式为 `@<用户ID>` 后跟一个空白字符
+_MENTION = re.compile(r"@(\d+)\s")
+
+
+class MarkdownSegment(TypedSegment, tag=MARKDOWN_SEGMENT):
+    """`vocechat.markdown` 扩展消息段，`data.text` 以 `text/markdown` 发送。"""
+
+    data: TextData
+
+
+SendSegment = Union[MessageSegment, MarkdownSegment]
+"""`send_message` 支持的消息段。"""
+
+
+def file_segment_type(content_type: str) -> str:
+    """按文件 MIME 类型选择 OneBot 消息段类型。
+
+    Args:
+        content_type (str): 文件 MIME 类型
+
+    Returns:
+        `image` `voice` `audio` `video` 或 `file`
+    """
+    content_type = content_type.split(";", 1)[0].strip().lower()
+    if content_type.startswith("image/"):
+        return "image"
+    if content_type in VOICE_CONTENT_TYPES:
+        return "voice"
+    if content_type.startswith("audio/"):
+        return "audio"
+    if content_type.startswith("video/"):
+        return "video"
+    return "file"
+
+
+def decode_text(content: str) -> list[Segment]:
+    """将 VoceChat 文本转为文本与提及消息段。
+
+    提及之间只含空白的文本被丢弃，提及之后剩余的文本原样保留。
+
+    Args:
+        content (str): 文本内容
+
+    Returns:
+        消息段列表，至少包含一个消息段
+    """
+    if "@" not in content:
+        return [Segment("text", {"text": content})]
+    # split 的结果为 [文本, 用户ID, 文本, 用户ID, ..., 文本]
+    parts = _MENTION.split(content)
+    last = len(parts) - 1
+    message: list[Segment] = []
+    for index in range(0, len(parts), 2):
+        text = parts[index]
+        if text and (index == last or not text.isspace()):
+            message.append(Segment("text", {"text": text}))
+        if index < last:
+            message.append(Segment("mention", {"user_id": parts[index + 1]}))
+    if not message:
+        message.append(Segment("text", {"text": content}))
+    return message
+
+
+def decode_content(
+    content_type: str,
+    content: str,
+    properties: Properties | None = None,
+) -> list[Segment]:
+    """将 VoceChat 消息内容转为 OneBot 消息段。
+
+    `text/plain` 解析提及；`text/markdown` 原样转为一个 `vocechat.markdown` 消息段，
+    回传给 `send_message` 时仍以 `text/markdown` 发送；`vocechat/file` 按文件类型转为
+    `image` `voice` `audio` `video` 或 `file` 消息段。
+
+    Args:
+        content_type (str): VoceChat 消息类型
+        content (str): 消息内容，文件消息为文件路径
+        properties (Properties | None): 消息属性
+
+    Returns:
+        消息段列表
+    """
+    if content_type == "vocechat/file":
+        file_type = properties.content_type if properties is not None else ""
+        return [Segment(file_segment_type(file_type), {"file_id": content})]
+    if content_type == "text/markdown":
+        return [Segment(MARKDOWN_SEGMENT, {"text": content})]
+    if content_type not in TEXT_CONTENT_TYPES:
+        logger.debug(f"未知的消息类型 {content_type}，按文本处理")
+    return decode_text(content)
+
+
+def alt_message(message: list[Segment]) -> str:
+    """生成消息的纯文本替代表示。
+
+    文本消息的替代表示就是原始内容，只有其他消息才需要调用本函数。
+
+    Args:
+        message (list[Segment]): 消息段列表
+
+    Returns:
+        替代表示，如 `@1 你好` `[image]`
+    """
+    parts: list[str] = []
+    for segment in message:
+        if segment.type == "text" or segment.type == MARKDOWN_SEGMENT:
+            parts.append(segment.data.get("text", ""))
+        elif segment.type == "mention":
+            parts.append(f"@{segment.data.get('user_id', '')} ")
+        elif segment.type != "reply":
+            parts.append(f"[{segment.type}]")
+    return "".join(parts)
+
+
+def encode_message(message: list[SendSegment]) -> list[SendStep]:
+    """按消息段顺序将 OneBot 消息转为 VoceChat 发送请求。
+
+    相邻的文本与提及消息段合并为一条 `text/plain` 消息，每个文件消息段单独发送，
+    `vocechat.markdown` 消息段单独以 `text/markdown` 发送；回复消息段作用于第一条文本消息。
+
+    Args:
+        message (list[SendSegment]): 已校验的 OneBot 消息段列表
+
+    Returns:
+        按顺序排列的发送请求
+
+    Raises:
+        UnsupportedSegment: VoceChat 无法发送的消息段（`mention_all` `location`）
+    """
+    steps: list[SendStep] = []
+    text: list[str] = []
+    reply: ReplyData | None = None
+    # 第一条文本消息，回复消息段作用于它
+    first_text: SendStep | None = None
+
+    for segment in message:
+        if isinstance(segment, TextSegment):
+            text.append(segment.data.text)
+            continue
+        if isinstance(segment, MentionSegment):
+            if segment.data.user_id:
+                text.append(f"@{segment.data.user_id} ")
+            continue
+        if isinstance(segment, ReplySegment):
+            reply = reply or segment.data
+            continue
+        if isinstance(segment, _FILE_SEGMENTS):
+            step = SendStep("vocechat/file", segment.data.file_id)
+        elif isinstance(segment, MarkdownSegment):
+            step = SendStep("text/markdown", segment.data.text)
+        else:
+            raise UnsupportedSegment(message=f"Segment type '{segment.type}' is not supported by VoceChat")
+        if text:
+            steps.append(SendStep("text/plain", "".join(text)))
+            text.clear()
+            first_text = first_text or steps[-1]
+        steps.append(step)
+        if step.content_type == "text/markdown":
+            first_text = first_text or step
+    if text:
+        steps.append(SendStep("text/plain", "".join(text)))
+        first_text = first_text or steps[-1]
+
+    if reply is not None and first_text is not None:
+        first_text.reply_to = reply.message_id
+        first_text.reply_user_id = reply.user_id
+    return steps
@@ -0,0 +1,542 @@
+"""文件上传：流式数据源与分块上传。"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterable, AsyncIterator, Callable, Union
+
+import aiofiles
+import aiohttp
+from msgspec import Struct
+from core.download import FileInfo
+from core.logger import Logger
+from core.retry import RetryPolicy
+from core.upload_cache import UploadCache
+
+if TYPE_CHECKING:
+    from core.client import VoceChatClient
+
+log = Logger()
+logger = log.get_logger(filename="upload")
+
+ChunkBody = Union[bytes, AsyncIterable[bytes]]
+
+# 边读边发的分块无法重新生成请求体，只发送一次
+_SEND_ONCE = RetryPolicy(attempts=1)
+
+
+class UploadInterrupted(ValueError):
+    """分块上传因网络错误、超时或服务器错误（5xx）中断。
+
+    分块接口会追加数据，请求失败时无法确定服务器是否已经写入该分块，因此不重传分块，
+    而是重新预上传并从头上传（见 `ChunkedUploader.restarts`）。
+    """
+
+
+class ChecksumMismatch(ValueError):
+    """上传内容与调用方提供的 sha256 不一致。
+
+    内存数据与本地文件在上传前校验，不会产生 VoceChat 文件；流式数据源只能在上传完成后校验，
+    此时文件已经保存在 VoceChat 上（`path`），但不会记录到上传缓存，也不会返回给调用方。
+
+    Attributes:
+        expected (str): 调用方提供的 sha256
+        actual (str): 实际内容的 sha256
+        path (str): 已上传的 VoceChat 文件路径，上传前校验失败时为空
+    """
+
+    def __init__(self, expected: str, actual: str, path: str = "") -> None:
+        super().__init__(f"sha256 mismatch: expected {expected}, got {actual}")
+        self.expected = expected
+        self.actual = actual
+        self.path = path
+
+
+def hash_file(path: str, buffer_size: int = 1024 * 1024) -> str:
+    """计算本地文件的 sha256（阻塞，应在线程中调用）。"""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(buffer_size):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+async def iter_file(
+    path: str,
+    *,
+    buffer_size: int = 256 * 1024,
+    offset: int = 0,
+    length: int | None = None,
+) -> AsyncIterator[bytes]:
+    """按块读取本地文件，每次最多读取 `buffer_size` 字节。
+
+    Args:
+        path (str): 文件路径
+        buffer_size (int): 每次读取的最大字节数
+        offset (int): 起始偏移量
+        length (int | None): 读取的总字节数，None 表示读到文件末尾
+
+    Yields:
+        文件数据块
+    """
+    remaining = length
+    async with aiofiles.open(path, "rb") as f:
+        if offset:
+            await f.seek(offset)
+        while remaining is None or remaining > 0:
+            size = buffer_size if remaining is None else min(buffer_size, remaining)
+            chunk = await f.read(size)
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+class _IncrementalHash:
+    """按偏移量增量计算 sha256，重试时重复读取的数据不会被重复计算。"""
+
+    def __init__(self) -> None:
+        self.sha256 = hashlib.sha256()
+        self.until = 0
+
+    def update(self, data: bytes, offset: int) -> None:
+        end = offset + len(data)
+        if end > self.until:
+            self.sha256.update(data[max(self.until - offset, 0):])
+            self.until = end
+
+    async def wrap(self, chunks: AsyncIterable[bytes], offset: int) -> AsyncIterator[bytes]:
+        async for chunk in chunks:
+            self.update(chunk, offset)
+            offset += len(chunk)
+            yield chunk
+
+
+class _LazyFlag(aiohttp.payload.Payload):
+    """写出请求体时才取值的 `true`/`false` 表单字段。"""
+
+    def __init__(self, value: Callable[[], bool]) -> None:
+        super().__init__(value, content_type="text/plain")
+
+    def decode(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        return "true" if self._value() else "false"
+
+    async def write(self, writer: Any) -> None:
+        await writer.write(self.decode().encode())
+
+
+class _StreamChunker:
+    """将数据流切分为分块，分块数据边读边发送。
+
+    内存中只保留数据流单次产出的一段（`UPLOAD_BUFFER_SIZE`），不缓存整个分块。
+    分块是否为最后一块要在读完该分块后预读一段才能确定，因此 `chunk_is_last`
+    （位于 `chunk_data` 之后）以 `_LazyFlag` 在写出时取 `is_last()`。
+    """
+
+    def __init__(self, stream: AsyncIterable[bytes], chunk_size: int, digest: _IncrementalHash) -> None:
+        self._iter = stream.__aiter__()
+        self._chunk_size = chunk_size
+        self._digest = digest
+        self._head = b""
+        self._ended = False
+        self.offset = 0
+
+    async def _fill(self) -> None:
+        while not self._head and not self._ended:
+            try:
+                self._head = bytes(await self._iter.__anext__())
+            except StopAsyncIteration:
+                self._ended = True
+
+    async def chunk(self) -> AsyncIterator[bytes]:
+        remaining = self._chunk_size
+        while remaining > 0:
+            await self._fill()
+            if not self._head:
+                return
+            piece, self._head = self._head[:remaining], self._head[remaining:]
+            self._digest.update(piece, self.offset)
+            self.offset += len(piece)
+            remaining -= len(piece)
+            yield piece
+        # 分块已满，预读下一段以确定数据流是否已经结束
+        await self._fill()
+
+    def is_last(self) -> bool:
+        return self._ended and not self._head
+
+
+class UploadProgress(Struct):
+    """上传进度。
+
+    Attributes:
+        file_id (str): VoceChat 临时文件 ID
+        filename (str): 文件名
+        total (int | None): 文件总大小，未知时为 None
+        sent (int): 已上传的字节数
+        chunks (int): 已上传的分块数
+        started_at (float): 开始时间（Unix 时间戳）
+    """
+
+    file_id: str
+    filename: str
+    total: int | None = None
+    sent: int = 0
+    chunks: int = 0
+    started_at: float = 0
+
+
+class ChunkedUploader:
+    """VoceChat 分块上传。
+
+    先通过 `/api/bot/file/prepare` 获取临时文件 ID，再将文件按 `chunk_size` 切分，
+    依次调用 `/api/bot/file/upload`，最后一块带 `chunk_is_last=true`。
+
+    - 分块接口会追加数据，不能安全地重传：只在请求未发出（连接失败）或服务器返回 503 时重试。
+      其他网络错误、超时与 5xx 会中断上传（`UploadInterrupted`），内存数据与本地文件
+      重新预上传并从头上传，最多 `restarts` 次；流式数据源无法重读，直接失败。
+    - 本地文件的分块按偏移量流式读取，重传时重新读取，内存占用不超过 `buffer_size`。
+    - 数据流的分块边读边发送，内存中只保留数据流单次产出的一段（url 来源为 `buffer_size`）；
+      已发送的数据无法重读，这类分块请求不重试。
+    - 上传过程中增量计算 sha256，完成后校验服务器返回的文件大小。
+    - 内存数据与本地文件在上传前校验调用方提供的 sha256，不一致时不请求网络；
+      流式数据源在上传完成后校验，不一致时已上传的文件留在 VoceChat 上（见 `ChecksumMismatch`）。
+    - 上传前能确定 sha256 时（调用方提供、内存数据或本地文件）先查询 `cache`，
+      相同内容的文件直接返回之前的 VoceChat 文件路径；上传完成后记录到 `cache`。
+
+    Attributes:
+        client (VoceChatClient): VoceChat API 客户端
+        chunk_size (int): 分块大小，单位: 字节
+        buffer_size (int): 流式读取时每次读取的最大字节数
+        cache (UploadCache): 按内容寻址的上传缓存
+        active (dict[str, UploadProgress]): 进行中的上传
+        completed (int): 完成的上传数
+        restarts (int): 上传中断后从头上传的最多次数
+        failed (int): 失败的上传数
+        restarted (int): 中断后从头上传的次数
+        bytes_sent (int): 累计上传的字节数
+    """
+
+    def __init__(
+        self,
+        client: VoceChatClient,
+        *,
+        chunk_size: int = 4 * 1024 * 1024,
+        buffer_size: int = 256 * 1024,
+        cache: UploadCache | None = None,
+        restarts: int = 2,
+    ) -> None:
+        """初始化分块上传。
+
+        Args:
+            client (VoceChatClient): VoceChat API 客户端
+            chunk_size (int): 分块大小，单位: 字节
+            buffer_size (int): 流式读取时每次读取的最大字节数
+            cache (UploadCache | None): 按内容寻址的上传缓存，None 表示不缓存
+            restarts (int): 上传中断后从头上传的最多次数，0 表示不重新上传
+        """
+        self.client = client
+        self.chunk_size = max(chunk_size, 1)
+        self.buffer_size = max(buffer_size, 1)
+        self.cache = cache if cache is not None else UploadCache(max_entries=0)
+        self.restarts = max(restarts, 0)
+        self.active: dict[str, UploadProgress] = {}
+        self.completed = 0
+        self.failed = 0
+        self.restarted = 0
+        self.bytes_sent = 0
+
+    async def prepare(self, filename: str, content_type: str) -> str:
+        """调用预上传接口，获取临时文件 ID。
+
+        Args:
+            filename (str): 文件名
+            content_type (str): 文件 MIME 类型
+
+        Returns:
+            临时文件 ID
+        """
+        # Prepare API needs JSON payload but returns plain text file_id
+        headers = {"accept": "*/*"}
+        payload = {"filename": filename, "content_type": content_type}
+        try:
+            async with self.client.post("/api/bot/file/prepare", headers=headers, json=payload) as resp:
+                if resp.status >= 400:
+                    error_text = await resp.text()
+                    logger.error(f"文件准备API调用失败: HTTP {resp.status}, {error_text}")
+                    raise ValueError(f"Vocechat prepare API failed with status {resp.status}: {error_text}")
+                # Docs say it returns the file_id string directly
+                file_id = await resp.text()
+        except aiohttp.ClientError as e:
+            logger.error(f"文件准备API调用时网络错误: {e}")
+            raise ValueError(f"Network error during prepare file API call: {e}") from e
+        if not file_id:
+            raise ValueError("Vocechat prepare API returned an empty file_id")
+        return file_id.strip('"')
+
+    async def upload_chunk(
+        self,
+        file_id: str,
+        body: Callable[[], ChunkBody],
+        filename: str,
+        content_type: str,
+        *,
+        is_last: bool | Callable[[], bool],
+    ) -> dict[str, Any] | None:
+        """上传一个分块。
+
+        Args:
+            file_id (str): 临时文件 ID
+            body (Callable[[], ChunkBody]): 生成分块数据的函数，每次重试时重新调用
+            filename (str): 文件名
+            content_type (str): 文件 MIME 类型
+            is_last (bool | Callable[[], bool]): 是否为最后一块，边读边发的分块为读完后取值的函数
+
+        Returns:
+            最后一块返回包含 `path` 的上传结果，其余分块返回 None
+
+        Raises:
+            UploadInterrupted: 网络错误、超时或服务器错误，服务器可能已写入部分数据
+            ValueError: 服务器拒绝了分块或返回了无效的响应
+        """
+        # Content-Type is not set here, as FormData sets it
+        headers = {
+            "accept": "*/*",
+            "cache-control": "no-cache",
+            "pragma": "no-cache",
+        }
+
+        def form() -> aiohttp.FormData:
+            # FormData can only be sent once, so it is rebuilt for each retry
+            form = aiohttp.FormData()
+            form.add_field("file_id", file_id)
+            form.add_field("chunk_data", body(), filename=filename, content_type=content_type)
+            if callable(is_last):
+                form.add_field("chunk_is_last", _LazyFlag(is_last))
+            else:
+                form.add_field("chunk_is_last", "true" if is_last else "false")
+            return form
+
+        retry = _SEND_ONCE if callable(is_last) else None
+
+        try:
+            async with self.client.post("/api/bot/file/upload", headers=headers, data=form, retry=retry) as resp:
+                if resp.status >= 500:
+                    error_text = await resp.text()
+                    logger.error(f"文件上传API调用失败: HTTP {resp.status}, {error_text}")
+                    raise UploadInterrupted(f"Vocechat upload API failed with status {resp.status}: {error_text}")
+                if resp.status >= 400:
+                    error_text = await resp.text()
+                    logger.error(f"文件上传API调用失败: HTTP {resp.status}, {error_text}")
+                    raise ValueError(f"Vocechat upload API failed with status {resp.status}: {error_text}")
+                if not (is_last() if callable(is_last) else is_last):
+                    return None
+                # Docs say the final response is JSON containing 'path'
+                if "application/json" not in resp.headers.get("Content-Type", ""):
+                    text_response = await resp.text()
+                    logger.error(f"文件上传API未返回JSON格式: {text_response}")
+                    raise ValueError(f"Vocechat upload API did not return JSON: {text_response}")
+                try:
+                    result = await resp.json()
+                except json.JSONDecodeError as e:
+                    logger.error(f"解析文件上传响应时JSON解析错误: {e}")
+                    raise ValueError(f"Failed to parse JSON response from upload API: {e}") from e
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"文件上传API调用时网络错误: {e!r}")
+            raise UploadInterrupted(f"Network error during upload file API call: {e!r}") from e
+        if not isinstance(result, dict) or "path" not in result:
+            logger.error(f"文件上传API响应缺少'path'字段: {result}")
+            raise ValueError(f"Vocechat upload API response missing 'path': {result}")
+        return result
+
+    async def _path_chunks(self, path: str, digest: _IncrementalHash):
+        size = os.path.getsize(path)
+        offset = 0
+        while True:
+            length = min(self.chunk_size, size - offset)
+            is_last = offset + length >= size
+
+            def body(offset: int = offset, length: int = length) -> ChunkBody:
+                return digest.wrap(
+                    iter_file(path, buffer_size=self.buffer_size, offset=offset, length=length),
+                    offset,
+                )
+
+            yield body, is_last
+            if is_last:
+                return
+            offset += length
+
+    async def _stream_chunks(self, stream: AsyncIterable[bytes], digest: _IncrementalHash):
+        chunker = _StreamChunker(stream, self.chunk_size, digest)
+        while True:
+            yield chunker.chunk, chunker.is_last
+            if chunker.is_last():
+                return
+
+    async def _data_chunks(self, data: bytes, digest: _IncrementalHash):
+        view = memoryview(data)
+        offset = 0
+        while True:
+            chunk = bytes(view[offset:offset + self.chunk_size])
+            is_last = offset + len(chunk) >= len(data)
+            digest.update(chunk, offset)
+            yield (lambda chunk=chunk: chunk), is_last
+            if is_last:
+                return
+            offset += len(chunk)
+
+    async def upload(
+        self,
+        filename: str,
+        content_type: str,
+        *,
+        data: bytes | None = None,
+        path: str | None = None,
+        stream: AsyncIterable[bytes] | None = None,
+        sha256: str = "",
+        lookup: bool = True,
+        verify: bool = True,
+    ) -> dict[str, Any]:
+        """分块上传文件，`data` `path` `stream` 三选一。
+
+        Args:
+            filename (str): 文件名
+            content_type (str): 文件 MIME 类型
+            data (bytes | None): 文件数据
+            path (str | None): 本地文件路径
+            stream (AsyncIterable[bytes] | None): 文件数据流
+            sha256 (str): 调用方提供的文件 sha256，用于查询缓存与校验
+            lookup (bool): 上传前是否查询缓存，调用方已查询过时为 False
+            verify (bool): 上传前是否校验内存数据与本地文件的 `sha256`，调用方已校验过时为 False
+
+        Returns:
+            上传结果，包含 `path` 与 `sha256`，命中缓存时 `cached` 为 True
+
+        Raises:
+            ChecksumMismatch: 上传内容与提供的 sha256 不一致
+            UploadInterrupted: 上传中断，且无法或已用完从头上传的次数
+            ValueError: 上传失败
+        """
+        expected = sha256.lower()
+        if (expected and verify) or (self.cache.enabled and lookup and not expected):
+            actual = ""
+            if data is not None:
+                actual = await asyncio.to_thread(lambda: hashlib.sha256(data).hexdigest())
+            elif path is not None:
+                actual = await asyncio.to_thread(hash_file, path)
+            if expected and actual and actual != expected:
+                raise ChecksumMismatch(expected, actual)
+            expected = expected or actual
+        if lookup and expected and (record := self.cache.get(expected)) is not None:
+            logger.debug(f"上传命中缓存: {filename} -> {record.path}")
+            return {"path": record.path, "size": record.size, "sha256": expected, "cached": True}
+
+        if path is None and data is None and stream is None:
+            raise ValueError("No upload source")
+        # 流式数据源已读取的数据无法重读，中断后不能从头上传
+        restarts = self.restarts if stream is None else 0
+        try:
+            while True:
+                digest = _IncrementalHash()
+                try:
+                    result, sent = await self._upload_once(
+                        filename,
+                        content_type,
+                        digest,
+                        data=data,
+                        path=path,
+                        stream=stream,
+                    )
+                except UploadInterrupted as e:
+                    if restarts <= 0:
+                        raise
+                    restarts -= 1
+                    self.restarted += 1
+                    logger.warning(f"上传中断，重新预上传并从头上传: {filename}, {e}")
+                    continue
+                break
+        except BaseException:
+            self.failed += 1
+            raise
+        self.completed += 1
+        result["sha256"] = digest.sha256.hexdigest()
+        if expected and result["sha256"] != expected:
+            logger.warning(f"上传内容与 sha256 不一致，已上传的文件保留在 VoceChat: {result['path']}")
+            raise ChecksumMismatch(expected, result["sha256"], result["path"])
+        self.cache.put(result["sha256"], result["path"], sent)
+        self.client.file_meta.put(FileInfo(result["path"], filename, content_type, sent))
+        return result
+
+    async def _upload_once(
+        self,
+        filename: str,
+        content_type: str,
+        digest: _IncrementalHash,
+        *,
+        data: bytes | None,
+        path: str | None,
+        stream: AsyncIterable[bytes] | None,
+    ) -> tuple[dict[str, Any], int]:
+        if path is not None:
+            total = os.path.getsize(path)
+            chunks = self._path_chunks(path, digest)
+        elif data is not None:
+            total = len(data)
+            chunks = self._data_chunks(data, digest)
+        else:
+            total = None
+            chunks = self._stream_chunks(stream, digest)
+
+        file_id = await self.prepare(filename, content_type)
+        progress = UploadProgress(file_id, filename, total, started_at=time.time())
+        self.active[file_id] = progress
+        try:
+            async for body, is_last in chunks:
+                result = await self.upload_chunk(
+                    file_id,
+                    body,
+                    filename,
+                    content_type,
+                    is_last=is_last,
+                )
+                # 分块数据在发送时计入摘要，摘要覆盖的长度即已发送的字节数
+                length = digest.until - progress.sent
+                progress.sent += length
+                progress.chunks += 1
+                self.bytes_sent += length
+                logger.debug(
+                    f"上传分块 {progress.chunks}: {filename} "
+                    f"{progress.sent}/{total if total is not None else '?'} 字节",
+                )
+            size = result.get("size")
+            if isinstance(size, int) and size != progress.sent:
+                raise ValueError(
+                    f"Uploaded size mismatch: sent {progress.sent} bytes, server has {size}",
+                )
+        finally:
+            del self.active[file_id]
+        return result, progress.sent
+
+    def dict(self) -> dict[str, Any]:
+        """转换为计数器字典。"""
+        return {
+            "active": [
+                {
+                    "filename": progress.filename,
+                    "total": progress.total,
+                    "sent": progress.sent,
+                    "chunks": progress.chunks,
+                }
+                for progress in self.active.values()
+            ],
+            "completed": self.completed,
+            "failed": self.failed,
+            "restarted": self.restarted,
+            "bytes_sent": self.bytes_sent,
+            "cache": self.cache.dict(),
+        }
@@ -0,0 +1,177 @@
+"""按内容寻址的上传缓存：sha256 -> VoceChat 文件路径。"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any
+
+from msgspec import Struct
+from core.logger import Logger
+from core.storage import DirectoryStore
+
+log = Logger()
+logger = log.get_logger(filename="upload_cache")
+
+
+class UploadRecord(Struct, array_like=True):
+    """一次已完成的上传。
+
+    Attributes:
+        path (str): VoceChat 文件路径
+        size (int): 文件大小
+        stored_at (float): 上传时间（Unix 时间戳）
+        used_at (float): 最近一次命中的时间（Unix 时间戳）
+    """
+
+    path: str
+    size: int
+    stored_at: float
+    used_at: float = 0
+
+
+class UploadCache:
+    """按内容寻址的上传缓存。
+
+    相同内容（sha256 相同）的文件再次上传时直接返回之前的 VoceChat 文件路径，不再请求服务器。
+
+    - 最多保存 `max_entries` 条，超出时淘汰最久未使用的记录（LRU）。
+    - 上传超过 `max_age` 秒的记录视为过期，VoceChat 上的文件可能已被清理。
+    - 记录通过 `DirectoryStore` 持久化，重启后仍然有效。
+
+    Attributes:
+        max_entries (int): 最多保存的记录数，0 表示禁用缓存
+        max_age (float): 记录的有效期，单位: 秒，0 表示不过期
+        storage_path (str): 快照文件路径
+        hits (int): 命中次数
+        misses (int): 未命中次数
+        evicted (int): 淘汰的记录数
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 10000,
+        max_age: float = 7 * 24 * 3600,
+        storage_path: str = "upload_cache.msgpack",
+        flush_delay: float = 1.0,
+    ) -> None:
+        """初始化上传缓存。
+
+        Args:
+            max_entries (int): 最多保存的记录数，0 表示禁用缓存
+            max_age (float): 记录的有效期，单位: 秒，0 表示不过期
+            storage_path (str): 快照文件路径
+            flush_delay (float): 变更合并写入磁盘的等待时间，单位: 秒
+        """
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.storage_path = storage_path
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._records: OrderedDict[str, UploadRecord] = OrderedDict()
+        self._store = DirectoryStore(
+            storage_path,
+            UploadRecord,
+            lambda: self._records,
+            debounce=flush_delay,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """缓存是否启用。"""
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    async def load(self) -> None:
+        """从磁盘加载记录，并按最近使用时间恢复 LRU 顺序。"""
+        if not self.enabled or not self._store.exists():
+            return
+        try:
+            records = await asyncio.to_thread(self._store.load)
+        except Exception as e:
+            logger.error(f"加载上传缓存失败: {e}")
+            return
+        for sha256, record in sorted(records.items(), key=lambda item: item[1].used_at):
+            self._records[sha256] = record
+        self._evict(time.time())
+        logger.info(f"已加载 {len(self._records)} 条上传缓存")
+
+    def _expired(self, record: UploadRecord, now: float) -> bool:
+        return bool(self.max_age) and now - record.stored_at > self.max_age
+
+    def _evict(self, now: float) -> None:
+        for sha256 in [sha256 for sha256, record in self._records.items() if self._expired(record, now)]:
+            self._remove(sha256)
+        while len(self._records) > self.max_entries:
+            sha256, _ = self._records.popitem(last=False)
+            self._store.record(sha256, None)
+            self.evicted += 1
+
+    def _remove(self, sha256: str) -> None:
+        if self._records.pop(sha256, None) is not None:
+            self._store.record(sha256, None)
+            self.evicted += 1
+
+    def get(self, sha256: str) -> UploadRecord | None:
+        """查询内容对应的上传记录。
+
+        Args:
+            sha256 (str): 文件内容的 sha256
+
+        Returns:
+            上传记录，不存在或已过期时为 None
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        record = self._records.get(sha256)
+        if record is not None and self._expired(record, now):
+            self._remove(sha256)
+            record = None
+        if record is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        record.used_at = now
+        self._records.move_to_end(sha256)
+        self._store.record(sha256, record)
+        return record
+
+    def put(self, sha256: str, path: str, size: int) -> None:
+        """记录一次完成的上传。
+
+        Args:
+            sha256 (str): 文件内容的 sha256
+            path (str): VoceChat 文件路径
+            size (int): 文件大小
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        record = UploadRecord(path, size, now, now)
+        self._records[sha256] = record
+        self._records.move_to_end(sha256)
+        self._store.record(sha256, record)
+        self._evict(now)
+
+    def discard(self, sha256: str) -> None:
+        """删除记录（如 VoceChat 上的文件已失效）。"""
+        self._remove(sha256)
+
+    async def close(self) -> None:
+        """将记录写入快照。"""
+        if self.enabled:
+            await self._store.close()
+
+    def dict(self) -> dict[str, Any]:
+        """转换为计数器字典。"""
+        return {
+            "size": len(self._records),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+        }
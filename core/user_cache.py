@@ -0,0 +1,306 @@
+"""VoceChat 用户资料缓存。"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Iterator
+
+from msgspec import Struct
+from pylibob.exception import PlatformError
+from core.logger import Logger
+from core.storage import DirectoryStore
+
+if TYPE_CHECKING:
+    from core.client import VoceChatClient
+
+log = Logger()
+logger = log.get_logger(filename="user_cache")
+
+
+class UserProfile(Struct, array_like=True):
+    """用户资料。
+
+    Attributes:
+        name (str): 用户昵称
+        avatar (str): 头像地址
+        fetched_at (float): 获取时间（Unix 时间戳），0 表示未从服务器确认过
+    """
+
+    name: str
+    avatar: str = ""
+    fetched_at: float = 0
+
+
+class UserCache:
+    """进程内共享的用户资料缓存（用户 ID -> 资料）。
+
+    - 每个用户单独计算过期时间 `ttl`，过期后仍返回旧资料，同时在后台刷新（stale-while-revalidate）。
+    - 服务器返回 404 的用户会在 `negative_ttl` 内直接视为不存在，不再请求。
+    - 请求失败（网络错误、5xx 等）时返回缓存中的旧资料，没有旧资料时抛出异常，
+      不会当作用户不存在。
+    - 同一用户的并发查询只会发起一次请求（single-flight）。
+    - 同时向服务器请求用户资料的数量不超过 `concurrency`。
+
+    Attributes:
+        client (VoceChatClient): VoceChat API 客户端
+        ttl (float): 资料过期时间，单位: 秒
+        negative_ttl (float): 不存在用户的缓存时间，单位: 秒
+        concurrency (int): 同时请求用户资料的最大数量
+        storage_path (str): 资料快照文件路径
+        legacy_path (str): 旧版 JSON 好友列表路径，快照不存在时从中迁移
+    """
+
+    def __init__(
+        self,
+        client: VoceChatClient,
+        *,
+        ttl: float = 600,
+        negative_ttl: float = 60,
+        concurrency: int = 8,
+        storage_path: str = "friend_list.msgpack",
+        legacy_path: str = "friend_list.json",
+        flush_delay: float = 1.0,
+    ) -> None:
+        """初始化用户资料缓存。
+
+        Args:
+            client (VoceChatClient): VoceChat API 客户端
+            ttl (float): 资料过期时间，单位: 秒
+            negative_ttl (float): 不存在用户的缓存时间，单位: 秒
+            concurrency (int): 同时请求用户资料的最大数量
+            storage_path (str): 资料快照文件路径
+            legacy_path (str): 旧版 JSON 好友列表路径，快照不存在时从中迁移
+            flush_delay (float): 资料变更合并写入磁盘的等待时间，单位: 秒
+        """
+        self.client = client
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.concurrency = max(concurrency, 1)
+        self.storage_path = storage_path
+        self.legacy_path = legacy_path
+        self._profiles: dict[str, UserProfile] = {}
+        self._missing: dict[str, float] = {}
+        self._inflight: dict[str, asyncio.Task[UserProfile | None]] = {}
+        self._background: set[asyncio.Task] = set()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._store = DirectoryStore(
+            storage_path,
+            UserProfile,
+            lambda: self._profiles,
+            debounce=flush_delay,
+        )
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def items(self) -> Iterator[tuple[str, UserProfile]]:
+        """遍历所有已知用户。"""
+        return iter(self._profiles.items())
+
+    def peek(self, user_id: str) -> UserProfile | None:
+        """只读取缓存，不发起请求。
+
+        Args:
+            user_id (str): 用户 ID
+
+        Returns:
+            用户资料，不在缓存中时为 None
+        """
+        return self._profiles.get(user_id)
+
+    async def load(self) -> None:
+        """从磁盘加载用户资料。
+
+        读取快照并重放变更日志；快照不存在时从旧版 `friend_list.json` 迁移昵称，
+        迁移的资料视为已过期，首次使用时会在后台刷新。
+        """
+        try:
+            if self._store.exists():
+                self._profiles = await asyncio.to_thread(self._store.load)
+            elif os.path.exists(self.legacy_path):
+                self._profiles = await asyncio.to_thread(self._load_legacy)
+                await self._store.snapshot()
+                logger.info(f"已将 {self.legacy_path} 迁移到 {self.storage_path}")
+            else:
+                return
+            logger.info(f"已加载 {len(self._profiles)} 个用户资料")
+        except Exception as e:
+            logger.error(f"加载好友列表失败: {e}")
+
+    def _load_legacy(self) -> dict[str, UserProfile]:
+        with open(self.legacy_path, "r", encoding="utf-8") as f:
+            names: dict[str, str] = json.load(f)
+        return {
+            user_id: UserProfile(
+                name,
+                self.client.url(f"/api/resource/avatar?uid={user_id}"),
+            )
+            for user_id, name in names.items()
+        }
+
+    def _is_fresh(self, profile: UserProfile, now: float) -> bool:
+        return now - profile.fetched_at < self.ttl
+
+    async def get(self, user_id: str) -> UserProfile | None:
+        """获取用户资料。
+
+        缓存命中时立即返回（过期则在后台刷新）；未命中时请求服务器，
+        并发的相同请求共享同一次结果。
+
+        Args:
+            user_id (str): 用户 ID
+
+        Returns:
+            用户资料，用户不存在时为 None
+
+        Raises:
+            PlatformError: 服务器返回错误且没有缓存的资料
+            aiohttp.ClientError: 网络错误且没有缓存的资料
+        """
+        now = time.time()
+        if (profile := self._profiles.get(user_id)) is not None:
+            if not self._is_fresh(profile, now):
+                self.refresh_nowait(user_id)
+            return profile
+        if (missing_at := self._missing.get(user_id)) is not None:
+            if now - missing_at < self.negative_ttl:
+                return None
+            del self._missing[user_id]
+        return await self._fetch(user_id)
+
+    async def get_many(
+        self,
+        user_ids: list[str],
+        *,
+        timeout: float | None = None,
+    ) -> dict[str, UserProfile | None]:
+        """批量获取用户资料。
+
+        缓存中的资料立即返回（过期则在后台刷新），未命中的用户并发请求，
+        并发数受 `concurrency` 限制。超过 `timeout` 仍未完成的用户返回 None，
+        其请求继续在后台完成并写入缓存，不会被取消。
+
+        Args:
+            user_ids (list[str]): 用户 ID 列表
+            timeout (float | None): 等待未命中用户的最长时间，单位: 秒，None 表示一直等待
+
+        Returns:
+            用户 ID -> 用户资料，不存在、请求失败或超时的用户为 None
+        """
+        now = time.time()
+        result: dict[str, UserProfile | None] = {}
+        tasks: dict[str, asyncio.Task[UserProfile | None]] = {}
+        for user_id in user_ids:
+            if (profile := self._profiles.get(user_id)) is not None:
+                if not self._is_fresh(profile, now):
+                    self.refresh_nowait(user_id)
+                result[user_id] = profile
+                continue
+            result[user_id] = None
+            missing_at = self._missing.get(user_id)
+            if missing_at is not None and now - missing_at < self.negative_ttl:
+                continue
+            if user_id not in tasks:
+                tasks[user_id] = self._fetch_task(user_id)
+        if tasks:
+            done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+            for user_id, task in tasks.items():
+                if task in done and not task.cancelled() and task.exception() is None:
+                    result[user_id] = task.result()
+            if pending:
+                logger.warning(f"批量获取用户资料超时: {len(pending)}/{len(tasks)} 个未完成")
+        return result
+
+    def touch(self, user_id: str) -> None:
+        """在用户未知或资料过期时后台刷新，不等待结果。
+
+        Args:
+            user_id (str): 用户 ID
+        """
+        profile = self._profiles.get(user_id)
+        if profile is None or not self._is_fresh(profile, time.time()):
+            self.refresh_nowait(user_id)
+
+    def refresh_nowait(self, user_id: str) -> None:
+        """在后台刷新用户资料。
+
+        Args:
+            user_id (str): 用户 ID
+        """
+        if user_id in self._inflight:
+            return
+        missing_at = self._missing.get(user_id)
+        if missing_at is not None and time.time() - missing_at < self.negative_ttl:
+            return
+        task = asyncio.create_task(self._refresh(user_id))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def invalidate(self, user_id: str) -> None:
+        """让用户资料在下次使用时刷新。
+
+        Args:
+            user_id (str): 用户 ID
+        """
+        self._missing.pop(user_id, None)
+        if (profile := self._profiles.get(user_id)) is not None:
+            profile.fetched_at = 0
+
+    def _fetch_task(self, user_id: str) -> asyncio.Task[UserProfile | None]:
+        if (task := self._inflight.get(user_id)) is None:
+            task = asyncio.create_task(self._request(user_id))
+            self._inflight[user_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+            # 调用方超时或取消后无人等待结果，避免“异常未被获取”的警告
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def _refresh(self, user_id: str) -> None:
+        try:
+            await self._fetch(user_id)
+        except Exception as e:
+            logger.debug(f"后台刷新用户资料失败: {user_id}, {e}")
+
+    async def _fetch(self, user_id: str) -> UserProfile | None:
+        # shield: 单个调用方取消时不影响其他等待同一结果的调用方
+        return await asyncio.shield(self._fetch_task(user_id))
+
+    async def _request(self, user_id: str) -> UserProfile | None:
+        try:
+            async with self._semaphore, self.client.get(
+                "/api/bot/user/{uid}",
+                params={"uid": user_id},
+            ) as response:
+                if response.status == 404:
+                    self._missing[user_id] = time.time()
+                    if self._profiles.pop(user_id, None) is not None:
+                        self._store.record(user_id, None)
+                    logger.debug(f"用户不存在: {user_id}")
+                    return None
+                if response.status >= 400:
+                    error_text = await response.text()
+                    raise PlatformError(message=f"Failed to get user info: HTTP {response.status}, {error_text}")
+                data = await response.json()
+        except Exception as e:
+            logger.error(f"更新好友信息失败: {e}")
+            # 暂时性错误：有旧资料时继续使用，否则交给调用方处理，不当作用户不存在
+            if (profile := self._profiles.get(user_id)) is not None:
+                return profile
+            raise
+        profile = UserProfile(
+            data.get("name", ""),
+            self.client.url(f"/api/resource/avatar?uid={user_id}"),
+            time.time(),
+        )
+        self._profiles[user_id] = profile
+        self._store.record(user_id, profile)
+        logger.debug(f"更新好友信息成功: {user_id}")
+        return profile
+
+    async def close(self) -> None:
+        """取消未完成的请求，并将资料写入快照。"""
+        for task in [*self._background, *self._inflight.values()]:
+            task.cancel()
+        await self._store.close()
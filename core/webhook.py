@@ -1,29 +1,151 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import hmac
+import time
 from core.logger import Logger
-from config import LOG_CONFIG
+from config import (
+    EVENT_ENRICH_BUDGET,
+    EVENT_ENRICH_ENABLED,
+    FILE_PREFETCH_MAX_SIZE,
+    FILE_PREFETCH_TYPES,
+    LOG_CONFIG,
+    WEBHOOK_DEDUPE_SIZE,
+    WEBHOOK_DEDUPE_WINDOW,
+    WEBHOOK_FAST_ACK,
+    WEBHOOK_QUEUE_SIZE,
+    WEBHOOK_RETRY_AFTER,
+    WEBHOOK_STATS_ACCESS_TOKEN,
+    WEBHOOK_STATS_ENABLED,
+    WEBHOOK_WORKERS,
+)
 
 log = Logger(LOG_CONFIG)
-import re
 from typing import Any
 from uuid import uuid4
 
 from aiohttp import web
+import msgspec
+from core.dedupe import MessageDeduplicator
+from core.download import FileInfo
+from core.enrich import EventEnricher
+from core.models import Properties, ReactionDetail, ReplyDetail, WebhookPayload, webhook_decoder
+from core.transcoder import alt_message, decode_content
 from pylibob.event import Event
 from pylibob.event.message import PrivateMessageEvent, GroupMessageEvent
+from pylibob.segment import Segment
 from pylibob.impl import OneBotImpl
 
 logger = log.get_logger(filename="webhook")
 
+
+class IngestStats:
+    """webhook 接收队列的计数器。
+
+    Attributes:
+        received (int): 收到的 webhook 请求数
+        enqueued (int): 成功入队的请求数
+        rejected (int): 因队列已满被拒绝（503）的请求数
+        invalid (int): 无法解析的请求数
+        processed (int): 处理完成的请求数
+        failed (int): 处理失败的请求数
+        max_depth (int): 观测到的最大队列深度
+        total_latency (float): 入队到处理完成的累计耗时，单位: 秒
+        max_latency (float): 入队到处理完成的最大耗时，单位: 秒
+    """
+
+    def __init__(self) -> None:
+        self.received = 0
+        self.enqueued = 0
+        self.rejected = 0
+        self.invalid = 0
+        self.processed = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def observe_latency(self, latency: float) -> None:
+        """记录一次入队到处理完成的耗时。"""
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def dict(self, depth: int) -> dict[str, Any]:
+        """转换为字典。
+
+        Args:
+            depth (int): 当前队列深度
+
+        Returns:
+            计数器字典
+        """
+        done = self.processed + self.failed
+        return {
+            "received": self.received,
+            "enqueued": self.enqueued,
+            "rejected": self.rejected,
+            "invalid": self.invalid,
+            "processed": self.processed,
+            "failed": self.failed,
+            "depth": depth,
+            "max_depth": self.max_depth,
+            "avg_latency": self.total_latency / done if done else 0.0,
+            "max_latency": self.max_latency,
+        }
+
+
 class VoceChatWebhook:
-    def __init__(self, impl: OneBotImpl, host: str, port: int) -> None:
+    """VoceChat webhook 服务器。
+
+    快速应答模式（`fast_ack`）下，请求处理器只校验请求体并将其放入有界队列后立即返回，
+    由 `workers` 个工作协程消费队列、构建事件并推送；队列已满时返回 `503` 与 `Retry-After`，
+    让 VoceChat 稍后重试。关闭快速应答时，在请求内同步完成处理。
+
+    VoceChat 重试推送的重复消息会在入队前按 `mid` 去重并直接返回 `200`；
+    `mid` 只在入队成功或处理成功后记录，返回 503/500 的消息重试时仍会处理。
+
+    消息事件推送前经过 `enricher` 补充用户昵称、群组名称等扩展字段，未启用时为 None。
+
+    运行计数接口 `/stats` 默认不注册（`stats_enabled`）；启用后设置了 `stats_token` 时
+    需要携带访问令牌，否则返回 `401`。
+    """
+
+    def __init__(
+        self,
+        impl: OneBotImpl,
+        host: str,
+        port: int,
+        *,
+        fast_ack: bool = WEBHOOK_FAST_ACK,
+        queue_size: int = WEBHOOK_QUEUE_SIZE,
+        workers: int = WEBHOOK_WORKERS,
+        retry_after: int = WEBHOOK_RETRY_AFTER,
+        stats_enabled: bool = WEBHOOK_STATS_ENABLED,
+        stats_token: str = WEBHOOK_STATS_ACCESS_TOKEN,
+    ) -> None:
         self.impl = impl
         self.host = host
         self.port = port
+        self.fast_ack = fast_ack
+        self.queue_size = queue_size
+        self.workers = max(workers, 1)
+        self.retry_after = retry_after
+        self.stats_token = stats_token
+        self.stats = IngestStats()
+        self.dedupe = MessageDeduplicator(WEBHOOK_DEDUPE_SIZE, WEBHOOK_DEDUPE_WINDOW)
+        self.enricher: EventEnricher | None = None
+        if EVENT_ENRICH_ENABLED and impl.vocechat is not None:
+            self.enricher = EventEnricher(
+                impl.vocechat,
+                platform=next(iter(impl.bots.values())).platform,
+                budget=EVENT_ENRICH_BUDGET,
+            )
+        self.queue: asyncio.Queue[tuple[float, WebhookPayload]] | None = None
+        self._worker_tasks: list[asyncio.Task] = []
         self.app = web.Application()
         self.app.router.add_get("/", self.health_check)
+        if stats_enabled:
+            self.app.router.add_get("/stats", self.handle_stats)
         self.app.router.add_post("/", self.handle_webhook)
         self.runner: web.AppRunner | None = None
 
@@ -31,121 +153,190 @@ class VoceChatWebhook:
         """健康检查，返回200状态码"""
         return web.Response(status=200)
 
+    def authorize(self, request: web.Request) -> bool:
+        """按 OneBot 的方式校验访问令牌：`Authorization: Bearer <令牌>` 或 `access_token` 查询参数。"""
+        if not self.stats_token:
+            return True
+        token = request.headers.get("Authorization", "")
+        if token.startswith("Bearer ") and hmac.compare_digest(token[7:], self.stats_token):
+            return True
+        return hmac.compare_digest(request.query.get("access_token", ""), self.stats_token)
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        """返回接收队列的计数器"""
+        if not self.authorize(request):
+            logger.warning(f"{request.path} 鉴权失败: {request.remote}")
+            return web.Response(status=401)
+        return web.json_response(self.get_stats())
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取 webhook 的运行计数"""
+        depth = self.queue.qsize() if self.queue else 0
+        return {
+            "ingest": self.stats.dict(depth),
+            "dedupe": self.dedupe.dict(),
+            "enrich": self.enricher.dict() if self.enricher else None,
+            "groups": self.impl.vocechat.groups.dict() if self.impl.vocechat else None,
+            "ratelimit": self.impl.vocechat.limiter.dict() if self.impl.vocechat else None,
+            "circuit": self.impl.vocechat.breaker.dict() if self.impl.vocechat else None,
+            "uploads": self.impl.vocechat.uploader.dict() if self.impl.vocechat else None,
+            "files": self.impl.vocechat.files.dict() if self.impl.vocechat else None,
+            "file_meta": self.impl.vocechat.file_meta.dict() if self.impl.vocechat else None,
+        }
+
     async def handle_webhook(self, request: web.Request) -> web.Response:
         """处理VoceChat的webhook请求"""
+        self.stats.received += 1
         try:
-            data = await request.json()
-            logger.debug(f"Received webhook data: {data}")
-            
-            # 提取基本信息
-            message_id = str(data.get("mid", ""))
-            from_user_id = str(data.get("from_uid", ""))
-            target = data.get("target", {})
-            detail = data.get("detail", {})
-            content = detail.get("content", "")
-            content_type = detail.get("content_type", "")
-            
-            # 构建消息内容
-            message = []
-            
-            # 处理回复消息
-            if detail.get("type") == "reply":
-                reply_mid = str(detail.get("mid", ""))  # 被回复的消息ID
-                message.append({
-                    "type": "reply",
-                    "data": {
-                        "message_id": reply_mid,
-                        "user_id": from_user_id
-                    }
-                })
-            
-            # 处理@消息
-            mention_pattern = r"@(\d+)\s"
-            current_pos = 0
-            for match in re.finditer(mention_pattern, content):
-                # 添加@之前的文本
-                if match.start() > current_pos:
-                    pre_text = content[current_pos:match.start()]
-                    if pre_text.strip():
-                        message.append({
-                            "type": "text",
-                            "data": {"text": pre_text}
-                        })
-                
-                # 添加@消息段
-                message.append({
-                    "type": "mention",
-                    "data": {"user_id": match.group(1)}
-                })
-                current_pos = match.end()
-            
-            # 添加剩余文本
-            if current_pos < len(content):
-                message.append({
-                    "type": "text",
-                    "data": {"text": content[current_pos:]}
-                })
-            
-            # 如果消息列表为空，添加一个空文本消息段
-            if not message:
-                message.append({
-                    "type": "text",
-                    "data": {"text": content}
-                })
-            
-            # 如果是文件消息，添加文件信息
-            if content_type == "vocechat/file":
-                properties = detail.get("properties", {})
-                file_type = properties.get("content_type", "")
-                if file_type.startswith("image/"):
-                    message.append({
-                        "type": "image",
-                        "data": {"file_id": content}
-                    })
-            
-            # 确定消息类型（群聊/私聊）
-            # 生成事件唯一标识符
-            event_id = str(uuid4())
-            created_at = data.get("created_at", 0) / 1000
-            if "gid" in target:
-                event = GroupMessageEvent(
-                    self=list(self.impl.bots.values())[0],
-                    id=event_id,
-                    message_id=message_id,
-                    message=message,
-                    alt_message=content,
-                    group_id=str(target["gid"]),
-                    user_id=from_user_id,
-                    time=created_at
-                )
-            else:
-                event = PrivateMessageEvent(
-                    self=list(self.impl.bots.values())[0],
-                    id=event_id,
-                    message_id=message_id,
-                    message=message,
-                    alt_message=content,
-                    user_id=from_user_id,
-                    time=created_at
-                )
-                # print(event.dict())
-            
-            # 创建并发送事件
-            await self.impl.update_status()
-            asyncio.create_task(self.impl.emit(event))
-            # 更新好友信息
-            from core.bot_actions import FriendManager
-            friend_manager = FriendManager(self.impl)
-            await friend_manager.update_friend_info(from_user_id)
-            
+            data = webhook_decoder.decode(await request.read())
+        except msgspec.DecodeError as e:
+            self.stats.invalid += 1
+            logger.error(f"Invalid webhook payload: {e}")
+            return web.Response(status=400)
+
+        if self.dedupe.check(data.mid):
+            logger.debug(f"忽略重复推送的消息: {data.mid}")
             return web.Response(status=200)
-            
-        except Exception as e:
-            logger.error(f"Error handling webhook: {e}")
-            return web.Response(status=500)
+
+        if self.queue is None:
+            # 同步模式: 在请求内完成处理；先记录以挡住处理期间到达的重复推送，失败时删除记录让重试生效
+            self.dedupe.mark(data.mid)
+            try:
+                await self.process(data)
+                self.stats.processed += 1
+            except Exception as e:
+                self.dedupe.discard(data.mid)
+                self.stats.failed += 1
+                logger.error(f"Error handling webhook: {e}")
+                return web.Response(status=500)
+            return web.Response(status=200)
+
+        try:
+            self.queue.put_nowait((time.monotonic(), data))
+        except asyncio.QueueFull:
+            self.stats.rejected += 1
+            logger.warning(f"webhook 接收队列已满({self.queue_size})，要求VoceChat {self.retry_after} 秒后重试")
+            return web.Response(
+                status=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        # 入队成功后才记录，被拒绝的消息在 VoceChat 重试时仍会处理
+        self.dedupe.mark(data.mid)
+        self.stats.enqueued += 1
+        self.stats.max_depth = max(self.stats.max_depth, self.queue.qsize())
+        return web.Response(status=200)
+
+    async def _worker(self) -> None:
+        """消费接收队列的工作协程"""
+        assert self.queue is not None
+        while True:
+            enqueued_at, data = await self.queue.get()
+            try:
+                await self.process(data)
+                self.stats.processed += 1
+            except Exception as e:
+                self.stats.failed += 1
+                logger.error(f"Error handling webhook: {e}")
+            finally:
+                self.stats.observe_latency(time.monotonic() - enqueued_at)
+                self.queue.task_done()
+
+    async def process(self, data: WebhookPayload) -> None:
+        """将webhook数据转换为OneBot事件并推送"""
+        logger.debug(f"Received webhook data: {data}")
+        detail = data.detail
+        if isinstance(detail, ReactionDetail):
+            # 编辑、删除、表情回应没有对应的OneBot消息事件
+            logger.debug(f"忽略消息操作: {detail.mid} {detail.detail}")
+            return
+
+        # 提取基本信息
+        message_id = str(data.mid)
+        from_user_id = str(data.from_uid)
+        target = data.target
+        content = detail.content
+        content_type = detail.content_type
+        
+        # 构建消息内容
+        message: list[Segment] = []
+        
+        # 处理回复消息
+        if isinstance(detail, ReplyDetail):
+            reply_mid = str(detail.mid)  # 被回复的消息ID
+            message.append(Segment("reply", {"message_id": reply_mid, "user_id": from_user_id}))
+        
+        message += decode_content(content_type, content, detail.properties)
+        if content_type == "vocechat/file":
+            # 文件消息的内容为文件路径，替代文本按消息段生成
+            self._observe_file(content, detail.properties, message[-1].type)
+            alt = alt_message(message)
+        else:
+            alt = content
+
+        # 确定消息类型（群聊/私聊）
+        # 生成事件唯一标识符
+        event_id = str(uuid4())
+        created_at = data.created_at / 1000
+        if target.gid is not None:
+            event = GroupMessageEvent(
+                self=list(self.impl.bots.values())[0],
+                id=event_id,
+                message_id=message_id,
+                message=message,
+                alt_message=alt,
+                group_id=str(target.gid),
+                user_id=from_user_id,
+                time=created_at
+            )
+        else:
+            event = PrivateMessageEvent(
+                self=list(self.impl.bots.values())[0],
+                id=event_id,
+                message_id=message_id,
+                message=message,
+                alt_message=alt,
+                user_id=from_user_id,
+                time=created_at
+            )
+            # print(event.dict())
+        
+        # 补充扩展字段后发送事件
+        if self.enricher is not None:
+            await self.enricher.enrich(event)
+        await self.impl.emit(event)
+        # 在后台刷新发送者的用户资料，不阻塞事件处理
+        if self.impl.vocechat is not None:
+            self.impl.vocechat.users.touch(from_user_id)
+            if target.gid is not None:
+                self.impl.vocechat.groups.observe(target.gid, data.from_uid)
+
+    def _observe_file(self, file_path: str, properties: Properties | None, segment_type: str) -> None:
+        """记录文件消息的元数据，并按策略预取附件。"""
+        client = self.impl.vocechat
+        if client is None:
+            return
+        properties = properties or Properties()
+        # 记录文件元数据，之后的 get_file 不需要再请求服务器
+        client.file_meta.put(FileInfo(
+            file_path,
+            properties.name,
+            properties.content_type,
+            properties.size or None,
+        ))
+        if (
+            segment_type in FILE_PREFETCH_TYPES
+            and 0 < properties.size <= FILE_PREFETCH_MAX_SIZE
+        ):
+            client.files.prefetch(file_path)
 
     async def start(self) -> None:
         """启动webhook服务器"""
+        if self.fast_ack:
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+            self._worker_tasks = [
+                asyncio.create_task(self._worker()) for _ in range(self.workers)
+            ]
+            logger.info(f"webhook 快速应答模式已启用: 队列长度 {self.queue_size}, 工作协程 {self.workers}")
         self.runner = web.AppRunner(self.app)
         await self.runner.setup()
         site = web.TCPSite(self.runner, self.host, self.port)
@@ -157,3 +348,14 @@ class VoceChatWebhook:
         if self.runner:
             await self.runner.cleanup()
             logger.info("VoceChat webhook server stopped")
+        if self.queue is not None:
+            # 尽量处理完已入队的请求
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=5)
+            except asyncio.TimeoutError:
+                logger.warning(f"webhook 接收队列仍有 {self.queue.qsize()} 条未处理")
+        for task in self._worker_tasks:
+            task.cancel()
+        self._worker_tasks.clear()
+        if self.enricher is not None:
+            self.enricher.close()
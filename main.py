@@ -10,7 +10,7 @@ from core.logger import Logger
 
 from pylibob import OneBotImpl, Event  # Keep necessary pylibob imports
 from core.bot_actions import register_actions # Import the registration function
-from config import IMPL_NAME, IMPL_VERSION, CONNECTIONS, BOT_CONFIG, BOT_SERVER_URL # Import config
+from config import IMPL_NAME, IMPL_VERSION, CONNECTIONS, BOT_CONFIG, BOT_SERVER_URL, STATUS_UPDATE_INTERVAL # Import config
 
 # 检查并生成.env文件
 if not os.path.exists('.env'):
@@ -36,6 +36,16 @@ WEBSOCKET_REVERSE_URL=ws://127.0.0.1:8080/onebot/v12/
 # 对外监听vocechat的Webhook服务器配置
 WEBHOOK_HOST=0.0.0.0
 WEBHOOK_PORT=8000
+WEBHOOK_FAST_ACK=true # 快速应答：校验后入队立即返回，由工作协程异步处理
+WEBHOOK_QUEUE_SIZE=1000 # 接收队列长度，队列满时返回503
+WEBHOOK_WORKERS=4 # 处理队列的工作协程数量
+WEBHOOK_RETRY_AFTER=1 # 队列满时建议VoceChat重试的间隔(秒)
+WEBHOOK_DEDUPE_SIZE=10000 # 去重索引最多保存的消息ID数量
+WEBHOOK_DEDUPE_WINDOW=600 # 去重时间窗口(秒)
+WEBHOOK_STATS_ENABLED=false # 是否启用 /stats 运行计数接口
+WEBHOOK_STATS_ACCESS_TOKEN= # /stats 的访问令牌，留空时使用 HTTP_ACCESS_TOKEN
+EVENT_ENRICH_ENABLED=true # 推送消息事件前附加 vocechat.user_name、vocechat.user_avatar、vocechat.group_name 扩展字段
+EVENT_ENRICH_BUDGET=0.2 # 缓存未命中时等待用户/群组信息的最长时间(秒)，超时不附加，0 表示只使用缓存
 
 # Vocechat机器人配置
 BOT_USER_ID=12 # 机器人用户ID
@@ -46,6 +56,67 @@ BOT_API_KEY=your_api_key
 PROXY_ENABLED=false # 是否启用代理
 SEND_PROXY=http://127.0.0.1:7897 # 代理服务器地址
 
+# VoceChat API 连接池配置
+VOCECHAT_CONN_LIMIT=100 # 连接池总连接数上限
+VOCECHAT_CONN_LIMIT_PER_HOST=32 # 单个主机连接数上限
+VOCECHAT_DNS_CACHE_TTL=300 # DNS缓存时间(秒)
+VOCECHAT_KEEPALIVE_TIMEOUT=60 # 空闲连接保持时间(秒)
+VOCECHAT_CONNECT_TIMEOUT=10 # 建立连接超时时间(秒)
+VOCECHAT_READ_TIMEOUT=60 # 读取响应超时时间(秒)
+
+# VoceChat API 重试与熔断配置
+RETRY_ATTEMPTS=3 # 最多尝试次数(包含第一次)
+RETRY_BASE_DELAY=0.2 # 指数退避基础间隔(秒)
+RETRY_MAX_DELAY=5 # 指数退避最大间隔(秒)
+RETRY_ENDPOINTS={} # 按接口路径前缀覆盖重试策略(JSON)，如 {"/api/bot/send_to_group": {"attempts": 5}}
+CIRCUIT_FAILURE_THRESHOLD=5 # 连续失败多少次后熔断
+CIRCUIT_RESET_TIMEOUT=30 # 熔断后多久尝试恢复(秒)
+
+# 用户资料缓存配置
+USER_CACHE_TTL=600 # 用户资料过期时间(秒)，过期后在后台刷新
+USER_CACHE_NEGATIVE_TTL=60 # 不存在用户的缓存时间(秒)
+USER_FETCH_CONCURRENCY=8 # 同时向服务器请求用户资料的最大数量
+GROUP_MEMBER_RESOLVE_TIMEOUT=5 # 获取群成员列表时等待未知成员昵称的最长时间(秒)，超时的成员昵称为空
+USER_STORE_PATH=friend_list.msgpack # 用户资料快照文件，变更日志为同名 .log 文件
+USER_STORE_FLUSH_DELAY=1 # 用户资料变更合并写入磁盘的等待时间(秒)
+
+# 消息发送配置
+SEND_MODE=strict # 多消息段的发送模式: strict(按顺序逐条发送) 或 fast(并发发送，不保证顺序)
+SEND_CONCURRENCY=4 # fast 模式下的最大并发发送数
+
+# 文件上传配置
+UPLOAD_BUFFER_SIZE=262144 # 从url/path流式上传时每次读取的最大字节数，也是每个上传的内存占用上限
+UPLOAD_CHUNK_SIZE=4194304 # 分块上传时每块的大小，分块边读边发送，不整块缓存在内存中
+UPLOAD_CACHE_SIZE=10000 # 上传缓存的最大记录数，相同内容的文件直接复用之前的上传，0 表示禁用
+UPLOAD_CACHE_TTL=604800 # 上传缓存记录的有效期(秒)
+UPLOAD_CACHE_PATH=upload_cache.msgpack # 上传缓存的保存路径
+UPLOAD_SPOOL_DIR=upload_spool # 分片上传的暂存目录
+UPLOAD_FRAGMENT_TTL=3600 # 分片上传闲置多久(秒)后丢弃
+UPLOAD_FRAGMENT_MAX_SIZE=0 # 分片上传的最大文件大小(字节)，0 表示不限制
+FILE_CACHE_DIR=file_cache # get_file 下载文件的本地缓存目录
+FILE_CACHE_MAX_BYTES=1073741824 # 文件缓存的容量(字节)，超出时淘汰最久未使用的文件
+FILE_CACHE_PATH_LEASE=300 # get_file 以 path 返回的缓存文件在多少秒内不会被淘汰
+FILE_PREFETCH_TYPES= # 收到这些类型的文件消息时在后台预取到文件缓存，逗号分隔，如 image,voice，为空表示不预取
+FILE_PREFETCH_MAX_SIZE=10485760 # 预取的最大文件大小(字节)
+FILE_PREFETCH_CONCURRENCY=2 # 同时进行的预取下载数
+FILE_PREFETCH_MAX_PENDING=100 # 最多等待中的预取数，超出时丢弃新的预取
+VOICE_CONTENT_TYPES=audio/webm,audio/ogg,audio/amr # 作为语音(voice)消息段的文件类型，其他音频为 audio 消息段
+FILE_META_CACHE_SIZE=10000 # 文件元数据(文件名、类型、大小)缓存的最大记录数
+DOWNLOAD_FRAGMENT_MAX_SIZE=8388608 # 分片获取文件时单个分片的最大大小(字节)
+
+# 发送限速配置，速率为0表示不限速
+RATE_LIMIT_RATE=10 # 全局每秒发送数
+RATE_LIMIT_BURST=20 # 全局突发发送数
+RATE_LIMIT_TARGET_RATE=2 # 每个用户/群组每秒发送数
+RATE_LIMIT_TARGET_BURST=10 # 每个用户/群组突发发送数
+RATE_LIMIT_MAX_WAIT=10 # 发送排队的最长等待时间(秒)，超过后返回失败
+
+# 群组缓存过期时间(秒)，收到未知群组或新成员的消息时提前失效
+GROUP_CACHE_TTL=300
+
+# 两次状态更新事件之间的最小间隔(秒)，0表示状态变化时立即推送
+STATUS_UPDATE_INTERVAL=0
+
 # 日志配置
 LOG_ENABLED=true
 LOG_LEVEL=INFO
@@ -65,6 +136,7 @@ impl = OneBotImpl(
     IMPL_VERSION,
     CONNECTIONS,
     BOT_CONFIG,
+    status_update_interval=STATUS_UPDATE_INTERVAL,
 )
 
 # Register the action handlers from the core module
@@ -91,10 +163,10 @@ async def check_version():
 if __name__ == "__main__":
     async def main():
         await check_version()
+        # 当前状态在 impl.run 启动后推送
         for bot in impl.bots.values():
             bot.online = True
         impl.is_good = True
-        await impl.update_status()
 
     # 使用 asyncio.run() 来运行异步任务
     asyncio.run(main())
@@ -42,9 +42,11 @@ from .segment import (
     Location as Location,
     Mention as Mention,
     MentionAll as MentionAll,
+    MessageSegment as MessageSegment,
     Reply as Reply,
     Segment as Segment,
     Text as Text,
+    TypedSegment as TypedSegment,
     Video as Video,
     Voice as Voice,
 )
@@ -17,7 +17,7 @@ from pylibob.types import (
     ContentType,
     FailedActionResponse,
 )
-from pylibob.utils import authorize, detect_content_type
+from pylibob.utils import authorize, detect_content_type, encode_response
 from pylibob.version import __version__
 
 from aiohttp import ClientSession, ClientTimeout
@@ -104,6 +104,31 @@ class Connection:
         bot_self: BotSelf | None = data.get("self")
         return await self.impl.handle_action(action, params, bot_self, echo)
 
+    async def run_action_encoded(
+        self,
+        data: dict[str, Any],
+        content_type: ContentType,
+    ) -> bytes:
+        """以原始数据运行动作响应器，返回编码后的响应。
+
+        静态元动作直接使用 `OneBotImpl` 缓存的编码结果。
+
+        Args:
+            data (dict[str, Any]): 原始数据
+            content_type (ContentType): 响应的编码格式
+        """
+        action = data.get("action")
+        params = data.get("params")
+        if not action or params is None:
+            return encode_response(await self.run_action(data), content_type)
+        return await self.impl.handle_action_encoded(
+            action,
+            params,
+            content_type,
+            data.get("self"),
+            data.get("echo"),
+        )
+
     def init_connection(self) -> None:
         """初始化连接。"""
 
@@ -231,14 +256,8 @@ class HTTP(ServerConnection):
         self.logger.info(
             f"[RECEIVE({content_type.name}) <= {request.url}] {data}",
         )
-        resp = await self.run_action(data)
-        convert_func = (
-            msgspec.json.encode
-            if content_type == ContentType.JSON
-            else msgspec.msgpack.encode
-        )
         return Response(
-            convert_func(resp),
+            await self.run_action_encoded(data, content_type),
             headers={"Content-Type": content_type.value},
         )
 
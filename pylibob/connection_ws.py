@@ -314,6 +314,8 @@ class WebSocket(WebSocketConnection, ServerConnection):
                 version=self.impl.impl_ver,
             ).dict(),
         )
+        # 状态更新事件只在状态变化时推送，新连接需要先收到一次当前状态
+        await ws_protocol.send_json(self.impl.status_event().dict())
         self.ws.append(ws_protocol)
         try:
             await self.listen_ws(ws_protocol)
@@ -392,6 +394,9 @@ class WebSocketReverse(
                                 version=self.impl.impl_ver,
                             ).dict(),
                         )
+                        await ws_protocol.send_json(
+                            self.impl.status_event().dict(),
+                        )
                         self.logger.info(
                             f"连接到反向 WS 服务器成功 - URL: {self.url} | 协议版本: {self.impl.onebot_version}.{self.impl.name} | 实现版本: {self.impl.impl_ver}"
                         )
@@ -8,7 +8,11 @@ from pylibob.status import (
     BAD_PARAM,
     BAD_REQUEST,
     BAD_SEGMENT_DATA,
+    FILESYSTEM_ERROR,
     INTERNAL_HANDLER_ERROR,
+    LOGIC_ERROR,
+    NETWORK_ERROR,
+    PLATFORM_ERROR,
     UNKNOWN_SELF,
     UNSUPPORTED_ACTION,
     UNSUPPORTED_PARAM,
@@ -140,3 +144,43 @@ class InternalHandlerError(OneBotImplError):
 
     def __init__(self, data: Any = None, message: str = "") -> None:
         super().__init__(INTERNAL_HANDLER_ERROR, data, message)
+
+
+class FilesystemError(OneBotImplError):
+    """`32000` 文件系统错误。
+
+    如读取或写入文件失败等。
+    """
+
+    def __init__(self, data: Any = None, message: str = "") -> None:
+        super().__init__(FILESYSTEM_ERROR, data, message)
+
+
+class NetworkError(OneBotImplError):
+    """`33000` 网络错误。
+
+    如下载文件失败等。
+    """
+
+    def __init__(self, data: Any = None, message: str = "") -> None:
+        super().__init__(NETWORK_ERROR, data, message)
+
+
+class PlatformError(OneBotImplError):
+    """`34000` 机器人平台错误。
+
+    如由于机器人平台限制导致消息发送失败等。
+    """
+
+    def __init__(self, data: Any = None, message: str = "") -> None:
+        super().__init__(PLATFORM_ERROR, data, message)
+
+
+class LogicError(OneBotImplError):
+    """`35000` 动作逻辑错误。
+
+    如尝试向不存在的用户发送消息等。
+    """
+
+    def __init__(self, data: Any = None, message: str = "") -> None:
+        super().__init__(LOGIC_ERROR, data, message)
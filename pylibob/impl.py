@@ -2,25 +2,29 @@
 from __future__ import annotations
 
 import asyncio
+from collections import OrderedDict
 import inspect
 from core.logger import Logger
 import sys
 import time
-from typing import Any, Callable, NamedTuple, cast
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple, cast, get_args
 from uuid import uuid4
 
-from pylibob.connection import Connection, HTTPWebhook, ServerConnection
-from pylibob.connection_ws import WebSocketConnection, WebSocketReverse
+from pylibob.connection import Connection, ServerConnection
+from pylibob.connection_ws import WebSocketReverse
 from pylibob.event import Event, MetaStatusUpdateEvent
 from pylibob.exception import OneBotImplError
 from pylibob.runner import ClientRunner, ServerRunner
+from pylibob.segment import TypedSegment
 from pylibob.status import (
     BAD_PARAM,
+    BAD_SEGMENT_DATA,
     INTERNAL_HANDLER_ERROR,
     OK,
     UNKNOWN_SELF,
     UNSUPPORTED_ACTION,
     UNSUPPORTED_PARAM,
+    UNSUPPORTED_SEGMENT,
     WHO_AM_I,
 )
 from pylibob.types import (
@@ -28,6 +32,7 @@ from pylibob.types import (
     ActionResponse,
     Bot,
     BotSelf,
+    ContentType,
     FailedActionResponse,
     Status,
 )
@@ -36,6 +41,7 @@ from pylibob.utils import (
     TypingType,
     analytic_typing,
     background_task,
+    encode_response,
 )
 
 import msgspec
@@ -46,15 +52,83 @@ if sys.version_info >= (3, 9):
 else:
     from typing_extensions import Annotated
 
+if TYPE_CHECKING:
+    from core.client import VoceChatClient
+
 log = Logger()
 logger = log.get_logger(filename="impl")
 
+# 不随请求变化的元动作，响应数据在首次执行后缓存
+_STATIC_ACTIONS = frozenset({"get_version", "get_supported_actions"})
+# 编码后的元动作响应最多缓存的（动作, echo, 编码格式）组合数
+_STATIC_RESPONSE_CACHE_SIZE = 256
+
+
+class SegmentParam(NamedTuple):
+    """包含类型化消息段的参数。
+
+    Attributes:
+        name (str): 请求中的参数名
+        type (Any): 参数类型
+        tags (frozenset[str]): 参数支持的消息段类型
+    """
+
+    name: str
+    type: Any  # noqa: A003
+    tags: frozenset[str]
+
 
 class ActionHandlerWithValidate(NamedTuple):
+    """注册时编译好的动作响应器。
+
+    Attributes:
+        handler (ActionHandler): 响应器函数
+        model (type[Struct]): 参数模型，扩展参数以请求中的参数名作为字段名，不允许多余的参数
+        bot_params (tuple[str, ...]): 注解为 `Bot` 的参数名
+        param_names (frozenset[str]): 请求中的参数名
+        segment_params (tuple[SegmentParam, ...]): 包含类型化消息段的参数
+    """
+
     handler: ActionHandler
-    keys: set[str]
-    typing_types: dict[str, tuple[type, TypingType]]
-    model: type[Struct] | None
+    model: type[Struct]
+    bot_params: tuple[str, ...]
+    param_names: frozenset[str]
+    segment_params: tuple[SegmentParam, ...]
+
+
+def _segment_tags(type_: Any) -> frozenset[str]:
+    """类型注解中 `TypedSegment` 消息段的类型（tag）。"""
+    if isinstance(type_, type) and issubclass(type_, TypedSegment):
+        tag = type_.__struct_config__.tag
+        return frozenset({tag}) if isinstance(tag, str) else frozenset()
+    return frozenset().union(*(_segment_tags(arg) for arg in get_args(type_)))
+
+
+def _validation_retcode(
+    params: dict[str, Any],
+    param_names: frozenset[str],
+    segment_params: tuple[SegmentParam, ...],
+) -> int:
+    """校验失败后重新检查参数，选择返回码。
+
+    多余的参数为 `10004`；消息段列表中缺少 `type` 或类型未知为 `10005`，
+    类型已知但单独转换消息段列表失败为 `10006`；其余为 `10003`。
+    只在校验失败时调用，不依赖 msgspec 的错误信息。
+    """
+    if not params.keys() <= param_names:
+        return UNSUPPORTED_PARAM
+    for name, type_, tags in segment_params:
+        value = params.get(name)
+        if not isinstance(value, list):
+            continue
+        for segment in value:
+            if isinstance(segment, dict) and segment.get("type") not in tags:
+                return UNSUPPORTED_SEGMENT
+        try:
+            msgspec.convert(value, type_)
+        except ValidationError:
+            return BAD_SEGMENT_DATA
+    return BAD_PARAM
 
 
 class OneBotImpl:
@@ -67,7 +141,8 @@ class OneBotImpl:
 
     内部已实现元动作 `get_version` `get_status` `get_supported_actions`。
 
-    状态更新事件使用 `update_status` 方法推送。
+    状态更新事件使用 `update_status` 方法推送，仅在状态变化时推送。
+    修改 `is_good` 会自动推送，修改 Bot 的 `online` 后需要调用 `update_status`。
 
     Attributes:
         name (str): 实现名称
@@ -75,7 +150,9 @@ class OneBotImpl:
         conns (list[Connection]): 实现启用的连接列表
         conn_types (set[str]): 实现启用的连接类型
         onebot_version (str): OneBot 标准版本号
-        is_good (bool): OneBot 实现运行状态是否正常
+        is_good (bool): OneBot 实现运行状态是否正常，变化时推送状态更新事件
+        status_update_interval (float): 两次状态更新事件之间的最小间隔，单位: 秒
+        vocechat (VoceChatClient | None): VoceChat API 客户端，在 `run` 时创建
     """
 
     def __init__(
@@ -85,6 +162,7 @@ class OneBotImpl:
         conns: list[Connection],
         *bots: Bot,
         onebot_version: str = "12",
+        status_update_interval: float = 0,
     ) -> None:
         """初始化 OneBot 实现。
 
@@ -93,6 +171,7 @@ class OneBotImpl:
             version (str): 实现版本
             conns (list[Connection]): 实现启用的连接列表
             onebot_version (str, optional): OneBot 标准版本号 Defaults to "12".
+            status_update_interval (float, optional): 两次状态更新事件之间的最小间隔，单位: 秒 Defaults to 0.
             *bots (Bot): 一系列 Bot 实例
 
         Raises:
@@ -104,8 +183,16 @@ class OneBotImpl:
         self.name = name
         self.version = version
         self.onebot_version = onebot_version
-        self.is_good = True
+        self._is_good = True
+        self.status_update_interval = status_update_interval
+        self._last_status: Status | None = None
+        self._last_status_time = 0.0
+        self._pending_status: asyncio.Task | None = None
+        self.vocechat: VoceChatClient | None = None
         self.actions: dict[str, ActionHandlerWithValidate] = {}
+        self._static_data: dict[str, Any] = {}
+        self._static_raw: dict[tuple[str, ContentType], msgspec.Raw] = {}
+        self._static_responses: OrderedDict[tuple[str, str | None, ContentType], bytes] = OrderedDict()
         if not bots:
             raise ValueError("OneBotImpl needs at least one bot")
         self.bots: dict[str, Bot] = {
@@ -131,6 +218,26 @@ class OneBotImpl:
             self._action_get_supported_actions,
         )
 
+    @property
+    def is_good(self) -> bool:
+        """OneBot 实现运行状态是否正常。"""
+        return self._is_good
+
+    @is_good.setter
+    def is_good(self, value: bool) -> None:
+        changed = value != self._is_good
+        self._is_good = value
+        if not changed:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # 尚未运行，启动时会推送一次当前状态
+            return
+        task = asyncio.create_task(self.update_status())
+        background_task.add(task)
+        task.add_done_callback(background_task.remove)
+
     @property
     def status(self) -> Status:
         """当前 OneBot 实现的状态。
@@ -164,7 +271,7 @@ class OneBotImpl:
         可以注册标准动作和扩展动作（建议包含前缀）。
 
         动作响应器的函数可以使用 Type Hints 声明动作参数及类型，不符合 Type Hints 的动作将由 pylibob 自动返回 `10003 Bad Param`；
-        多余的参数会由 pylibob 自动返回 `10006 Unsupported Param`。
+        多余的参数会由 pylibob 自动返回 `10004 Unsupported Param`。
 
         对于扩展参数，可以使用 Annotated 标注类型，第一个 metadata 会被视为参数名。
 
@@ -172,6 +279,9 @@ class OneBotImpl:
 
         支持使用默认值。
 
+        注解中包含 `MessageSegment` 等类型化消息段的参数，响应器收到的是解码后的消息段实例；
+        未知的消息段类型返回 `10005 Unsupported Segment`，消息段数据错误返回 `10006 Bad Segment Data`。
+
         动作响应器的返回值会作为动作响应的 `data`。
 
         示例:
@@ -203,26 +313,50 @@ class OneBotImpl:
             响应器函数
         """  # noqa: E501
         types = analytic_typing(func)
-        keys = set()
-        types_dict = {}
         struct_type = []
+        bot_params = []
+        segment_params = []
         for name, type_, default, typing_type in types:
-            keys.add(name)
-            types_dict[name] = type_, typing_type
+            if typing_type is TypingType.BOT:
+                # 请求动作的 Bot 实例在分发时传入，不属于请求参数
+                bot_params.append(name)
+                continue
+            param_name = name
+            if typing_type is TypingType.ANNOTATED:
+                param_name = cast(Annotated, type_).__metadata__[0]
+            tags = _segment_tags(type_)
+            if tags:
+                segment_params.append(SegmentParam(param_name, type_, tags))
             if default is inspect.Parameter.empty:
-                struct_type.append((name, type_))
-            else:
-                struct_type.append((name, type_, default))
+                default = msgspec.NODEFAULT
+            struct_type.append(
+                (name, type_, msgspec.field(default=default, name=param_name)),
+            )
         self.actions[action] = ActionHandlerWithValidate(
             func,
-            keys,
-            types_dict,
-            defstruct(f"{action}ValidateModel", struct_type),
+            defstruct(
+                f"{action}ValidateModel",
+                struct_type,
+                kw_only=True,
+                forbid_unknown_fields=True,
+            ),
+            tuple(bot_params),
+            frozenset(field.name for _, _, field in struct_type),
+            tuple(segment_params),
         )
+        # 支持的动作列表已变化
+        self._drop_static("get_supported_actions")
         logger.info(f"已注册动作: {action}")
         logger.debug(f"动作 {action} 类型: {types}")
         return func
 
+    def _drop_static(self, action: str) -> None:
+        self._static_data.pop(action, None)
+        for content_type in ContentType:
+            self._static_raw.pop((action, content_type), None)
+        for key in [key for key in self._static_responses if key[0] == action]:
+            del self._static_responses[key]
+
     def action(
         self,
         action: str,
@@ -256,9 +390,14 @@ class OneBotImpl:
                 - 未指定请求 Bot 的时候，返回 `10101 Who Am I`。
                 - 提供的 Bot 实例不存在时，返回 `10102 Unknown Self`。
             - 参数类型校验失败时，返回 `10003 Bad Param`。
-            - 含有多余参数时，返回 `10006 Unsupported Param`。
+            - 消息段类型未知时，返回 `10005 Unsupported Segment`；消息段数据错误时，返回 `10006 Bad Segment Data`。
+            - 含有多余参数时，返回 `10004 Unsupported Param`。
             - 运行响应器出错时，返回 `20002 Internal Handler Error`。
 
+        参数模型在注册时生成，校验与转换由 msgspec 一次完成；
+        `get_version` `get_supported_actions` 的响应数据在首次执行后缓存，之后不再调用响应器；
+        编码后的响应由 `handle_action_encoded` 缓存。
+
         Args:
             action (str): 动作名
             params (dict[str, Any]): 动作参数
@@ -275,7 +414,7 @@ class OneBotImpl:
                 message="action is not supported",
                 echo=echo,
             )
-        handler, keys, types, model = action_handler
+        handler, model, bot_params, param_names, segment_params = action_handler
         if len(self.bots) > 1 and not bot_self:
             return FailedActionResponse(
                 retcode=WHO_AM_I,
@@ -293,30 +432,32 @@ class OneBotImpl:
                 message=f"bot {bot_id} is not exist",
                 echo=echo,
             )
-        bot = self.bots.get(bot_id) or next(iter(self.bots.values()))
 
-        for name, type_detail in types.items():
-            type_, typing_type = type_detail
-            if typing_type is TypingType.BOT:
-                params[name] = bot
-            elif typing_type is TypingType.ANNOTATED:
-                param_real_name = cast(Annotated, type_).__metadata__[0]
-                params[name] = params.pop(param_real_name, None)
+        if not params and action in self._static_data:
+            return ActionResponse(
+                status="ok",
+                retcode=OK,
+                data=self._static_data[action],
+                echo=echo,
+            )
 
+        # 一次完成校验与转换，响应器收到的是转换后的值（如 base64 解码后的 bytes、类型化消息段）
         try:
-            msgspec.convert(params, model)
+            kwargs = msgspec.structs.asdict(msgspec.convert(params, model))
         except ValidationError as e:
             logger.warning(f"请求模型校验失败: {e}")
-            return FailedActionResponse(retcode=BAD_PARAM, message=str(e))
-        if extra_params := set(params) - set(keys):
-            logger.warning(f"不支持的动作参数: {', '.join(extra_params)}")
             return FailedActionResponse(
-                retcode=UNSUPPORTED_PARAM,
-                message=f"Don't support params: {', '.join(extra_params)}",
+                retcode=_validation_retcode(params, param_names, segment_params),
+                message=str(e),
+                echo=echo,
             )
+        if bot_params:
+            bot = self.bots.get(bot_id) or next(iter(self.bots.values()))
+            for name in bot_params:
+                kwargs[name] = bot
         try:
             logger.info(f"执行动作 {action}")
-            data = await handler(**params)
+            data = await handler(**kwargs)
         except OneBotImplError as e:
             return FailedActionResponse(
                 retcode=e.retcode,
@@ -330,8 +471,63 @@ class OneBotImpl:
                 retcode=INTERNAL_HANDLER_ERROR,
                 echo=echo,
             )
+        if action in _STATIC_ACTIONS:
+            self._static_data[action] = data
         return ActionResponse(status="ok", retcode=OK, data=data, echo=echo)
 
+    def _is_known_self(self, bot_self: BotSelf | None) -> bool:
+        """请求的 Bot 是否能通过 `handle_action` 的 Who Am I / Unknown Self 检查。"""
+        if not bot_self:
+            return len(self.bots) == 1
+        return f"{bot_self['platform']}.{bot_self['user_id']}" in self.bots
+
+    async def handle_action_encoded(
+        self,
+        action: str,
+        params: dict[str, Any],
+        content_type: ContentType,
+        bot_self: BotSelf | None = None,
+        echo: str | None = None,
+    ) -> bytes:
+        """处理动作请求，返回编码后的响应。
+
+        `get_version` `get_supported_actions` 的成功响应按（动作, echo, 编码格式）缓存编码结果，
+        最多缓存 `_STATIC_RESPONSE_CACHE_SIZE` 个组合；未命中时响应数据也不再重新编码，只编码 echo 等外层字段。
+
+        Args:
+            action (str): 动作名
+            params (dict[str, Any]): 动作参数
+            content_type (ContentType): 响应的编码格式
+            bot_self (BotSelf | None): 机器人自身标识
+            echo (str | None): 动作请求标识
+
+        Returns:
+            编码后的动作响应
+        """
+        key = (action, echo, content_type)
+        if (
+            not params
+            and (encoded := self._static_responses.get(key)) is not None
+            and self._is_known_self(bot_self)
+        ):
+            self._static_responses.move_to_end(key)
+            return encoded
+        response = await self.handle_action(action, params, bot_self, echo)
+        data = self._static_data.get(action)
+        if response.retcode != OK or data is None or response.data is not data:
+            return encode_response(response, content_type)
+        if (raw := self._static_raw.get((action, content_type))) is None:
+            raw = msgspec.Raw(encode_response(data, content_type))
+            self._static_raw[(action, content_type)] = raw
+        encoded = encode_response(
+            ActionResponse(status="ok", retcode=OK, data=raw, echo=echo),
+            content_type,
+        )
+        self._static_responses[key] = encoded
+        if len(self._static_responses) > _STATIC_RESPONSE_CACHE_SIZE:
+            self._static_responses.popitem(last=False)
+        return encoded
+
     async def emit(
         self,
         event: Event,
@@ -400,8 +596,9 @@ class OneBotImpl:
 
         pylibob 会根据连接类型自动选择合适的
         Runner（ServerRunner 或 ClientRunner）。
-        同时启动VoceChat webhook服务器。
+        同时启动VoceChat API客户端与VoceChat webhook服务器。
         """
+        from core.client import VoceChatClient
         from core.webhook import VoceChatWebhook
         from config import WEBHOOK_HOST, WEBHOOK_PORT # Import webhook config
         logger.debug(f"webhook host: {WEBHOOK_HOST} port: {WEBHOOK_PORT}")
@@ -433,27 +630,78 @@ class OneBotImpl:
             runner.on_startup(ws_reverse._start_heartbeat)  # noqa: SLF001
             runner.on_shutdown(ws_reverse._stop_heartbeat)  # noqa: SLF001
 
+        # 创建VoceChat API客户端，需先于webhook服务器启动、晚于其关闭
+        self.vocechat = VoceChatClient.from_bot(next(iter(self.bots.values())))
+        runner.on_startup(self.vocechat.start)
+
         # 创建VoceChat webhook服务器
         webhook_server = VoceChatWebhook(self, WEBHOOK_HOST, WEBHOOK_PORT)
         runner.on_startup(webhook_server.start)
         runner.on_shutdown(webhook_server.stop)
 
+        async def _initial_status():
+            # WebSocket 连接在 meta.connect 后收到当前状态，其他连接在启动时收到一次
+            await self.update_status(force=True)
+
+        runner.on_startup(_initial_status)
+        runner.on_shutdown(self.vocechat.close)
+
         asyncio.run(runner.run())
 
-    async def update_status(self) -> None:
+    def status_event(self) -> MetaStatusUpdateEvent:
+        """以当前状态构建状态更新事件。
+
+        Returns:
+            状态更新事件
+        """
+        return MetaStatusUpdateEvent(
+            id=str(uuid4()),
+            time=time.time(),
+            status=self.status,
+        )
+
+    async def update_status(self, *, force: bool = False) -> None:
         """更新状态。
 
-        此方法仅在连接为 WebSocket 或 HTTP Webhook 时起作用。
+        仅当 `status` 与上次推送的状态不同时才会推送状态更新事件。
+        设置了 `status_update_interval` 时，间隔内的多次变化会合并为间隔结束时的一次推送。
+
+        状态更新事件推送到所有连接：WebSocket 与 HTTP Webhook 直接推送，
+        HTTP 连接启用 `get_latest_events` 时加入事件队列。
+
+        Args:
+            force (bool): 是否忽略状态比较与最小间隔，立即推送
         """
+        status = self.status
+        if not force:
+            if status == self._last_status:
+                return
+            delay = (
+                self._last_status_time
+                + self.status_update_interval
+                - time.monotonic()
+            )
+            if delay > 0:
+                if self._pending_status is None:
+                    self._pending_status = asyncio.create_task(
+                        self._delayed_update_status(delay),
+                    )
+                    background_task.add(self._pending_status)
+                    self._pending_status.add_done_callback(
+                        background_task.remove,
+                    )
+                return
+        self._last_status = status
+        self._last_status_time = time.monotonic()
         await self.emit(
             MetaStatusUpdateEvent(
                 id=str(uuid4()),
                 time=time.time(),
-                status=self.status,
+                status=status,
             ),
-            conns=[
-                conn
-                for conn in self.conns
-                if isinstance(conn, (WebSocketConnection, HTTPWebhook))
-            ],
         )
+
+    async def _delayed_update_status(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._pending_status = None
+        await self.update_status()
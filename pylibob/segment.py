@@ -1,9 +1,17 @@
 """本模块实现了 OneBot 消息段。"""
 from __future__ import annotations
 
-from typing import Any
+import sys
+from typing import Any, Union
 
-from msgspec import Struct
+from msgspec import Meta, Struct, field
+
+if sys.version_info >= (3, 9):
+    from typing import Annotated
+else:
+    from typing_extensions import Annotated
+
+_NonEmptyStr = Annotated[str, Meta(min_length=1)]
 
 
 class Segment(Struct):
@@ -79,3 +87,130 @@ def Reply(message_id: str, user_id: str, **extra: Any) -> Segment:
         type="reply",
         data={"message_id": message_id, "user_id": user_id, **extra},
     )
+
+
+class TextData(Struct):
+    """纯文本消息段数据。"""
+
+    text: str
+
+
+class MentionData(Struct):
+    """提及消息段数据。"""
+
+    user_id: str
+
+
+class MentionAllData(Struct):
+    """提及所有人消息段数据。"""
+
+
+class FileData(Struct):
+    """图片、语音、音频、视频、文件消息段数据。"""
+
+    file_id: _NonEmptyStr
+
+
+class LocationData(Struct):
+    """位置消息段数据。"""
+
+    latitude: float
+    longitude: float
+    title: str
+    content: str
+
+
+class ReplyData(Struct):
+    """回复消息段数据。"""
+
+    message_id: _NonEmptyStr
+    user_id: str = ""
+
+
+class TypedSegment(Struct, tag_field="type"):
+    """按 `type` 区分的消息段基类。
+
+    子类组成的 `MessageSegment` 联合类型可直接用作动作参数的类型注解，
+    由 msgspec 在校验动作参数时解码；`data` 中的扩展字段会被忽略。
+    """
+
+    @property
+    def type(self) -> str:  # noqa: A003
+        """消息段类型。"""
+        return self.__struct_config__.tag  # type: ignore[return-value]
+
+
+class TextSegment(TypedSegment, tag="text"):
+    """`text` 纯文本消息段。"""
+
+    data: TextData
+
+
+class MentionSegment(TypedSegment, tag="mention"):
+    """`mention` 提及消息段。"""
+
+    data: MentionData
+
+
+class MentionAllSegment(TypedSegment, tag="mention_all"):
+    """`mention_all` 提及所有人消息段。"""
+
+    data: MentionAllData = field(default_factory=MentionAllData)
+
+
+class ImageSegment(TypedSegment, tag="image"):
+    """`image` 图片消息段。"""
+
+    data: FileData
+
+
+class VoiceSegment(TypedSegment, tag="voice"):
+    """`voice` 语音消息段。"""
+
+    data: FileData
+
+
+class AudioSegment(TypedSegment, tag="audio"):
+    """`audio` 音频消息段。"""
+
+    data: FileData
+
+
+class VideoSegment(TypedSegment, tag="video"):
+    """`video` 视频消息段。"""
+
+    data: FileData
+
+
+class FileSegment(TypedSegment, tag="file"):
+    """`file` 文件消息段。"""
+
+    data: FileData
+
+
+class LocationSegment(TypedSegment, tag="location"):
+    """`location` 位置消息段。"""
+
+    data: LocationData
+
+
+class ReplySegment(TypedSegment, tag="reply"):
+    """`reply` 回复消息段。"""
+
+    data: ReplyData
+
+
+MessageSegment = Union[
+    TextSegment,
+    MentionSegment,
+    MentionAllSegment,
+    ImageSegment,
+    VoiceSegment,
+    AudioSegment,
+    VideoSegment,
+    FileSegment,
+    LocationSegment,
+    ReplySegment,
+]
+"""OneBot 12 标准消息段的联合类型，未知类型返回 `10005 Unsupported Segment`，
+数据不符合返回 `10006 Bad Segment Data`。"""
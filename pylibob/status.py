@@ -17,3 +17,9 @@ UNKNOWN_SELF = 10102
 # 2xxxx 动作处理器错误（Handler Error）
 BAD_HANDLER = 20001
 INTERNAL_HANDLER_ERROR = 20002
+
+# 3xxxx 动作执行错误（Execution Error）
+FILESYSTEM_ERROR = 32000
+NETWORK_ERROR = 33000
+PLATFORM_ERROR = 34000
+LOGIC_ERROR = 35000
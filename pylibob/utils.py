@@ -11,6 +11,7 @@ from typing import Any, Awaitable, Callable, ForwardRef, cast, get_origin
 
 from pylibob.types import ActionHandler, Bot, ContentType
 
+import msgspec
 from starlette.requests import HTTPConnection
 
 if sys.version_info >= (3, 9):
@@ -33,6 +34,13 @@ def detect_content_type(type_: str) -> ContentType | None:
         return None
 
 
+def encode_response(obj: Any, content_type: ContentType) -> bytes:
+    """按内容类型编码动作响应。"""
+    if content_type == ContentType.JSON:
+        return msgspec.json.encode(obj)
+    return msgspec.msgpack.encode(obj)
+
+
 def authorize(access_token: str | None, request: HTTPConnection) -> bool:
     if access_token is None:
         return True
@@ -0,0 +1,87 @@
+"""动作参数校验：消息段错误按类型与数据分别返回 10005 与 10006；元动作响应的编码结果被缓存。"""
+from __future__ import annotations
+
+import asyncio
+from typing import Annotated, Any
+
+import pytest
+
+from pylibob import HTTP, Bot, MessageSegment, OneBotImpl
+from pylibob.types import ContentType
+from pylibob.utils import encode_response
+from pylibob.status import (
+    BAD_PARAM,
+    BAD_SEGMENT_DATA,
+    OK,
+    UNSUPPORTED_PARAM,
+    UNSUPPORTED_SEGMENT,
+    WHO_AM_I,
+)
+
+
+def _make_impl() -> OneBotImpl:
+    impl = OneBotImpl("test", "0", [HTTP()], Bot(platform="vocechat", user_id="2", online=True))
+
+    @impl.action("send_message")
+    async def _(
+        detail_type: str,
+        message: list[MessageSegment],
+        mode: Annotated[str, "test.mode"] = "",
+    ) -> dict[str, Any]:
+        return {"message_id": "1"}
+
+    return impl
+
+
+@pytest.mark.parametrize(
+    ("message", "retcode"),
+    [
+        ([{"type": "text", "data": {"text": "hi"}}], OK),
+        ([{"data": {"text": "hi"}}], UNSUPPORTED_SEGMENT),
+        ([{"type": "text", "data": {"text": "hi"}}, {"type": "unknown", "data": {}}], UNSUPPORTED_SEGMENT),
+        ([{"type": "text", "data": {}}], BAD_SEGMENT_DATA),
+        ([{"type": "image", "data": {"file_id": ""}}], BAD_SEGMENT_DATA),
+        ([{"type": "mention", "data": {"user_id": 12}}], BAD_SEGMENT_DATA),
+        ("oops", BAD_PARAM),
+    ],
+)
+def test_segment_retcode(message: Any, retcode: int) -> None:
+    response = asyncio.run(
+        _make_impl().handle_action("send_message", {"detail_type": "group", "message": message}),
+    )
+    assert response.retcode == retcode
+
+
+def test_unknown_param_retcode() -> None:
+    response = asyncio.run(
+        _make_impl().handle_action("send_message", {"detail_type": "group", "message": [], "mode": "x"}),
+    )
+    assert response.retcode == UNSUPPORTED_PARAM
+
+
+@pytest.mark.parametrize("content_type", list(ContentType))
+def test_static_response_encoded(content_type: ContentType) -> None:
+    impl = _make_impl()
+
+    async def run() -> None:
+        for echo in [None, "1", "2", "1"]:
+            for action in ["get_version", "get_supported_actions"]:
+                expected = encode_response(await impl.handle_action(action, {}, echo=echo), content_type)
+                assert await impl.handle_action_encoded(action, {}, content_type, echo=echo) == expected
+
+        # 注册新动作后支持的动作列表随之更新
+        @impl.action("test.ping")
+        async def _() -> None:
+            return None
+
+        encoded = await impl.handle_action_encoded("get_supported_actions", {}, content_type, echo="1")
+        assert b"test.ping" in encoded
+
+        # 多个 Bot 时缓存的响应不会绕过 Who Am I 检查
+        impl.bots["vocechat.3"] = Bot(platform="vocechat", user_id="3", online=True)
+        response = await impl.handle_action("get_version", {}, echo="1")
+        assert response.retcode == WHO_AM_I
+        encoded = await impl.handle_action_encoded("get_version", {}, content_type, echo="1")
+        assert encoded == encode_response(response, content_type)
+
+    asyncio.run(run())
@@ -0,0 +1,42 @@
+"""429 处理：非发送类请求只等待 Retry-After，不暂停发送配额。"""
+from __future__ import annotations
+
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.client import VoceChatClient
+
+
+def test_get_429_does_not_block_sends(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    hits: list[str] = []
+
+    async def user(request: web.Request) -> web.Response:
+        hits.append(request.path)
+        if len(hits) == 1:
+            return web.Response(status=429, headers={"Retry-After": "0.1"})
+        return web.json_response({"uid": 3, "name": "alice"})
+
+    app = web.Application()
+    app.router.add_get("/api/bot/user/3", user)
+
+    async def run() -> tuple[int, dict]:
+        async with TestServer(app) as server:
+            client = VoceChatClient(str(server.make_url("")), "key")
+            await client.start()
+            try:
+                async with client.get("/api/bot/user/3") as resp:
+                    status = resp.status
+            finally:
+                await client.close()
+        return status, client.limiter.dict()
+
+    status, limiter = asyncio.run(run())
+    assert status == 200
+    assert len(hits) == 2
+    assert limiter["throttled"] == 1
+    # GET 不消耗发送配额，全局发送也未被暂停
+    assert limiter["acquired"] == 0
+    assert limiter["current_wait"] == 0
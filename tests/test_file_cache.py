@@ -0,0 +1,76 @@
+"""文件缓存：启动对账只删除缓存自己创建的文件，正在使用的文件不会被淘汰。"""
+from __future__ import annotations
+
+import asyncio
+import os
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.client import VoceChatClient
+from core.file_cache import FileCache
+
+
+def test_load_keeps_unrelated_files(tmp_path) -> None:
+    (tmp_path / "notes.txt").write_text("keep")
+    (tmp_path / "photo-0123456789abcdef.png").write_text("keep")
+    (tmp_path / ("a" * 32 + ".png")).write_bytes(b"stale")
+    (tmp_path / ("b" * 32 + ".tmp")).write_bytes(b"partial")
+    cache = FileCache(None, directory=str(tmp_path))
+
+    assert cache._load() == {}  # noqa: SLF001
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["notes.txt", "photo-0123456789abcdef.png"]
+
+
+async def _with_cache(func, *, max_bytes: int) -> None:
+    async def resource(request: web.Request) -> web.Response:
+        # 每个文件 8 字节
+        return web.Response(body=request.query["file_path"].encode().ljust(8, b"."))
+
+    app = web.Application()
+    app.router.add_get("/api/resource/file", resource)
+    async with TestServer(app) as server:
+        client = VoceChatClient(str(server.make_url("")), "key")
+        client.files.max_bytes = max_bytes
+        await client.start()
+        try:
+            await func(client.files)
+        finally:
+            await client.close()
+
+
+def test_file_in_use_is_not_evicted(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+
+    async def run(files: FileCache) -> None:
+        async with files.use("a") as entry:
+            await files.fetch("b")
+            await files.fetch("c")
+            # a 最久未使用，但正在使用，淘汰的是 b
+            assert await files.read(entry) == b"a......."
+            assert "b" not in files._files  # noqa: SLF001
+            await files.fetch("d")
+            assert files.total_bytes == 16
+        # 解除固定后 a 按 LRU 被淘汰
+        await files.fetch("e")
+        assert "a" not in files._files  # noqa: SLF001
+
+    asyncio.run(_with_cache(run, max_bytes=16))
+
+
+def test_leased_file_is_not_evicted(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+
+    async def run(files: FileCache) -> None:
+        async with files.use("a") as entry:
+            files.lease("a")
+        path = files.local_path(entry)
+        for file_path in "bcd":
+            await files.fetch(file_path)
+        assert os.path.exists(path)
+        files.lease_time = 0
+        files._leases.clear()  # noqa: SLF001
+        await files.fetch("e")
+        assert not os.path.exists(path)
+
+    asyncio.run(_with_cache(run, max_bytes=16))
@@ -0,0 +1,96 @@
+"""分片上传：finish 持有上传的锁，sha256 不一致返回 10003，超时的上传定期清理。"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import os
+
+import pytest
+
+from core.bot_actions import register_actions
+from core.client import VoceChatClient
+from core.fragment import FragmentedUploads
+from core.upload import ChecksumMismatch
+from pylibob import HTTP, Bot, OneBotImpl
+from pylibob.exception import LogicError
+from pylibob.status import BAD_PARAM
+
+DATA = b"hello, vocechat"
+
+
+async def _prepare(fragments: FragmentedUploads) -> str:
+    file_id = await fragments.prepare("a.txt", len(DATA))
+    await fragments.transfer(file_id, 0, DATA)
+    return file_id
+
+
+def test_checksum_mismatch(tmp_path) -> None:
+    fragments = FragmentedUploads(spool_dir=str(tmp_path), ttl=60)
+
+    async def run() -> None:
+        file_id = await _prepare(fragments)
+        with pytest.raises(ChecksumMismatch):
+            async with fragments.finish(file_id, "0" * 64):
+                pass
+        assert fragments.sessions == {}
+
+    asyncio.run(run())
+    assert os.listdir(tmp_path) == []
+
+
+def test_checksum_mismatch_retcode(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    impl = OneBotImpl("test", "0", [HTTP()], Bot(platform="vocechat", user_id="2", online=True))
+    register_actions(impl)
+
+    async def run():
+        # 分片上传的 prepare、transfer 与校验失败的 finish 都不请求 VoceChat
+        impl.vocechat = VoceChatClient("http://127.0.0.1:1", "key")
+        file_id = (await impl.handle_action("upload_file_fragmented", {
+            "stage": "prepare", "name": "a.txt", "total_size": len(DATA),
+        })).data["file_id"]
+        await impl.handle_action("upload_file_fragmented", {
+            "stage": "transfer", "file_id": file_id, "offset": 0, "data": base64.b64encode(DATA).decode(),
+        })
+        return await impl.handle_action("upload_file_fragmented", {
+            "stage": "finish", "file_id": file_id, "sha256": "0" * 64,
+        })
+
+    assert asyncio.run(run()).retcode == BAD_PARAM
+
+
+def test_concurrent_finish(tmp_path) -> None:
+    fragments = FragmentedUploads(spool_dir=str(tmp_path), ttl=60)
+    uploads: list[str] = []
+
+    async def finish(file_id: str) -> None:
+        async with fragments.finish(file_id, hashlib.sha256(DATA).hexdigest()) as session:
+            await asyncio.sleep(0.05)
+            uploads.append(session.path)
+
+    async def run() -> list:
+        file_id = await _prepare(fragments)
+        return await asyncio.gather(finish(file_id), finish(file_id), return_exceptions=True)
+
+    results = asyncio.run(run())
+    # 第二个 finish 等待锁后发现上传已完成
+    assert results[0] is None
+    assert isinstance(results[1], LogicError)
+    assert len(uploads) == 1
+
+
+def test_expire_loop(tmp_path) -> None:
+    fragments = FragmentedUploads(spool_dir=str(tmp_path), ttl=0.05)
+
+    async def run() -> None:
+        fragments.start()
+        try:
+            await _prepare(fragments)
+            await asyncio.sleep(0.2)
+            assert fragments.sessions == {}
+        finally:
+            fragments.close()
+
+    asyncio.run(run())
+    assert os.listdir(tmp_path) == []
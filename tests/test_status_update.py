@@ -0,0 +1,31 @@
+"""状态更新事件：`is_good` 变化时推送到所有连接，包括 HTTP Webhook。"""
+from __future__ import annotations
+
+import asyncio
+
+from pylibob import Bot, HTTPWebhook, OneBotImpl
+
+
+def test_good_transition_reaches_webhook() -> None:
+    webhook = HTTPWebhook("http://127.0.0.1:1/onebot")
+    impl = OneBotImpl("test", "0", [webhook], Bot(platform="vocechat", user_id="2", online=True))
+    received: list[bool] = []
+
+    async def emit_event(event) -> None:
+        received.append(event.status["good"])
+
+    webhook.emit_event = emit_event
+
+    async def run() -> None:
+        await impl.update_status(force=True)
+        impl.is_good = False
+        await asyncio.sleep(0)
+        # 状态未变化时不推送
+        impl.is_good = False
+        await impl.update_status()
+        impl.is_good = True
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert received == [True, False, True]
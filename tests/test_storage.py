@@ -0,0 +1,103 @@
+"""持久化存储：写快照失败时，尚未写入日志的变更不会丢失；早于快照的日志不会被重放。"""
+from __future__ import annotations
+
+import asyncio
+import shutil
+import struct
+
+import msgspec
+
+from core import storage
+from core.storage import DirectoryStore
+
+
+def _make_store(tmp_path, state: dict[str, int]) -> DirectoryStore[int]:
+    return DirectoryStore(str(tmp_path / "state.msgpack"), int, lambda: state, debounce=60)
+
+
+def test_failed_snapshot_keeps_pending_changes(tmp_path, monkeypatch) -> None:
+    state = {"a": 1, "b": 2}
+    store = _make_store(tmp_path, state)
+
+    def fail(_state) -> None:
+        raise OSError("disk full")
+
+    async def run() -> None:
+        store.record("a", 1)
+        store.record("b", 2)
+        monkeypatch.setattr(store, "_write_snapshot", fail)
+        await store.snapshot()
+        store._flush_task.cancel()  # noqa: SLF001
+
+    asyncio.run(run())
+    # 变更已追加到日志，重启后可以恢复
+    assert _make_store(tmp_path, {}).load() == state
+
+
+def test_failed_snapshot_and_log_restores_pending(tmp_path, monkeypatch) -> None:
+    store = _make_store(tmp_path, {"a": 1})
+
+    def fail(*_args) -> None:
+        raise OSError("disk full")
+
+    async def run() -> None:
+        store.record("a", 1)
+        monkeypatch.setattr(store, "_write_snapshot", fail)
+        monkeypatch.setattr(store, "_append", fail)
+        await store.snapshot()
+        store._flush_task.cancel()  # noqa: SLF001
+
+    asyncio.run(run())
+    assert store._pending == [("a", 1)]  # noqa: SLF001
+
+
+def test_stale_log_is_not_replayed(tmp_path) -> None:
+    state = {"a": 1}
+    store = _make_store(tmp_path, state)
+    log_path = tmp_path / "state.msgpack.log"
+
+    async def run() -> None:
+        store.record("a", 1)
+        await store.flush()
+        shutil.copy(log_path, tmp_path / "old.log")
+        state["a"] = 2
+        store.record("a", 2)
+        await store.snapshot()
+
+    asyncio.run(run())
+    # 模拟替换快照后、清空日志前进程退出
+    shutil.copy(tmp_path / "old.log", log_path)
+    assert _make_store(tmp_path, {}).load() == {"a": 2}
+
+
+def test_log_is_rewritten_after_failed_truncate(tmp_path, monkeypatch) -> None:
+    state = {"a": 1}
+    store = _make_store(tmp_path, state)
+
+    def fail(_path) -> None:
+        raise OSError("fsync failed")
+
+    async def run() -> None:
+        store.record("a", 1)
+        await store.flush()
+        state["a"] = 2
+        store.record("a", 2)
+        monkeypatch.setattr(storage, "_fsync_dir", fail)
+        # 快照已替换，但日志未清空
+        await store.snapshot()
+        monkeypatch.undo()
+        state["b"] = 3
+        store.record("b", 3)
+        await store.flush()
+
+    asyncio.run(run())
+    assert _make_store(tmp_path, {}).load() == {"a": 2, "b": 3}
+
+
+def test_load_legacy_files(tmp_path) -> None:
+    (tmp_path / "state.msgpack").write_bytes(msgspec.msgpack.encode({"a": 1, "b": 2}))
+    entry = msgspec.msgpack.encode(("a", 3))
+    (tmp_path / "state.msgpack.log").write_bytes(struct.pack("<I", len(entry)) + entry)
+
+    store = _make_store(tmp_path, {})
+    assert store.load() == {"a": 3, "b": 2}
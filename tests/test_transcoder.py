@@ -0,0 +1,24 @@
+"""消息转码：VoceChat 消息内容经 OneBot 消息段转换后保持不变。"""
+from __future__ import annotations
+
+import msgspec
+
+from core.sender import SendStep
+from core.transcoder import SendSegment, decode_content, encode_message
+
+
+def _round_trip(content_type: str, content: str) -> list[SendStep]:
+    message = decode_content(content_type, content)
+    segments = msgspec.convert(msgspec.to_builtins(message), list[SendSegment])
+    return encode_message(segments)
+
+
+def test_markdown_round_trip() -> None:
+    content = "# 标题\n\n**加粗** @12 [链接](https://example.com)"
+    assert [segment.type for segment in decode_content("text/markdown", content)] == ["vocechat.markdown"]
+    assert _round_trip("text/markdown", content) == [SendStep("text/markdown", content)]
+
+
+def test_plain_text_round_trip() -> None:
+    content = "hello @12 world"
+    assert _round_trip("text/plain", content) == [SendStep("text/plain", content)]
@@ -0,0 +1,87 @@
+"""上传 sha256 校验：能提前计算摘要的数据源在上传前拒绝，返回 10003。"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.bot_actions import register_actions
+from core.client import VoceChatClient
+from core.upload import ChecksumMismatch
+from pylibob import HTTP, Bot, OneBotImpl
+from pylibob.status import BAD_PARAM
+
+DATA = b"hello, vocechat"
+
+
+def _make_server() -> tuple[web.Application, list[str]]:
+    requests: list[str] = []
+
+    async def prepare(request: web.Request) -> web.Response:
+        requests.append(request.path)
+        return web.Response(text='"tmp-1"')
+
+    async def upload(request: web.Request) -> web.Response:
+        requests.append(request.path)
+        form = await request.post()
+        data = form["chunk_data"].file.read()
+        return web.json_response({"path": "2026/10/18/tmp-1", "size": len(data)})
+
+    app = web.Application()
+    app.router.add_post("/api/bot/file/prepare", prepare)
+    app.router.add_post("/api/bot/file/upload", upload)
+    return app, requests
+
+
+async def _with_client(app: web.Application, func):
+    async with TestServer(app) as server:
+        client = VoceChatClient(str(server.make_url("")), "key")
+        await client.start()
+        try:
+            return await func(client)
+        finally:
+            await client.close()
+
+
+def test_data_mismatch_rejected_before_upload(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    app, requests = _make_server()
+    impl = OneBotImpl("test", "0", [HTTP()], Bot(platform="vocechat", user_id="2", online=True))
+    register_actions(impl)
+
+    async def run(client: VoceChatClient):
+        impl.vocechat = client
+        return await impl.handle_action("upload_file", {
+            "type": "data",
+            "name": "a.txt",
+            "data": base64.b64encode(DATA).decode(),
+            "sha256": "0" * 64,
+        })
+
+    response = asyncio.run(_with_client(app, run))
+    assert response.retcode == BAD_PARAM
+    assert requests == []
+
+
+def test_stream_mismatch_reports_uploaded_path(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    app, requests = _make_server()
+
+    async def stream():
+        yield DATA
+
+    async def run(client: VoceChatClient):
+        with pytest.raises(ChecksumMismatch) as info:
+            await client.uploader.upload("a.txt", "text/plain", stream=stream(), sha256="0" * 64)
+        # 流式数据源只能在上传后校验，文件已保存但不记录到缓存
+        assert client.uploader.cache.get(hashlib.sha256(DATA).hexdigest()) is None
+        return info.value
+
+    error = asyncio.run(_with_client(app, run))
+    assert error.path == "2026/10/18/tmp-1"
+    assert error.actual == hashlib.sha256(DATA).hexdigest()
+    assert requests == ["/api/bot/file/prepare", "/api/bot/file/upload"]
@@ -0,0 +1,91 @@
+"""分块上传：分块中断时不重传该分块，而是重新预上传并从头上传。"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.client import VoceChatClient
+from core.upload import UploadInterrupted
+
+DATA = bytes(range(256)) * 40
+
+
+def _make_server(stalls: set[int], *, append_before_stall: bool) -> tuple[web.Application, dict]:
+    """模拟 VoceChat 上传接口，第 `stalls` 次分块请求不响应（序号从 0 开始，跨临时文件计数）。"""
+    files: dict[str, bytearray] = {}
+    state = {"prepared": 0, "requests": 0}
+
+    async def prepare(request: web.Request) -> web.Response:
+        state["prepared"] += 1
+        file_id = f"tmp-{state['prepared']}"
+        files[file_id] = bytearray()
+        return web.Response(text=f'"{file_id}"')
+
+    async def upload(request: web.Request) -> web.Response:
+        index = state["requests"]
+        state["requests"] += 1
+        form = await request.post() if append_before_stall or index not in stalls else None
+        if form is not None:
+            files[form["file_id"]].extend(form["chunk_data"].file.read())
+        if index in stalls:
+            # 服务器卡住，客户端读取超时；append_before_stall 时分块已经写入
+            await asyncio.sleep(2)
+            return web.Response()
+        if form["chunk_is_last"] != "true":
+            return web.Response()
+        received = files[form["file_id"]]
+        return web.json_response({
+            "path": f"2026/10/18/{form['file_id']}",
+            "size": len(received),
+            "hash": hashlib.sha256(received).hexdigest(),
+        })
+
+    app = web.Application()
+    app.router.add_post("/api/bot/file/prepare", prepare)
+    app.router.add_post("/api/bot/file/upload", upload)
+    return app, state
+
+
+async def _upload(app: web.Application, **source) -> dict:
+    async with TestServer(app) as server:
+        client = VoceChatClient(str(server.make_url("")), "key", read_timeout=0.3)
+        client.uploader.chunk_size = 4096
+        await client.start()
+        try:
+            return await client.uploader.upload(
+                "a.bin",
+                "application/octet-stream",
+                lookup=False,
+                **source,
+            )
+        finally:
+            await client.close()
+
+
+@pytest.mark.parametrize("append_before_stall", [False, True])
+def test_chunk_timeout_restarts_upload(tmp_path, monkeypatch, append_before_stall: bool) -> None:
+    monkeypatch.chdir(tmp_path)
+    app, state = _make_server({1}, append_before_stall=append_before_stall)
+
+    result = asyncio.run(_upload(app, data=DATA))
+
+    assert result["size"] == len(DATA)
+    assert result["sha256"] == hashlib.sha256(DATA).hexdigest()
+    # 超时的分块不重传：第一次上传发出 2 个分块后中断，重新预上传后发出全部 3 个分块
+    assert state == {"prepared": 2, "requests": 5}
+
+
+def test_stream_chunk_timeout_fails(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    app, state = _make_server({1}, append_before_stall=True)
+
+    async def stream():
+        yield DATA
+
+    with pytest.raises(UploadInterrupted):
+        asyncio.run(_upload(app, stream=stream()))
+    assert state == {"prepared": 1, "requests": 2}
@@ -0,0 +1,83 @@
+"""数据流上传：分块边读边发送，不在内存中缓存整个分块。"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.client import VoceChatClient
+from core.upload import _IncrementalHash, _StreamChunker
+
+PIECE = 1000
+
+
+async def _pieces(data: bytes, observed: list[int]):
+    for offset in range(0, len(data), PIECE):
+        observed.append(offset)
+        yield data[offset:offset + PIECE]
+
+
+@pytest.mark.parametrize(
+    ("size", "chunks"),
+    [
+        (10000, [(4096, "false"), (4096, "false"), (1808, "true")]),
+        (8192, [(4096, "false"), (4096, "true")]),
+        (0, [(0, "true")]),
+    ],
+)
+def test_stream_upload_chunks(tmp_path, monkeypatch, size: int, chunks: list) -> None:
+    monkeypatch.chdir(tmp_path)
+    data = bytes(range(256)) * (size // 256) + bytes(size % 256)
+    received: list[tuple[int, str]] = []
+    content = bytearray()
+    reads: list[int] = []
+
+    async def prepare(request: web.Request) -> web.Response:
+        return web.Response(text='"tmp-1"')
+
+    async def upload(request: web.Request) -> web.Response:
+        form = await request.post()
+        chunk = form["chunk_data"].file.read()
+        content.extend(chunk)
+        received.append((len(chunk), form["chunk_is_last"]))
+        if form["chunk_is_last"] != "true":
+            return web.Response()
+        return web.json_response({"path": "2026/10/18/tmp-1", "size": len(content)})
+
+    app = web.Application()
+    app.router.add_post("/api/bot/file/prepare", prepare)
+    app.router.add_post("/api/bot/file/upload", upload)
+
+    async def run() -> dict:
+        async with TestServer(app) as server:
+            client = VoceChatClient(str(server.make_url("")), "key")
+            client.uploader.chunk_size = 4096
+            await client.start()
+            try:
+                return await client.uploader.upload(
+                    "a.bin",
+                    "application/octet-stream",
+                    stream=_pieces(data, reads),
+                )
+            finally:
+                await client.close()
+
+    result = asyncio.run(run())
+    assert received == chunks
+    assert bytes(content) == data
+    assert result["sha256"] == hashlib.sha256(data).hexdigest()
+
+
+def test_chunk_is_sent_while_reading() -> None:
+    data = bytes(10000)
+    reads: list[int] = []
+
+    async def run() -> list[int]:
+        chunker = _StreamChunker(_pieces(data, reads), 4096, _IncrementalHash())
+        # 每段数据产出时数据流只读取到这一段，不预先读满整个分块
+        return [len(reads) async for _ in chunker.chunk()]
+
+    assert asyncio.run(run()) == [1, 2, 3, 4, 5]
@@ -0,0 +1,78 @@
+"""用户资料缓存：只有 404 视为用户不存在，暂时性错误不会被当作“用户不存在”。"""
+from __future__ import annotations
+
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.bot_actions import register_actions
+from core.client import VoceChatClient
+from core.retry import RetryPolicy
+from pylibob import HTTP, Bot, OneBotImpl
+from pylibob.status import LOGIC_ERROR, NETWORK_ERROR, PLATFORM_ERROR
+
+
+def _make_server(statuses: list[int]) -> web.Application:
+    """按顺序返回 `statuses` 中的状态码，200 时返回用户资料。"""
+
+    async def user(request: web.Request) -> web.Response:
+        status = statuses.pop(0)
+        if status == 200:
+            return web.json_response({"uid": 3, "name": "alice"})
+        return web.Response(status=status)
+
+    app = web.Application()
+    app.router.add_get("/api/bot/user/{uid:.+}", user)
+    return app
+
+
+async def _get_user_info(url: str, impl: OneBotImpl, calls: int) -> list:
+    client = VoceChatClient(url, "key", retry_policies={"GET": RetryPolicy(attempts=1)})
+    await client.start()
+    impl.vocechat = client
+    try:
+        responses = []
+        for _ in range(calls):
+            responses.append(await impl.handle_action("get_user_info", {"user_id": "3"}))
+            client.users.invalidate("3")
+        return responses
+    finally:
+        await client.close()
+
+
+def _run(tmp_path, monkeypatch, statuses: list[int], *, url: str | None = None) -> list:
+    monkeypatch.chdir(tmp_path)
+    impl = OneBotImpl("test", "0", [HTTP()], Bot(platform="vocechat", user_id="2", online=True))
+    register_actions(impl)
+    calls = len(statuses)
+
+    async def run() -> list:
+        if url is not None:
+            return await _get_user_info(url, impl, calls)
+        async with TestServer(_make_server(statuses)) as server:
+            return await _get_user_info(str(server.make_url("")), impl, calls)
+
+    return asyncio.run(run())
+
+
+def test_not_found(tmp_path, monkeypatch) -> None:
+    [response] = _run(tmp_path, monkeypatch, [404])
+    assert response.retcode == LOGIC_ERROR
+
+
+def test_server_error_is_not_user_not_found(tmp_path, monkeypatch) -> None:
+    [response] = _run(tmp_path, monkeypatch, [500])
+    assert response.retcode == PLATFORM_ERROR
+
+
+def test_network_error_is_not_user_not_found(tmp_path, monkeypatch) -> None:
+    [response] = _run(tmp_path, monkeypatch, [0], url="http://127.0.0.1:1")
+    assert response.retcode == NETWORK_ERROR
+
+
+def test_server_error_returns_cached_profile(tmp_path, monkeypatch) -> None:
+    first, second = _run(tmp_path, monkeypatch, [200, 500])
+    assert first.data["user_name"] == "alice"
+    # 资料已过期，刷新失败时继续使用旧资料
+    assert second.data["user_name"] == "alice"
@@ -0,0 +1,72 @@
+"""webhook 去重：被拒绝或处理失败的消息重试时仍会推送。"""
+from __future__ import annotations
+
+import asyncio
+import json
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from core.webhook import VoceChatWebhook
+from pylibob import HTTP, Bot, OneBotImpl
+
+
+def _payload(mid: int) -> bytes:
+    return json.dumps({
+        "mid": mid,
+        "from_uid": 3,
+        "created_at": 1700000000000,
+        "target": {"uid": 2},
+        "detail": {"type": "normal", "content": f"msg {mid}", "content_type": "text/plain"},
+    }).encode()
+
+
+def _make_webhook(**kwargs) -> tuple[VoceChatWebhook, list[str]]:
+    impl = OneBotImpl("test", "0", [HTTP()], Bot(platform="vocechat", user_id="2", online=True))
+    emitted: list[str] = []
+
+    async def emit(event) -> None:
+        emitted.append(event.message_id)
+
+    impl.emit = emit
+    return VoceChatWebhook(impl, "127.0.0.1", 0, **kwargs), emitted
+
+
+def test_retry_after_queue_full_is_emitted() -> None:
+    async def run() -> list[str]:
+        webhook, emitted = _make_webhook(fast_ack=True, queue_size=1)
+        # 不启动工作协程，手动消费队列以控制队列是否已满
+        webhook.queue = asyncio.Queue(maxsize=1)
+        async with TestClient(TestServer(webhook.app)) as client:
+            assert (await client.post("/", data=_payload(1))).status == 200
+            assert (await client.post("/", data=_payload(2))).status == 503
+            await webhook.process(webhook.queue.get_nowait()[1])
+            # 重试被拒绝的消息
+            assert (await client.post("/", data=_payload(2))).status == 200
+            await webhook.process(webhook.queue.get_nowait()[1])
+            # 已入队的消息再次推送被判定为重复
+            assert (await client.post("/", data=_payload(1))).status == 200
+            assert webhook.queue.empty()
+        return emitted
+
+    assert asyncio.run(run()) == ["1", "2"]
+
+
+def test_retry_after_processing_failure_is_emitted() -> None:
+    async def run() -> list[str]:
+        webhook, emitted = _make_webhook(fast_ack=False)
+        emit = webhook.impl.emit
+        failures = [RuntimeError("boom")]
+
+        async def flaky_emit(event) -> None:
+            if failures:
+                raise failures.pop()
+            await emit(event)
+
+        webhook.impl.emit = flaky_emit
+        async with TestClient(TestServer(webhook.app)) as client:
+            assert (await client.post("/", data=_payload(7))).status == 500
+            assert (await client.post("/", data=_payload(7))).status == 200
+            assert (await client.post("/", data=_payload(7))).status == 200
+        return emitted
+
+    assert asyncio.run(run()) == ["7"]
@@ -0,0 +1,35 @@
+"""webhook 运行计数接口：默认关闭，启用后校验访问令牌。"""
+from __future__ import annotations
+
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from core.webhook import VoceChatWebhook
+from pylibob import HTTP, Bot, OneBotImpl
+
+
+def _make_webhook(**kwargs) -> VoceChatWebhook:
+    impl = OneBotImpl("test", "0", [HTTP()], Bot(platform="vocechat", user_id="2", online=True))
+    return VoceChatWebhook(impl, "127.0.0.1", 0, **kwargs)
+
+
+async def _get_stats(webhook: VoceChatWebhook, *requests: dict) -> list[int]:
+    async with TestClient(TestServer(webhook.app)) as client:
+        return [(await client.get("/stats", **kwargs)).status for kwargs in requests]
+
+
+def test_stats_disabled_by_default() -> None:
+    assert asyncio.run(_get_stats(_make_webhook(), {})) == [404]
+
+
+def test_stats_requires_access_token() -> None:
+    webhook = _make_webhook(stats_enabled=True, stats_token="secret")
+    statuses = asyncio.run(_get_stats(
+        webhook,
+        {},
+        {"headers": {"Authorization": "Bearer wrong"}},
+        {"headers": {"Authorization": "Bearer secret"}},
+        {"params": {"access_token": "secret"}},
+    ))
+    assert statuses == [401, 401, 200, 200]